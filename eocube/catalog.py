@@ -0,0 +1,219 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Columnar, in-memory table of the STAC items of a data cube, with spatial and temporal queries.
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+import pystac
+
+from .image import Image
+
+
+def item_datetime(item):
+    """Return the datetime of a STAC item as a timezone naive np.datetime64."""
+    return np.datetime64(pd.Timestamp(item.properties['datetime']).tz_localize(None), "us")
+
+
+def item_bounds(item):
+    """Return the (minx, miny, maxx, maxy) longitude and latitude footprint of a STAC item.
+
+    Items without bbox or geometry cover everything, so they are never filtered out by space.
+    """
+    bbox = getattr(item, "bbox", None)
+    if bbox:
+        if len(bbox) == 6:
+            # 3D box (minx, miny, minz, maxx, maxy, maxz)
+            return bbox[0], bbox[1], bbox[3], bbox[4]
+        return tuple(bbox[:4])
+    geometry = getattr(item, "geometry", None)
+    if geometry:
+        coords = np.array(_flatten(geometry["coordinates"]), dtype=np.float64).reshape(-1, 2)
+        return coords[:, 0].min(), coords[:, 1].min(), coords[:, 0].max(), coords[:, 1].max()
+    return -np.inf, -np.inf, np.inf, np.inf
+
+
+def _flatten(coords):
+    if coords and isinstance(coords[0], (int, float)):
+        return list(coords[:2])
+    return [value for part in coords for value in _flatten(part)]
+
+
+class ItemTable():
+    """Columnar table (ids, datetimes, tiles, collections, cloud covers, footprints and asset hrefs) of the STAC items of a cube.
+
+    Items are kept as arrays instead of pystac objects, so large catalogs stay small in memory
+    and read tasks only carry the hrefs they need. Rows are sorted by datetime, so a date range
+    is found by binary search, and footprints are intersected with a bounding box in one
+    vectorized test.
+
+    Parameters
+
+     - items <list, required>: The STAC items of the cube.
+
+     - bands <list of string, required>: The bands always in `hrefs` (None where an item lacks the band). The hrefs
+       of the other assets are kept too, so Images built from the table can still read any band (e.g. getRGB).
+
+    Methods:
+
+        query, take, time, item, complete, order
+    """
+
+    def __init__(self, items=(), bands=()):
+        """Build the table from a list of items."""
+        items = list(items)
+        times = np.array([item_datetime(item) for item in items], dtype="datetime64[us]")
+        order = np.argsort(times, kind="stable")
+        items = [items[i] for i in order]
+        self.ids = np.array([item.id for item in items], dtype=object)
+        self.times = times[order]
+        self.tiles = np.array([item.properties['bdc:tiles'][0] for item in items], dtype=object)
+        self.collections = np.array([getattr(item, "collection_id", None) for item in items], dtype=object)
+        self.cloud_cover = np.array([item.properties.get('eo:cloud_cover', np.nan) for item in items], dtype=np.float64)
+        self.bounds = np.array([item_bounds(item) for item in items], dtype=np.float64).reshape(-1, 4)
+        names = set(bands) | {name for item in items for name in item.assets}
+        self.hrefs = {
+            band: np.array([item.assets[band].href if band in item.assets else None for item in items], dtype=object)
+            for band in sorted(names)
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def take(self, rows):
+        """Return a new table with the given rows."""
+        table = ItemTable()
+        table.ids = self.ids[rows]
+        table.times = self.times[rows]
+        table.tiles = self.tiles[rows]
+        table.collections = self.collections[rows]
+        table.cloud_cover = self.cloud_cover[rows]
+        table.bounds = self.bounds[rows]
+        table.hrefs = {band: hrefs[rows] for band, hrefs in self.hrefs.items()}
+        return table
+
+    def time(self, row):
+        """Return the datetime of a row as a naive datetime.datetime, as Image.time."""
+        return self.times[row].item()
+
+    def complete(self, rows, bands):
+        """Return the rows having every band and the set of bands missing in the others."""
+        rows = np.asarray(rows)
+        present = np.ones(len(rows), dtype=bool)
+        missing = set()
+        for band in bands:
+            available = self.hrefs[band][rows] != None  # noqa: E711, elementwise test on object array
+            if not available.all():
+                missing.add(band)
+            present &= available
+        return rows[present], missing
+
+    def order(self, rows, collections=None):
+        """Sort rows by priority: collection (in the order of `collections`), cloud cover (unknown last) then id."""
+        rows = np.asarray(rows)
+        rank = {collection: i for i, collection in enumerate(collections or [])}
+        return np.array(sorted(rows, key=lambda row: (
+            rank.get(self.collections[row], len(rank)),
+            np.inf if np.isnan(self.cloud_cover[row]) else self.cloud_cover[row],
+            self.ids[row],
+        )), dtype=rows.dtype)
+
+    def item(self, row):
+        """Materialize a minimal pystac Item (id, datetime, tile, footprint and every asset) of a row."""
+        minx, miny, maxx, maxy = self.bounds[row]
+        bbox = geometry = None
+        if np.isfinite(self.bounds[row]).all():
+            bbox = [minx, miny, maxx, maxy]
+            geometry = {"type": "Polygon",
+                        "coordinates": [[[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]]}
+        time = self.time(row)
+        item = pystac.Item(self.ids[row], geometry, bbox, time, {'bdc:tiles': [self.tiles[row]]})
+        item.properties['datetime'] = time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        for band, hrefs in self.hrefs.items():
+            if hrefs[row] is not None:
+                item.add_asset(band, pystac.Asset(hrefs[row]))
+        return item
+
+    def query(self, bbox=None, start_date=None, end_date=None, tiles=None):
+        """Select the rows intersecting a bounding box and a date range, grouped by tile.
+
+        Parameters
+
+         - bbox <list of float, optional>: The (minx, miny, maxx, maxy) longitude and latitude box.
+
+         - start_date <string, optional>: First date, formatted as "yyyy-mm-dd".
+
+         - end_date <string, optional>: Last date (inclusive), formatted as "yyyy-mm-dd".
+
+         - tiles <list of string, optional>: Keep only these tiles.
+
+        Returns a list with the row indices of each tile, sorted by tile as DataCube._search_stac.
+        """
+        start = np.searchsorted(self.times, np.datetime64(start_date, "us"), "left") if start_date else 0
+        stop = np.searchsorted(self.times, np.datetime64(end_date, "D") + np.timedelta64(1, "D"), "left") \
+            if end_date else len(self)
+        selected = np.arange(start, stop)
+
+        if bbox is not None and len(selected):
+            minx, maxx = sorted((bbox[0], bbox[2]))
+            miny, maxy = sorted((bbox[1], bbox[3]))
+            bounds = self.bounds[selected]
+            hits = (bounds[:, 0] <= maxx) & (bounds[:, 2] >= minx) & (bounds[:, 1] <= maxy) & (bounds[:, 3] >= miny)
+            selected = selected[hits]
+        if tiles:
+            selected = selected[np.isin(self.tiles[selected], list(tiles))]
+
+        return [selected[self.tiles[selected] == tile] for tile in sorted(set(self.tiles[selected]))]
+
+
+class ImageMap(Mapping):
+    """Mapping of datetime to Image, materializing each Image from an ItemTable on first access.
+
+    Parameters
+
+     - table <ItemTable, required>: The item table of the cube.
+
+     - rows <dictionary, required>: The (row, grid) of each datetime.
+
+     - bands <list of string, required>: The bands of the images.
+
+     - bbox <list of float, optional>: The bounding box of the images.
+    """
+
+    def __init__(self, table, rows, bands, bbox=None):
+        """Build the mapping without creating any Image."""
+        self.table = table
+        self.rows = dict(rows)
+        self.bands = list(bands)
+        self.bbox = bbox
+        self._images = {}
+
+    def __getitem__(self, time):
+        image = self._images.get(time)
+        if image is None:
+            row, grid = self.rows[time]
+            image = self._images[time] = Image(item=self.table.item(row), bands=self.bands, bbox=self.bbox, grid=grid)
+        return image
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
@@ -0,0 +1,162 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Resumable batch builds of data cubes over many tiles.
+
+Usage:
+
+    eocube-build job.json --workers 4
+
+The job spec is a JSON object with the DataCube parameters (collections, query_bands, start_date,
+end_date and tiles or bbox, optionally formulas, resolution, resampling, snap, quality_band, priority,
+limit and scheduler) and the output directory in "store". The tiles are saved in the CubeStore of
+"store", each tile by its own worker process. Dates already written are skipped, so running the same
+job again resumes it.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+PROGRESS_FILE = "progress.json"
+CUBE_PARAMETERS = ("collections", "query_bands", "start_date", "end_date", "limit", "bbox", "formulas",
+                   "resolution", "resampling", "snap", "quality_band", "priority")
+
+
+def load_job(path):
+    """Read and validate a job spec.
+
+    Raise
+
+     - ValueError: If a required key is missing.
+    """
+    with open(path) as file:
+        job = json.load(file)
+    missing = [key for key in ("collections", "query_bands", "start_date", "end_date", "store") if key not in job]
+    if missing:
+        raise ValueError(f"Missing keys in the job spec: {missing}")
+    if not job.get("tiles") and not job.get("bbox"):
+        raise ValueError("Either 'bbox' or 'tiles' must be specified in the job spec.")
+    return job
+
+
+def _cube(job, tiles=None):
+    from .eocube import DataCube
+
+    parameters = {key: job[key] for key in CUBE_PARAMETERS if key in job}
+    return DataCube(tiles=tiles or job.get("tiles"), scheduler=job.get("scheduler", "synchronous"), **parameters)
+
+
+def discover_tiles(job):
+    """Return the tiles of a job, searching STAC once when the job has a bbox."""
+    if job.get("tiles"):
+        return sorted(job["tiles"])
+    return list(_cube(job).n_tiles)
+
+
+def build_tile(job, tile):
+    """Build and save the cube of one tile in the job store, skipping the dates already written.
+
+    The STAC search only returns the items of the tile (inside the bbox of bbox jobs), so each
+    worker builds the grid of its own tile only.
+
+    Returns the tile and the number of dates written by this call.
+    """
+    try:
+        cube = _cube(job, [tile])
+    except ValueError:
+        # No item of the tile in the period
+        return tile, 0
+    if tile not in cube.n_tiles:
+        return tile, 0
+    written = cube.save(job["store"], tiles=[tile])
+    return tile, len(written)
+
+
+def _read_progress(store):
+    path = os.path.join(store, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return {"done": [], "failed": {}}
+    with open(path) as file:
+        return json.load(file)
+
+
+def _write_progress(store, progress):
+    path = os.path.join(store, PROGRESS_FILE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(progress, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def run(job, workers=1, retries=1, force=False):
+    """Build every tile of a job with at most `workers` processes, recording finished tiles.
+
+    Tiles finished by a previous run are skipped (unless `force`), failed tiles are retried
+    `retries` times. Returns the dictionary of failed tiles and their last error.
+    """
+    os.makedirs(job["store"], exist_ok=True)
+    progress = _read_progress(job["store"])
+    tiles = [tile for tile in discover_tiles(job) if force or tile not in progress["done"]]
+    logging.info("%d tiles to build, %d already done.", len(tiles), len(progress["done"]))
+
+    attempts = {tile: 0 for tile in tiles}
+    failed = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_tile, job, tile): tile for tile in tiles}
+        while futures:
+            future = next(as_completed(futures))
+            tile = futures.pop(future)
+            attempts[tile] += 1
+            try:
+                _, written = future.result()
+            except Exception as e:
+                logging.error("Tile %s failed (attempt %d): %s", tile, attempts[tile], e)
+                if attempts[tile] <= retries:
+                    futures[executor.submit(build_tile, job, tile)] = tile
+                else:
+                    failed[tile] = str(e)
+                continue
+            logging.info("Tile %s done, %d new dates.", tile, written)
+            if tile not in progress["done"]:
+                progress["done"].append(tile)
+            progress["failed"].pop(tile, None)
+            _write_progress(job["store"], progress)
+
+    progress["failed"].update(failed)
+    _write_progress(job["store"], progress)
+    return failed
+
+
+def main(argv=None):
+    """Entry point of the eocube-build command."""
+    parser = argparse.ArgumentParser(prog="eocube-build", description="Build data cubes for many tiles, resumably.")
+    parser.add_argument("job", help="JSON job spec")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Tiles built at the same time")
+    parser.add_argument("--retries", type=int, default=1, help="Retries of a failed tile")
+    parser.add_argument("--force", action="store_true", help="Check again the tiles finished by previous runs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    failed = run(load_job(args.job), args.workers, args.retries, args.force)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Out-of-core clustering of pixel time series: mini-batch k-means and self-organizing maps trained on
+(pixel, band * time) batches, with the features ordered as utils.concatenate_bands.
+
+Methods:
+
+    nearest_mtx_numba, cluster_sums_numba, som_update_numba, MiniBatchKMeans, SOM
+"""
+
+import numba as nb
+import numpy as np
+
+
+@nb.njit(parallel=True)
+def nearest_mtx_numba(data, centers):
+    n, f = data.shape
+    k = centers.shape[0]
+    labels = np.empty(n, dtype=np.int32)
+    distances = np.empty(n, dtype=np.float32)
+    for i in nb.prange(n):
+        best = np.inf
+        arg = 0
+        for c in range(k):
+            d = 0.0
+            for j in range(f):
+                v = data[i, j]
+                # Missing values do not count in the distance
+                if not np.isnan(v):
+                    diff = v - centers[c, j]
+                    d += diff * diff
+            if d < best:
+                best = d
+                arg = c
+        labels[i] = arg
+        distances[i] = best
+    return labels, distances
+
+
+@nb.njit(parallel=True)
+def cluster_sums_numba(data, labels, k):
+    n, f = data.shape
+    sums = np.zeros((k, f))
+    counts = np.zeros((k, f))
+    # Each thread owns a feature, so the sums are updated without races
+    for j in nb.prange(f):
+        for i in range(n):
+            v = data[i, j]
+            if not np.isnan(v):
+                sums[labels[i], j] += v
+                counts[labels[i], j] += 1
+    return sums, counts
+
+
+@nb.njit(parallel=True)
+def som_update_numba(neurons, sums, counts, positions, sigma, learning_rate):
+    m, f = neurons.shape
+    for k in nb.prange(m):
+        h = np.empty(m)
+        for b in range(m):
+            d2 = (positions[b, 0] - positions[k, 0]) ** 2 + (positions[b, 1] - positions[k, 1]) ** 2
+            h[b] = np.exp(-d2 / (2 * sigma * sigma))
+        for j in range(f):
+            num = 0.0
+            den = 0.0
+            for b in range(m):
+                if counts[b, j] > 0:
+                    num += h[b] * sums[b, j]
+                    den += h[b] * counts[b, j]
+            if den > 0:
+                neurons[k, j] += learning_rate * (num / den - neurons[k, j])
+
+
+def _as_batch(batch):
+    batch = np.asarray(getattr(batch, "values", batch), dtype=np.float32)
+    return np.ascontiguousarray(batch.reshape(batch.shape[0], -1))
+
+
+def _kmeans_plus_plus(data, k, rng):
+    """Pick k initial centers from the rows of a batch with the k-means++ rule."""
+    valid = data[~np.isnan(data).any(axis=1)]
+    data = valid if len(valid) >= k else np.nan_to_num(data)
+    centers = [data[rng.integers(len(data))]]
+    distances = np.full(len(data), np.inf)
+    for _ in range(1, k):
+        _, d = nearest_mtx_numba(data, np.array(centers[-1:], dtype=np.float32))
+        distances = np.minimum(distances, d)
+        total = distances.sum()
+        index = rng.choice(len(data), p=distances / total) if total > 0 else rng.integers(len(data))
+        centers.append(data[index])
+    return np.array(centers, dtype=np.float64)
+
+
+class MiniBatchKMeans():
+    """K-means updated batch by batch, each center moving to the running mean of the pixels assigned to it.
+
+    Parameters
+
+     - n_clusters <int, required>: Number of clusters.
+
+     - seed <int, optional>: Seed of the k-means++ initialization on the first batch.
+
+    Methods:
+
+        partial_fit, predict, inertia
+    """
+
+    def __init__(self, n_clusters, seed=0):
+        """Build an untrained model."""
+        self.n_clusters = n_clusters
+        self.seed = seed
+        self.centers = None
+        self.counts = None
+        self.n_batches = 0
+
+    def partial_fit(self, batch):
+        """Update the centers with a (pixel, feature) batch."""
+        data = _as_batch(batch)
+        if self.centers is None:
+            self.centers = _kmeans_plus_plus(data, self.n_clusters, np.random.default_rng(self.seed))
+            self.counts = np.zeros(self.centers.shape)
+        labels, _ = nearest_mtx_numba(data, self.centers)
+        sums, counts = cluster_sums_numba(data, labels, self.n_clusters)
+        total = self.counts + counts
+        updated = counts > 0
+        self.centers[updated] = (self.centers[updated] * self.counts[updated] + sums[updated]) / total[updated]
+        self.counts = total
+        self.n_batches += 1
+        return self
+
+    def predict(self, batch):
+        """Return the cluster of each pixel of a (pixel, feature) batch."""
+        labels, _ = nearest_mtx_numba(_as_batch(batch), self.centers)
+        return labels
+
+    def inertia(self, batch):
+        """Return the sum of squared distances of the pixels of a batch to their centers."""
+        _, distances = nearest_mtx_numba(_as_batch(batch), self.centers)
+        return float(distances.sum())
+
+
+class SOM():
+    """Self-organizing map of rows x cols neurons trained with the batch rule on mini-batches.
+
+    Each batch moves every neuron toward the mean of the pixels of the neurons around it, weighted by
+    a gaussian of the map distance. The radius and the learning rate decay exponentially over
+    `decay_steps` batches. Neurons are ordered by row, as expected by plot.plot_codebooks and
+    plot.plot_cluster_map.
+
+    Parameters
+
+     - rows <int, required>: Rows of the map.
+
+     - cols <int, optional>: Columns of the map, rows by default.
+
+     - sigma <float, optional>: Initial neighborhood radius, half of the map by default.
+
+     - sigma_end <float, optional>: Final neighborhood radius.
+
+     - learning_rate <float, optional>: Initial learning rate.
+
+     - learning_rate_end <float, optional>: Final learning rate.
+
+     - decay_steps <int, optional>: Batches until the final radius and learning rate.
+
+     - seed <int, optional>: Seed of the initialization with pixels of the first batch.
+
+    Methods:
+
+        partial_fit, predict, quantization_error
+    """
+
+    def __init__(self, rows, cols=None, sigma=None, sigma_end=0.5, learning_rate=0.5, learning_rate_end=0.01,
+                 decay_steps=100, seed=0):
+        """Build an untrained map."""
+        self.rows = rows
+        self.cols = cols or rows
+        self.sigma = sigma or max(self.rows, self.cols) / 2
+        self.sigma_end = sigma_end
+        self.learning_rate = learning_rate
+        self.learning_rate_end = learning_rate_end
+        self.decay_steps = decay_steps
+        self.seed = seed
+        self.neurons = None
+        self.n_batches = 0
+        self.positions = np.array([(i, j) for i in range(self.rows) for j in range(self.cols)], dtype=np.float64)
+
+    def _schedule(self):
+        progress = min(self.n_batches / max(self.decay_steps, 1), 1.0)
+        sigma = self.sigma * (self.sigma_end / self.sigma) ** progress
+        learning_rate = self.learning_rate * (self.learning_rate_end / self.learning_rate) ** progress
+        return sigma, learning_rate
+
+    def partial_fit(self, batch):
+        """Update the neurons with a (pixel, feature) batch."""
+        data = _as_batch(batch)
+        if self.neurons is None:
+            rng = np.random.default_rng(self.seed)
+            rows = rng.choice(len(data), len(self.positions), replace=len(data) < len(self.positions))
+            self.neurons = np.nan_to_num(data[rows]).astype(np.float64)
+        labels, _ = nearest_mtx_numba(data, self.neurons)
+        sums, counts = cluster_sums_numba(data, labels, len(self.positions))
+        sigma, learning_rate = self._schedule()
+        som_update_numba(self.neurons, sums, counts, self.positions, sigma, learning_rate)
+        self.n_batches += 1
+        return self
+
+    def predict(self, batch):
+        """Return the best matching neuron of each pixel of a (pixel, feature) batch."""
+        labels, _ = nearest_mtx_numba(_as_batch(batch), self.neurons)
+        return labels
+
+    def quantization_error(self, batch):
+        """Return the mean distance of the pixels of a batch to their best matching neurons."""
+        _, distances = nearest_mtx_numba(_as_batch(batch), self.neurons)
+        return float(np.sqrt(distances).mean())
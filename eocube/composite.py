@@ -0,0 +1,224 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Streaming temporal reductions used to build composites one date at a time.
+
+Methods:
+
+    cloud_mask, PeriodAccumulator
+"""
+
+import re
+import warnings
+
+import numba as nb
+import numpy as np
+
+REDUCERS = ("mean", "median", "min", "max", "max_ndvi")
+
+
+def cloud_mask(cloud):
+    """Return the valid pixels of a SCL band (same classes kept by interpolate.nan_helper_numba)."""
+    return (cloud > 3) & (cloud <= 7)
+
+
+@nb.njit(parallel=True)
+def accumulate_mean_numba(values, valid, total, count):
+    nrows, ncols = values.shape
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            v = values[i, j]
+            if valid[i, j] and -10000 <= v <= 10000:
+                total[i, j] += v
+                count[i, j] += 1
+
+
+@nb.njit(parallel=True)
+def accumulate_extreme_numba(values, valid, out, use_max):
+    nrows, ncols = values.shape
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            v = values[i, j]
+            if valid[i, j] and -10000 <= v <= 10000:
+                if np.isnan(out[i, j]) or (use_max and v > out[i, j]) or (not use_max and v < out[i, j]):
+                    out[i, j] = v
+
+
+@nb.njit(parallel=True)
+def accumulate_best_numba(key, values, valid, best_key, best):
+    nbands, nrows, ncols = values.shape
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            k = key[i, j]
+            if valid[i, j] and -10000 <= k <= 10000 and k > best_key[i, j]:
+                best_key[i, j] = k
+                for b in range(nbands):
+                    best[b, i, j] = values[b, i, j]
+
+
+@nb.njit(parallel=True)
+def accumulate_histogram_numba(values, valid, hist, vmin, width):
+    nrows, ncols, nbins = hist.shape
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            v = values[i, j]
+            if valid[i, j] and -10000 <= v <= 10000:
+                b = int((v - vmin) / width)
+                if b < 0:
+                    b = 0
+                elif b >= nbins:
+                    b = nbins - 1
+                hist[i, j, b] += 1
+
+
+@nb.njit(parallel=True)
+def histogram_quantile_numba(hist, q, vmin, width):
+    nrows, ncols, nbins = hist.shape
+    out = np.empty((nrows, ncols), dtype=np.float32)
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            n = 0
+            for b in range(nbins):
+                n += hist[i, j, b]
+            if n == 0:
+                out[i, j] = np.nan
+                continue
+            # Same interpolation between order statistics used by np.quantile,
+            # taking the center of the bin of each order statistic
+            rank = q * (n - 1)
+            lo = int(rank)
+            hi = min(lo + 1, n - 1)
+            frac = rank - lo
+            lo_value = np.nan
+            cum = 0
+            for b in range(nbins):
+                c = hist[i, j, b]
+                if np.isnan(lo_value) and cum + c > lo:
+                    lo_value = vmin + width * (b + 0.5)
+                if cum + c > hi:
+                    out[i, j] = lo_value + frac * (vmin + width * (b + 0.5) - lo_value)
+                    break
+                cum += c
+    return out
+
+
+class PeriodAccumulator():
+    """Accumulate the dates of one output period and reduce them.
+
+    Mean, min, max and max_ndvi keep running accumulators. Median and percentiles keep the clear
+    values of the dates added (a period of a 16-day cube holds a few dates) and are exact; with
+    `bins`, periods longer than `bins` dates use a per-pixel histogram instead, approximate to the bin.
+
+    Parameters
+
+     - reducer <string, required>: One of mean, median, min, max, max_ndvi or a percentile like p90.
+
+     - shape <tuple, required>: The (band, y, x) shape of each date.
+
+     - key_index <int, optional>: Band used as key by max_ndvi, the value of every band is taken from the date with the highest key.
+
+     - bins <int, optional>: Number of histogram bins of approximate quantiles, exact quantiles by default.
+
+     - value_range <tuple, optional>: The (min, max) values covered by the histogram bins.
+
+     - n_dates <int, optional>: Number of dates of the period, compared with `bins`.
+
+    Raise
+
+     - ValueError: If the reducer is not supported.
+    """
+
+    def __init__(self, reducer, shape, key_index=None, bins=None, value_range=(-10000, 10000), n_dates=None):
+        """Allocate the accumulators of a single period."""
+        self.reducer = reducer
+        self.shape = shape
+        self.quantile = self._quantile(reducer)
+        if self.quantile is None and reducer not in REDUCERS:
+            raise ValueError(f"Invalid reducer {reducer}, use one of {REDUCERS} or a percentile like p90.")
+        if reducer == "max_ndvi" and key_index is None:
+            raise ValueError("The max_ndvi reducer needs the index band used as key.")
+        self.key_index = key_index
+        self.histogram = self.quantile is not None and bins is not None and (n_dates is None or n_dates > bins)
+
+        if reducer == "mean":
+            self.total = np.zeros(shape, dtype=np.float64)
+            self.count = np.zeros(shape, dtype=np.int32)
+        elif reducer in ("min", "max"):
+            self.out = np.full(shape, np.nan, dtype=np.float32)
+        elif reducer == "max_ndvi":
+            self.best_key = np.full(shape[1:], -np.inf, dtype=np.float32)
+            self.out = np.full(shape, np.nan, dtype=np.float32)
+        elif self.histogram:
+            self.vmin = float(value_range[0])
+            self.width = (float(value_range[1]) - self.vmin) / bins
+            self.hist = np.zeros((shape[0],) + tuple(shape[1:]) + (bins,), dtype=np.uint16)
+        else:
+            self.values = []
+
+    @staticmethod
+    def _quantile(reducer):
+        if reducer == "median":
+            return 0.5
+        match = re.fullmatch(r"p(\d{1,2}(\.\d+)?|100)", str(reducer))
+        if match:
+            return float(match.group(1)) / 100
+        return None
+
+    def add(self, data, valid):
+        """Add one date to the accumulators.
+
+        Parameters
+
+         - data <np.array, required>: The (band, y, x) values of the date.
+
+         - valid <np.array, required>: The (y, x) boolean mask of clear pixels.
+        """
+        data = data.astype(np.float32, copy=False)
+        valid = np.ascontiguousarray(valid, dtype=np.bool_)
+        if self.reducer == "mean":
+            for b in range(self.shape[0]):
+                accumulate_mean_numba(data[b], valid, self.total[b], self.count[b])
+        elif self.reducer in ("min", "max"):
+            for b in range(self.shape[0]):
+                accumulate_extreme_numba(data[b], valid, self.out[b], self.reducer == "max")
+        elif self.reducer == "max_ndvi":
+            accumulate_best_numba(data[self.key_index], data, valid, self.best_key, self.out)
+        elif self.histogram:
+            for b in range(self.shape[0]):
+                accumulate_histogram_numba(data[b], valid, self.hist[b], self.vmin, self.width)
+        else:
+            # Same valid range as the other accumulators
+            self.values.append(np.where(valid & (data >= -10000) & (data <= 10000), data, np.nan))
+
+    def result(self):
+        """Return the (band, y, x) float32 composite, NaN where no clear observation was found."""
+        if self.reducer == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return (self.total / self.count).astype(np.float32)
+        if self.histogram:
+            return np.stack([
+                histogram_quantile_numba(self.hist[b], self.quantile, self.vmin, self.width)
+                for b in range(self.shape[0])
+            ])
+        if self.quantile is not None:
+            if not self.values:
+                return np.full(self.shape, np.nan, dtype=np.float32)
+            with warnings.catch_warnings():
+                # All-NaN pixels (no clear date) give NaN
+                warnings.simplefilter("ignore", RuntimeWarning)
+                return np.nanquantile(np.stack(self.values), self.quantile, axis=0).astype(np.float32)
+        return self.out
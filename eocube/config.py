@@ -21,6 +21,19 @@ Environment Variables
 - EOCUBE_URL = "http://localhost:5000/eocube"
 - STAC_URL = "https://brazildatacube.dpi.inpe.br/stac/"
 - ACCESS_TOKEN = ""
+- SCHEDULER = None
+- DATASET_POOL_SIZE = 32
+- PREVIEW_CACHE_SIZE = 64
+- BAND_CACHE_BYTES = 256 * 2 ** 20
+- MEMORY_LIMIT = 2 * 2 ** 30
+- HTTP_POOL_SIZE = 32
+- HTTP_RETRIES = 5
+- HTTP_BACKOFF = 0.5
+- HTTP_BACKOFF_JITTER = 0.5
+- HTTP_RATE_LIMIT = 20
+- HTTP_BURST = 40
+- HTTP_TIMEOUT = 60
+- GDAL_ENV = {...}
 """
 
 import os
@@ -36,3 +49,53 @@ STAC_URL = 'https://brazildatacube.dpi.inpe.br/stac/'
 
 # Access token for users
 ACCESS_TOKEN = ""
+
+# Default dask scheduler used to compute data cubes: "threads", "processes",
+# "synchronous" or a distributed.Client (None uses the dask default)
+SCHEDULER = None
+
+# Maximum number of raster handles kept open by each worker thread
+DATASET_POOL_SIZE = 32
+
+# Maximum number of preview frames cached by DataCube.interactPlot
+PREVIEW_CACHE_SIZE = 64
+
+# Memory budget (bytes) of the band windows shared by Image.getNDVI, getNDWI, getNDBI and getRGB
+# in each process, 0 disables the cache
+BAND_CACHE_BYTES = 256 * 2 ** 20
+
+# Memory budget (bytes) used by DataCube.plan to size chunks and flag queries that do not fit
+MEMORY_LIMIT = 2 * 2 ** 30
+
+# Shared HTTP session (see eocube.session): connections kept alive by host, retries of
+# 429/5xx responses with jittered exponential backoff (seconds), requests per second
+# allowed by host (None disables the limit), burst size and default timeout (seconds)
+HTTP_POOL_SIZE = 32
+HTTP_RETRIES = 5
+HTTP_BACKOFF = 0.5
+HTTP_BACKOFF_JITTER = 0.5
+HTTP_RATE_LIMIT = 20
+HTTP_BURST = 40
+HTTP_TIMEOUT = 60
+
+# GDAL configuration options applied (through rasterio.Env) around every raster open and read of
+# eocube, in every thread and worker process. Options also set as environment variables keep the
+# environment value. Change them before creating worker processes that are spawned (not forked).
+GDAL_ENV = {
+    # Do not list the remote directory when opening an asset
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.TIF,.tiff,.TIFF",
+    # Read the COG header (IFDs and tile offsets) with a single request
+    "GDAL_INGESTED_BYTES_AT_OPEN": 32768,
+    # Merge consecutive range requests and multiplex them over HTTP/2
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "GDAL_HTTP_VERSION": "2",
+    "GDAL_HTTP_MAX_RETRY": 3,
+    "GDAL_HTTP_RETRY_DELAY": 1,
+    # Block cache (MB) and cache of the downloaded ranges (bytes)
+    "GDAL_CACHEMAX": 512,
+    "VSI_CACHE": "TRUE",
+    "VSI_CACHE_SIZE": 64 * 2 ** 20,
+    "CPL_VSIL_CURL_CACHE_SIZE": 128 * 2 ** 20,
+}
@@ -16,16 +16,29 @@ You can redistribute it and/or modify it under the terms of the GNU General Publ
 the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
 """
 
+import copy
 import datetime
+import json
+import math
+import os
+import threading
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 import pystac_client
+import rasterio.warp
+from pystac_client.stac_api_io import StacApiIO
 import xarray as xr
 import logging
 from typing import List, Tuple, Dict, Optional
 from dask import delayed, compute
+from dask.base import tokenize
+from dask.utils import parse_bytes
+import dask.array as da
 from ipywidgets import interact
 import re
 from IPython.core.display import display, HTML
@@ -35,14 +48,86 @@ from dask.diagnostics import ProgressBar
 
 from eocube import config
 
-from .image import Image
+from .catalog import ImageMap, ItemTable
+from .composite import PeriodAccumulator, cloud_mask
+from .export import TableWriter, pixel_schema, pixel_table, write_cog
+from .features import feature_names, features_mtx_numba
+from .grid import Grid
+from .image import read_band
+from .mosaic import mosaic_band, mosaic_winner
+from .planner import asset_plan, recommend_chunk_rows
+from .phenology import (PHENOLOGY_METRICS, phenology_mtx_numba, savgol_coefficients, savgol_mtx_numba,
+                        whittaker_mtx_numba)
+from .session import mount
+from .shared import share
+from .sampling import block_cells, point_labels, read_samples, stratify
 from .spectral import Spectral
-from .utils import Utils
+from .store import META_FILE, TIME_FORMAT, merge_meta, save_date, stored_dates
+from .tiles import TileArrays, fill_index, half_step, regular_times
+from .utils import Utils, open_dataset
+from .zonal import ZonalAccumulator, rasterize_zones, zone_geometries
 from .api_check import *
 
 warnings.filterwarnings("ignore")
 
 
+def _read_block(href, band, bbox, grid, rows):
+    """Read a block of rows of a band as a (1, rows, x) chunk."""
+    return read_band(href, band, bbox, grid, rows=rows)[np.newaxis]
+
+
+def _predict_block(values, model):
+    """Predict the (y, x) clusters of a (band, time, y, x) block."""
+    matrix = values.reshape(values.shape[0] * values.shape[1], -1).T.astype(np.float32)
+    return np.asarray(model.predict(matrix), dtype=np.int32).reshape(values.shape[2:])
+
+
+def _mosaic_block(winner, hrefs, band, grid, rows):
+    """Read a block of rows of a band of the mosaic of a date from its winner map as a (1, rows, x) chunk."""
+    return mosaic_band(winner, hrefs, band, grid, rows)[np.newaxis]
+
+
+def _composite_block(values, reducer, cloud_index, key_index, bins, value_range):
+    """Reduce a (band, time, y, x) block holding the dates of one period into a (band, y, x) composite."""
+    keep = [idx for idx in range(values.shape[0]) if idx != cloud_index]
+    accumulator = PeriodAccumulator(reducer, (len(keep),) + values.shape[2:], key_index=key_index, bins=bins,
+                                    value_range=value_range, n_dates=values.shape[1])
+    for t in range(values.shape[1]):
+        valid = cloud_mask(values[cloud_index, t]) if cloud_index is not None else np.ones(values.shape[2:], dtype=bool)
+        accumulator.add(values[keep, t], valid)
+    return accumulator.result()
+
+
+def _to_matrix(values):
+    """Reshape a (time, y, x) block into a contiguous (pixel, time) matrix."""
+    return np.ascontiguousarray(values.reshape(values.shape[0], -1).T)
+
+
+def _smooth_block(values, cloud, method, coeffs, lmbda):
+    mtx = _to_matrix(values).astype(np.float32)
+    if method == "savgol":
+        smoothed = savgol_mtx_numba(mtx, _to_matrix(cloud), coeffs)
+    else:
+        smoothed = whittaker_mtx_numba(mtx, _to_matrix(cloud), lmbda)
+    return smoothed.T.reshape(values.shape)
+
+
+def _features_block(values, cloud, days, quantiles, harmonics):
+    # Mask the dates discarded by interpolate.nan_helper_numba before computing the features
+    values = values.astype(np.float32)
+    invalid = (cloud > 7) | (cloud <= 3)
+    values[(values > 10000) | (values < -10000) | invalid[np.newaxis]] = np.nan
+    cube = np.ascontiguousarray(values.reshape(values.shape[:2] + (-1,)).transpose(2, 0, 1))
+    matrix = features_mtx_numba(cube, days, quantiles, harmonics)
+    return matrix.T.reshape((matrix.shape[1],) + values.shape[2:])
+
+
+def _phenology_block(values, cloud, method, coeffs, lmbda, days, threshold):
+    smoothed = _to_matrix(_smooth_block(values, cloud, method, coeffs, lmbda))
+    metrics = phenology_mtx_numba(smoothed, days, threshold)
+    return metrics.T.reshape((len(PHENOLOGY_METRICS),) + values.shape[1:])
+
+
 class DataCube:
     """
     Abstraction to create earth observation data cubes using images collected by STAC.py.
@@ -54,15 +139,41 @@ class DataCube:
     - start_date: str - Start date formatted as "yyyy-mm-dd".
     - end_date: str - End date formatted as "yyyy-mm-dd".
     - limit: int - Limit of response images in decreasing order.
+    - scheduler: str or distributed.Client - Dask scheduler used to compute the cube ("threads", "processes",
+      "synchronous" or a `distributed.Client`). Defaults to `config.SCHEDULER`.
+    - resolution: float - Pixel size (CRS units) of the target grid of the cube, the finest resolution of the
+      query bands by default. Every band is resampled to this grid while reading.
+    - resampling: str or Dict[str, str] - Resampling method (nearest, bilinear, average, ...) for all bands or by
+      band, used when a band resolution differs from the grid. Defaults to nearest.
+    - snap: bool - Expand reads to the internal blocks of each asset and crop in memory, so windows are fetched
+      with the minimum number of contiguous range requests. Defaults to False.
+    - memory_limit: int or str - Memory budget (bytes or a string like "4GB"). When given, `search` returns a lazy
+      cube split in blocks of rows of one date sized to the budget (see `plan`), optionally written to disk,
+      instead of a single in-memory array. Defaults to None (eager search).
+    - quality_band: str - SCL band used to mosaic the items of a tile sharing a date (overlapping scenes or several
+      collections): each pixel takes the item with the best SCL class. Without it, the first item with data wins.
+    - priority: List[str] - Collections by priority when mosaicking, `collections` order by default. Items of the
+      same collection are ordered by cloud cover.
     
     Methods:
     - nearTime
     - search
+    - subset
+    - plan
+    - save
+    - to_cog
+    - to_parquet
+    - zonal_stats
+    - sample
+    - pixel_batches
+    - train
+    - cluster_map
     - getTimeSeries
     - calculateNDVI
     - calculateNDBI
     - calculateNDWI
     - calculateColorComposition
+    - composite
     - classifyDifference
     - interactPlot
     
@@ -81,7 +192,9 @@ class DataCube:
     # result = xr.concat([result1, result2], dim='y')
 
     def __init__(self, collections: List[str], query_bands: List[str], 
-                 start_date: str, end_date: str, limit: int = 100, tiles: List[str] = None,bbox: Tuple[float, float, float, float] = None,formulas: List[str] = None ):
+                 start_date: str, end_date: str, limit: int = 100, tiles: List[str] = None,bbox: Tuple[float, float, float, float] = None,formulas: List[str] = None,
+                 scheduler=None, resolution: Optional[float] = None, resampling=None, snap: bool = False,
+                 memory_limit=None, quality_band: Optional[str] = None, priority: Optional[List[str]] = None):
         check_that(collections, msg="Please insert a list of available collections!")
         check_that(query_bands, msg="Please insert a list of available bands with query_bands!")
         #check_that(bbox, msg="Please insert a bounding box parameter!")
@@ -96,6 +209,13 @@ class DataCube:
             self.bbox = self._validate_bbox(bbox)
         self.start_date, self.end_date = self._validate_dates(start_date, end_date)
         self.tiles = tiles
+        self.scheduler = scheduler
+        self.resolution = resolution
+        self.resampling = resampling
+        self.snap = snap
+        self.memory_limit = parse_bytes(memory_limit) if isinstance(memory_limit, str) else memory_limit
+        self.quality_band = quality_band
+        self.priority = priority
 
         self.stac_client = self._initialize_stac_client()
         try:
@@ -105,26 +225,113 @@ class DataCube:
             pass
 
         self.timeline = []
+        self.timelines = {}
+        self.tile_images = {}
+        self.tile_rows = {}
+        self.tile_groups = {}
+        self.grids = {}
         self.data_images = {}
         self.data_array = None
+        self._preview_cache = OrderedDict()
+        self._preview_lock = threading.Lock()
+        self._preview_pool = None
 
         
 
         items = self._search_stac(limit)
+        table_bands = self._bands_to_query() | ({quality_band} if quality_band else set())
+        self.table = ItemTable([item for tile_items in items for item in tile_items], table_bands)
+        del items
+        self._build_from_rows(self.table.query())
+
+    def _bands_to_query(self):
+        """Return the query bands plus the bands used by the formulas."""
+        if self.formulas:
+            return set(self.query_bands) | set(self._extract_bands(self.formulas))
+        return set(self.query_bands)
+
+    def _build_from_rows(self, groups, known_grids=None):
+        """Build the grids and lazy arrays of each tile from rows of the item table grouped by tile.
+
+        Images are not created here: `tile_images` and `data_images` materialize them on access.
+
+        Parameters:
+        - groups: List[np.ndarray] - The table rows of each tile, as returned by ItemTable.query.
+        - known_grids: Dict[str, Grid] - Grids to reuse by tile.
+        """
         self.xr_arrays = []
         self.n_tiles = []
-        for item in items:
-            images,bands_to_query = self._create_images_from_items(item)
-            self.query_bands = bands_to_query
-            if not images:
+        self.tile_rows = {}
+        self.tile_groups = {}
+        date_rows = {}
+        if not len(groups):
+            raise ValueError("No data cube created!")
+        for rows in groups:
+            rows = self._complete_rows(rows)
+            if not len(rows):
                 raise ValueError("No data cube created!")
-
-            self.data_images, self.data_array = self._build_data_array(images)
+            tile = self.table.tiles[rows[0]]
+            grid = known_grids.get(tile) if known_grids else None
+            if grid is None:
+                grid = self._build_grid(rows)
+
+            # Items sharing a date are mosaicked, the first one by priority stands for the date
+            dates = {}
+            for row in self.table.order(rows, self.priority or self.collections):
+                dates.setdefault(self.table.time(row), []).append(row)
+            self.data_array = self._build_data_array(dates, grid)
+            entries = {time: (group[0], grid) for time, group in dates.items()}
+            date_rows.update(entries)
+            self.timelines[self.tiles] = self.timeline
+            self.tile_rows[self.tiles] = {time: row for time, (row, _) in entries.items()}
+            self.tile_groups[self.tiles] = {time: group for time, group in dates.items() if len(group) > 1}
+            self.tile_images[self.tiles] = ImageMap(self.table, entries, self.query_bands, self.bbox)
+            self.grids[self.tiles] = grid
             self.n_tiles.append(self.tiles)
             self.xr_arrays.append(self.data_array)
-        self.final_array = xr.concat(self.xr_arrays, dim = "tile")
+        self.data_images = ImageMap(self.table, date_rows, self.query_bands, self.bbox)
+        # Tiles keep their own timelines instead of being padded with the dates of the others
+        self.final_array = TileArrays(dict(zip(self.n_tiles, self.xr_arrays)))
+        self.timeline = self.final_array.timeline
         del self.data_array
 
+    def subset(self, bbox: Optional[Tuple[float, float, float, float]] = None, start_date: Optional[str] = None,
+               end_date: Optional[str] = None, tiles: Optional[List[str]] = None):
+        """Return a new lazy cube over a smaller area or period, selected from the items already found.
+
+        No STAC query is made: the items come from the in-memory item table of this cube. Grids
+        and open raster handles are reused when the bounding box does not change.
+
+        Parameters:
+        - bbox: Tuple[float, float, float, float], optional - New bounding box (defaults to the cube bbox).
+        - start_date: str, optional - New start date formatted as "yyyy-mm-dd".
+        - end_date: str, optional - New end date formatted as "yyyy-mm-dd".
+        - tiles: List[str], optional - Keep only these tiles.
+
+        Raises:
+        - ValueError: If the dates are invalid or no item matches the subset.
+        """
+        bbox = self._validate_bbox(bbox) if bbox else self.bbox
+        start_date, end_date = self._validate_dates(start_date or self.start_date, end_date or self.end_date)
+        groups = self.table.query(bbox, start_date, end_date, tiles)
+        if not groups:
+            raise ValueError("No data cube created!")
+
+        cube = copy.copy(self)
+        cube.table = self.table.take(np.sort(np.concatenate(groups)))
+        cube.bbox = bbox
+        cube.start_date, cube.end_date = start_date, end_date
+        cube.tiles = tiles
+        cube.timeline = []
+        cube.timelines = {}
+        cube.tile_images = {}
+        cube.grids = {}
+        cube._preview_cache = OrderedDict()
+        cube._preview_lock = threading.Lock()
+        cube._preview_pool = None
+        cube._build_from_rows(cube.table.query(), self.grids if bbox == self.bbox else None)
+        return cube
+
     def __str__(self):
         collections_str = ', '.join(self.collections)
         query_bands_str = ', '.join(self.query_bands)
@@ -186,7 +393,10 @@ class DataCube:
 
     def _initialize_stac_client(self):
         parameters = dict(access_token=config.ACCESS_TOKEN)
-        return pystac_client.Client.open(config.STAC_URL, parameters=parameters)
+        # STAC queries share the pooled, retrying and rate limited adapter of eocube.session
+        stac_io = StacApiIO(parameters=parameters)
+        mount(stac_io.session)
+        return pystac_client.Client.open(config.STAC_URL, parameters=parameters, stac_io=stac_io)
 
     def _validate_bbox(self, bbox):
         check_bbox_format(bbox, msg="Invalid bounding box parameter!")
@@ -201,11 +411,13 @@ class DataCube:
             # Decide se deve buscar por bbox ou tiles
             if self.bbox:
                 # Busca usando bbox
+                # With tiles too, only the items of those tiles are returned
                 item_search = self.stac_client.search(
                     collections=self.collections,
                     bbox=self.bbox,
                     datetime=f'{self.start_date}/{self.end_date}',
-                    limit=limit
+                    limit=limit,
+                    **({"query": {"bdc:tile": {"in": self.tiles}}} if self.tiles else {})
                 )
             elif self.tiles:
                 # Busca usando query para tiles
@@ -226,6 +438,8 @@ class DataCube:
                 items = list(item_search.get_items())
             pattern = re.compile(r"_(\d{6})_\d{8}$")
             unique_tiles = sorted({pattern.findall(item.id)[0] for item in items if pattern.findall(item.id)})
+            if self.tiles:
+                unique_tiles = [tile for tile in unique_tiles if tile in self.tiles]
             return [[item for item in items if tile in item.id] for tile in unique_tiles]
         except Exception as e:
             logging.error("Failed to search STAC service.", exc_info=True)
@@ -236,38 +450,46 @@ class DataCube:
         return sorted(set(band_pattern.findall(' '.join(formulas))))
 
     
-    def _create_images_from_items(self, items):
-        images = []
-        if self.formulas:
-            bands_to_query_set = set(self.query_bands) | set(self._extract_bands(self.formulas))
-        else:
-            bands_to_query_set = set(self.query_bands)
-
-        if items:
-            for item in items:
-                available_bands = sorted([band for band in list(item.assets.keys())])
-                bands_to_query = [band for band in available_bands if band in bands_to_query_set]
-             
-                if all(band in available_bands for band in bands_to_query_set):
-                    images.append(Image(item=item, bands=bands_to_query, bbox=self.bbox))
-                else:
-                    missing_bands = bands_to_query_set - set(available_bands)
-                    print(f"As seguintes bandas a serem consultadas não estão disponíveis no item: {missing_bands}")
-
-        return images, bands_to_query
-    
-    def _build_data_array(self, images):
+    def _complete_rows(self, rows):
+        """Keep the rows having every band to query and set `query_bands`."""
+        bands_to_query_set = self._bands_to_query()
+        rows, missing_bands = self.table.complete(rows, bands_to_query_set)
+        if missing_bands:
+            print(f"As seguintes bandas a serem consultadas não estão disponíveis no item: {missing_bands}")
+        self.query_bands = sorted(bands_to_query_set)
+        return rows
+
+    def _build_grid(self, rows):
+        """Build the target grid of a tile from the raster headers of its first row."""
+        datasets = [open_dataset(self.table.hrefs[band][rows[0]]) for band in self.query_bands]
+        bbox = Utils.reproj_bbox(self.bbox, 4326) if self.bbox else None
+        return Grid.from_datasets(datasets, bbox, self.resolution, self.resampling, self.snap)
+
+    def _build_data_array(self, dates, grid):
         x_data = {}
-        for image in images:
-            date = image.time
-            self.data_images[date] = image
+        for date, rows in dates.items():
+            row = rows[0]
             x_data[date] = []
+            if len(rows) > 1:
+                # Several items on the date: the winner map is computed once and shared by the band tasks
+                ids = list(self.table.ids[rows])
+                token = tokenize(ids, grid.key(self.query_bands[0]), self.bbox, self.quality_band)
+                reference_hrefs, reference, quality_hrefs, quality_band = self._winner_args(rows)
+                winner = delayed(mosaic_winner)(reference_hrefs, reference, grid, quality_hrefs, quality_band,
+                                                dask_key_name=f"winner-{token}")
             for band in self.query_bands:
-                data = delayed(image.getBand)(band)
+                # One task per item (or mosaic) and band, so reading a band does not read the others
+                token = tokenize(list(self.table.ids[rows]), grid.key(band), self.bbox)
+                if len(rows) > 1:
+                    data = delayed(mosaic_band)(winner, [self.table.hrefs[band][r] for r in rows], band, grid,
+                                                dask_key_name=f"mosaic-{band}-{token}")
+                else:
+                    data = delayed(read_band)(self.table.hrefs[band][row], band, self.bbox, grid,
+                                              dask_key_name=f"read-{band}-{token}")
                 x_data[date].append({str(band): data})
 
         self.timeline = sorted(list(x_data.keys()))
-        self.tiles = image.tile
+        self.tiles = self.table.tiles[row]
 
         data_timeline = {}
         for i in range(len(self.query_bands)):
@@ -279,7 +501,7 @@ class DataCube:
         for band in self.query_bands:
             time_series.append(data_timeline[band])
 
-        return self.data_images, xr.DataArray(
+        return xr.DataArray(
             np.array(time_series),
             coords={"band": self.query_bands, "time": self.timeline, "tile":  self.tiles},
             dims=["band", "time"],
@@ -287,6 +509,18 @@ class DataCube:
         )
 
 
+    def _winner_args(self, rows):
+        """Return the reference hrefs, the reference band, the quality hrefs and the quality band of mosaic.mosaic_winner."""
+        reference = self.query_bands[0]
+        quality = [self.table.hrefs[self.quality_band][row] for row in rows] if self.quality_band else None
+        return [self.table.hrefs[reference][row] for row in rows], reference, quality, self.quality_band
+
+    def _mosaic_hrefs(self, rows, bands):
+        """Return the hrefs (by item, by band), the bands, the quality hrefs and the quality band of items sharing a date."""
+        hrefs = [[self.table.hrefs[band][row] for band in bands] for row in rows]
+        quality = [self.table.hrefs[self.quality_band][row] for row in rows] if self.quality_band else None
+        return hrefs, list(bands), quality, self.quality_band
+
     def _get_collections_description(self):
         description = {}
         for collection in self.collections:
@@ -294,6 +528,203 @@ class DataCube:
             description[str(response.id)] = str(response.title)
         return description
 
+    def _compute(self, *tasks, scheduler=None):
+        """Compute delayed tasks with the scheduler selected for this cube.
+
+        Parameters:
+        - tasks: Delayed objects to compute.
+        - scheduler: str or distributed.Client, optional - Overrides the cube scheduler for this call.
+        """
+        if scheduler is None:
+            scheduler = self.scheduler if self.scheduler is not None else config.SCHEDULER
+        if hasattr(scheduler, "get"):
+            # distributed.Client reports progress on its own dashboard
+            return compute(*tasks, scheduler=scheduler)
+        with ProgressBar():
+            return compute(*tasks, scheduler=scheduler)
+
+    def _local_scheduler(self, scheduler=None):
+        """Return the scheduler of a call whose tasks write to files opened by this process (threads or synchronous)."""
+        if scheduler is None:
+            scheduler = self.scheduler if self.scheduler is not None else config.SCHEDULER
+        if scheduler in ("synchronous", "sync", "single-threaded"):
+            return scheduler
+        return "threads"
+
+    def _select_tile(self, tile=None):
+        """Return the delayed (band, time) array and the timeline of a tile (first tile by default)."""
+        tile = tile or self.n_tiles[0]
+        if tile not in self.final_array:
+            raise KeyError(f"Tile {tile} is not available in the cube tiles {self.n_tiles}.")
+        return self.final_array[tile], self.timelines[tile]
+
+    def _band_stack(self, band, tile=None, chunk_rows=256):
+        """Return a band of a tile as a lazy (time, y, x) dask array read in blocks of rows.
+
+        Each chunk reads `chunk_rows` rows of a single date, so later operations can work
+        on spatial blocks without loading whole dates.
+        """
+        if band not in self.query_bands:
+            raise KeyError(f"Band {band} is not available in the cube bands {self.query_bands}.")
+        tile = tile or self.n_tiles[0]
+        rows, grid = self.tile_rows[tile], self.grids[tile]
+        hrefs = self.table.hrefs[band]
+        timeline = sorted(rows)
+        height, width = grid.height, grid.width
+        chunk_rows = min(chunk_rows or height, height)
+        row_blocks = [(start, min(start + chunk_rows, height)) for start in range(0, height, chunk_rows)]
+
+        groups = self.tile_groups.get(tile, {})
+        name = "stack-" + tokenize(band, [list(self.table.ids[groups.get(time, [rows[time]])]) for time in timeline],
+                                   grid.key(band), self.bbox, self.quality_band, row_blocks)
+        dsk = {}
+        for t, time in enumerate(timeline):
+            if time in groups:
+                # The winner map of a block is one task shared by the stacks of every band
+                reference_hrefs, reference, quality_hrefs, quality_band = self._winner_args(groups[time])
+                winner = "winner-" + tokenize(list(self.table.ids[groups[time]]), grid.key(reference), self.bbox,
+                                              quality_band, row_blocks)
+                band_hrefs = [hrefs[row] for row in groups[time]]
+            for k, block in enumerate(row_blocks):
+                if time in groups:
+                    dsk[(winner, k)] = (mosaic_winner, reference_hrefs, reference, grid, quality_hrefs, quality_band,
+                                        block)
+                    dsk[(name, t, k, 0)] = (_mosaic_block, (winner, k), band_hrefs, band, grid, block)
+                else:
+                    dsk[(name, t, k, 0)] = (_read_block, hrefs[rows[time]], band, self.bbox, grid, block)
+        chunks = ((1,) * len(timeline), tuple(stop - start for start, stop in row_blocks), (width,))
+        dtype = open_dataset(hrefs[rows[timeline[0]]]).dtypes[0]
+        return da.Array(dsk, name, chunks, dtype=dtype), timeline
+
+    def _output_bands(self, bands=None):
+        """Return the requested query bands and formulas, all of them by default.
+
+        Raises:
+        - KeyError: If a band is not a query band nor a formula.
+        """
+        available = list(self.query_bands) + list(self.formulas or [])
+        bands = bands or available
+        unknown = [band for band in bands if band not in available]
+        if unknown:
+            raise KeyError(f"Bands {unknown} are not available in the cube bands {available}.")
+        return bands
+
+    def _output_stack(self, bands, tile, chunk_rows):
+        """Return query bands and formulas of a tile as a lazy (band, time, y, x) array read in blocks of rows.
+
+        Bands not requested are culled from the graph when computed. Returns None for the array when a
+        formula uses an unknown band, and the timeline.
+        """
+        stacks = []
+        for band in self.query_bands:
+            values, timeline = self._band_stack(band, tile, chunk_rows)
+            stacks.append(values)
+        _data, bandas = self._apply_formulas(da.stack(stacks), self.query_bands)
+        if _data is None:
+            return None, timeline
+        return _data[[bandas.index(band) for band in bands]], timeline
+
+    def _chunk_layout(self, tile, workers, memory_limit, extra_bands=0):
+        """Return the bytes held by one grid row of a chunk (all bands of a date) and the recommended chunk rows.
+
+        A chunk holds the decoded blocks and the output values of every band, plus `extra_bands`
+        int16 bands computed from them (formulas).
+        """
+        rows, grid = self.tile_rows[tile], self.grids[tile]
+        first = [open_dataset(self.table.hrefs[band][rows[min(rows)]]) for band in self.query_bands]
+        bytes_per_row = sum(grid.width * np.dtype(dataset.dtypes[0]).itemsize for dataset in first)
+        chunk_bytes_per_row = 2 * bytes_per_row + extra_bands * grid.width * 2
+        block_rows = max(dataset.block_shapes[0][0] * abs(dataset.transform.e / grid.transform.e) for dataset in first)
+        return chunk_bytes_per_row, recommend_chunk_rows(grid, chunk_bytes_per_row, block_rows, workers, memory_limit)
+
+    def plan(self, mode: str = "search", chunk_rows: Optional[int] = None, workers: Optional[int] = None,
+             memory_limit: Optional[int] = None, tile: Optional[str] = None):
+        """Estimate the cost of reading the cube from STAC metadata and COG headers only, without reading pixels.
+
+        Parameters:
+        - mode: str - "search" (every date of a tile computed at once, as `search`) or "chunked"
+          (blocks of rows of one date per task, as `composite`, `smooth` and `features`).
+        - chunk_rows: int, optional - Rows of each chunk in chunked mode (the recommended value by default).
+        - workers: int, optional - Tasks running at the same time, the number of CPUs by default.
+        - memory_limit: int, optional - Memory budget in bytes, the cube `memory_limit` or `config.MEMORY_LIMIT` by default.
+        - tile: str, optional - Plan a single tile (all tiles by default).
+
+        Returns a pandas.DataFrame with one row per tile, band and date: the source window (col_off, row_off,
+        width, height), internal blocks touched, expected range requests, compressed and decompressed bytes
+        and output bytes on the grid. `attrs["summary"]` holds, per tile, the totals, the peak memory of the
+        mode, the recommended `chunk_rows` and whether the peak fits the memory limit.
+
+        Raises:
+        - ValueError: If the mode is unknown.
+        """
+        if mode not in ("search", "chunked"):
+            raise ValueError("Please insert a valid mode: search or chunked.")
+        workers = workers or os.cpu_count() or 1
+        memory_limit = memory_limit or self.memory_limit or config.MEMORY_LIMIT
+        records = []
+        summary = {}
+        for _tile in ([tile] if tile else self.n_tiles):
+            rows, grid = self.tile_rows[_tile], self.grids[_tile]
+            timeline = sorted(rows)
+            chunk_bytes_per_row, recommended = self._chunk_layout(_tile, workers, memory_limit)
+
+            size = grid.height if mode == "search" else min(chunk_rows or recommended, grid.height)
+            row_blocks = [(start, min(start + size, grid.height)) for start in range(0, grid.height, size)]
+            for time in timeline:
+                for band in self.query_bands:
+                    dataset = open_dataset(self.table.hrefs[band][rows[time]])
+                    records.append(dict(tile=_tile, band=band, time=time, **asset_plan(dataset, grid, row_blocks)))
+
+            tile_plan = pd.DataFrame([record for record in records if record["tile"] == _tile])
+            date_decoded = tile_plan.groupby("time")["decompressed_bytes"].sum().max()
+            if mode == "search":
+                # Every date stays in memory, plus the decoded blocks of the dates being read
+                peak = int(tile_plan["output_bytes"].sum() + min(workers, len(timeline)) * date_decoded)
+            else:
+                peak = int(workers * size * chunk_bytes_per_row)
+            summary[_tile] = {
+                "dates": len(timeline),
+                "requests": int(tile_plan["requests"].sum()),
+                "compressed_bytes": int(tile_plan["compressed_bytes"].sum()),
+                "decompressed_bytes": int(tile_plan["decompressed_bytes"].sum()),
+                "output_bytes": int(tile_plan["output_bytes"].sum()),
+                "peak_memory": peak,
+                "chunk_rows": recommended,
+                "fits": peak <= memory_limit,
+            }
+
+        result = pd.DataFrame(records)
+        result.attrs["summary"] = summary
+        return result
+
+    def _apply_formulas(self, _data, bands):
+        """Append the formulas of the cube as new bands along the first axis of `_data`.
+
+        Parameters:
+        - _data: np.ndarray - Band values with the band as first dimension.
+        - bands: List[str] - Names of the bands in `_data`.
+
+        Returns the new data and band names, or None for the data when a formula uses an unknown band.
+        """
+        bandas = list(bands)
+        if not self.formulas:
+            return _data, bandas
+
+        for formula in self.formulas:
+            filter_bands = self._extract_bands([formula])
+
+            band_values = {band: _data[idx] for idx, band in enumerate(bands) if band in filter_bands}
+            try:
+                # Calculate the index value directly from the band_values dictionary
+                index_value = eval(formula, {}, band_values)
+                index_value = np.reshape(index_value, _data.shape[1:]).astype("int16")
+                _data = np.concatenate((_data, np.expand_dims(index_value, axis=0)), axis=0)
+                bandas.append(formula)
+            except NameError as e:
+                print(f"Error: {e}. Please check the input bands and formulas.")
+                return None, bandas
+        return _data, bandas
+
     def nearTime(self, time: str):
         _date = self.data_array.sel(time=time, method="nearest").time.values
         _date = datetime.datetime.utcfromtimestamp(_date.tolist() / 1e9)
@@ -301,7 +732,8 @@ class DataCube:
 
     def search(self, 
                start_date: Optional[str] = None, end_date: Optional[str] = None,
-               as_time_series: bool = False, tile: Optional[str] = None):
+               as_time_series: bool = False, tile: Optional[str] = None, scheduler=None,
+               store: Optional[str] = None):
         """Search method to retrieve data from delayed dataset and return all dataset for black searches but takes longer.
 
         Parameters:
@@ -310,45 +742,33 @@ class DataCube:
         - end_date <string, optional>: The string end date formatted "yyyy-mm-dd" to complete the interval and retrieve a dataset.
         - as_time_series <bool, optional>: If True, return the result as a time series.
         - formulas <list of string, optional>: Formulas to calculate additional indices.
+        - scheduler <string or distributed.Client, optional>: Dask scheduler for this search, overrides the cube scheduler.
+        - store <string, optional>: With `memory_limit`, path of a .npy file where the cube is written block by block;
+          the result is then backed by the file (memory mapped) instead of a lazy dask array.
 
         Raise:
         - KeyError: If the given parameter does not exist.
         """
+        if self.memory_limit:
+            return self._search_chunked(as_time_series, tile, scheduler, store)
+
         _start_date = self.start_date
         _end_date = self.end_date
         _bands = self.query_bands
-        _timeline = self.timeline
-        _formulas = self.formulas
 
-        if tile:
-            self.data_array = self.final_array.sel(tile = tile)
-        else:
-            self.data_array = self.final_array.isel(tile = 0)
+        # Each tile keeps its own dates
+        self.data_array, _timeline = self._select_tile(tile)
 
         tasks = [self.data_array.loc[band, _start_date:_end_date].values for band in _bands]
-        with ProgressBar():
-            computed_data = compute(*[item for sublist in tasks for item in sublist])
+        computed_data = self._compute(*[item for sublist in tasks for item in sublist], scheduler=scheduler)
 
         _data = np.array([computed_data[i:i+len(_timeline)] for i in range(0, len(computed_data), len(_timeline))])
         
         del computed_data
 
-        bandas = _bands.copy()
-
-        if _formulas:
-            # Calcule os valores das bandas e armazene em band_values
-            for formula in _formulas:
-                filter_bands = self._extract_bands([formula])
-
-                band_values = {band: _data[idx] for idx, band in enumerate(_bands) if band in filter_bands}
-                try:
-                    # Calculate the index value directly from the band_values dictionary
-                    index_value = eval(formula, {}, band_values)
-                    _data = np.concatenate((_data, np.expand_dims(np.squeeze(index_value).astype("int16"), axis=0)), axis=0)
-                    bandas.append(formula)
-                except NameError as e:
-                    print(f"Error: {e}. Please check the input bands and formulas.")
-                    return None
+        _data, bandas = self._apply_formulas(_data, _bands)
+        if _data is None:
+            return None
 
         if as_time_series:
             result = self.cube_to_time_series(_data, bandas, _timeline)
@@ -363,6 +783,898 @@ class DataCube:
         #result.attrs['product'] = self.description
         return result
     
+    def _search_chunked(self, as_time_series=False, tile=None, scheduler=None, store=None):
+        """Build the search result as a lazy cube with chunks of rows of one date sized to `memory_limit`."""
+        tile = tile or self.n_tiles[0]
+        workers = 1 if scheduler in ("synchronous", "sync", "single-threaded") else (os.cpu_count() or 1)
+        _, chunk_rows = self._chunk_layout(tile, workers, self.memory_limit, len(self.formulas or []))
+
+        stacks = []
+        for band in self.query_bands:
+            values, _timeline = self._band_stack(band, tile, chunk_rows)
+            stacks.append(values)
+        # Formulas are evaluated chunk by chunk, as the bands are aligned on the same blocks of rows
+        _data, bandas = self._apply_formulas(da.stack(stacks), self.query_bands)
+        if _data is None:
+            return None
+
+        if store:
+            target = np.lib.format.open_memmap(store, mode="w+", dtype=_data.dtype, shape=_data.shape)
+            # The memory mapped file is written by the threads of this process
+            self._compute(da.store(_data, target, lock=False, compute=False), scheduler=self._local_scheduler(scheduler))
+            target.flush()
+            del target
+            _data = np.load(store, mmap_mode="r")
+
+        if as_time_series:
+            return self.cube_to_time_series(_data, bandas, _timeline)
+        return xr.DataArray(
+            _data,
+            coords={"band": bandas, "time": _timeline, "y": range(_data.shape[2]), "x": range(_data.shape[3])},
+            dims=["band", "time", "y", "x"],
+            name="DataCube"
+        )
+
+    def align(self, freq: str = "16D", fill: str = "nearest", tile: Optional[str] = None,
+              bands: Optional[List[str]] = None, tolerance: Optional[str] = None, chunk_rows: Optional[int] = 256):
+        """Return the cube of a tile on a regular time grid as a lazy dask array, without reading pixels.
+
+        Tiles keep their own dates; this aligns one of them on request. The grid starts at the cube
+        start date and each of its dates takes a date of the tile chosen by `fill`, by default the
+        nearest one within half a step. A date of the tile filling several grid dates is read once.
+
+        Parameters:
+        - freq: str - The step of the grid as a pandas frequency ("16D", "1M" or "MS" for month starts, ...).
+        - fill: str - How grid dates are filled: "nearest" (default), "ffill" (last date before), "bfill"
+          (first date after) or "nan" (only grid dates that are dates of the tile, NaN elsewhere).
+        - tile: str, optional - The tile (first tile by default).
+        - bands: List[str], optional - Query bands and formulas (all of them by default).
+        - tolerance: str, optional - Maximum distance to the filling date ("8D", ...), NaN beyond it. Half
+          the step of the grid by default for "nearest", no limit for "ffill" and "bfill".
+        - chunk_rows: int, optional - Rows of each chunk of one date.
+
+        Returns a (band, time, y, x) xarray.DataArray, float32 when some grid dates are gaps. The coordinate
+        `source_time` holds the date of the tile filling each grid date (NaT for gaps).
+
+        Raises:
+        - ValueError: If the fill method is unknown.
+        - KeyError: If a band or the tile is not available.
+        """
+        bands = self._output_bands(bands)
+        tile = tile or self.n_tiles[0]
+        self._select_tile(tile)
+        times = regular_times(self.start_date, self.end_date, freq)
+        _data, timeline = self._output_stack(bands, tile, chunk_rows)
+        if _data is None:
+            return None
+
+        if fill == "nearest" and tolerance is None:
+            # A grid date is only filled by a tile date inside its own step
+            tolerance = half_step(times, freq)
+        index = fill_index(timeline, times, fill, tolerance)
+        gaps = index < 0
+        if gaps.any():
+            # One NaN date appended to the stack stands for every gap
+            _data = _data.astype(np.float32)
+            nan = da.full(_data.shape[:1] + (1,) + _data.shape[2:], np.nan, dtype=np.float32,
+                          chunks=(_data.chunks[0], (1,)) + _data.chunks[2:])
+            _data = da.concatenate([_data, nan], axis=1)
+            index = np.where(gaps, len(timeline), index)
+        source = np.array(list(timeline) + [None], dtype="datetime64[us]")[index]
+        return xr.DataArray(
+            _data[:, index],
+            coords={"band": bands, "time": times, "source_time": ("time", source), "y": range(_data.shape[2]),
+                    "x": range(_data.shape[3])},
+            dims=["band", "time", "y", "x"],
+            name="DataCube"
+        )
+
+    def _period_composites(self, freq, reducer, tile, index_band, cloud_band, bins, value_range, chunk_rows):
+        """Return the (start, lazy (band, y, x) composite) of each period and the band names.
+
+        Each chunk holds a block of rows of every date of its period and is reduced on its own.
+        """
+        tile = tile or self.n_tiles[0]
+        self._select_tile(tile)
+        bands = list(self.query_bands)
+        timeline = sorted(self.tile_rows[tile])
+        periods = pd.DatetimeIndex(timeline).to_period(freq)
+        longest = int(pd.Series(periods).value_counts().max())
+        if not chunk_rows:
+            _, chunk_rows = self._chunk_layout(tile, os.cpu_count() or 1, self.memory_limit or config.MEMORY_LIMIT,
+                                               len(self.formulas or []))
+            # A chunk holds every date of its period
+            chunk_rows = max(chunk_rows // longest, 1)
+
+        stacks = []
+        for band in bands:
+            values, _ = self._band_stack(band, tile, chunk_rows)
+            stacks.append(values)
+        _data, bandas = self._apply_formulas(da.stack(stacks), bands)
+        if _data is None:
+            return [], []
+
+        cloud_index = bandas.index(cloud_band) if cloud_band in bands else None
+        out_bands = [band for idx, band in enumerate(bandas) if idx != cloud_index]
+        if reducer == "max_ndvi" and index_band not in out_bands:
+            raise ValueError(f"The index band {index_band} is not available in the cube bands {out_bands}.")
+        key_index = out_bands.index(index_band) if reducer == "max_ndvi" else None
+        # Checks the reducer before building the graph
+        PeriodAccumulator(reducer, (0, 0, 0), key_index=key_index)
+
+        composites = []
+        for period in periods.unique():
+            indices = [t for t, time_period in enumerate(periods) if time_period == period]
+            period_data = _data[:, indices].rechunk({0: -1, 1: -1})
+            composite = da.map_blocks(
+                _composite_block, period_data, reducer, cloud_index, key_index, bins, value_range,
+                drop_axis=1, chunks=((len(out_bands),),) + period_data.chunks[2:], dtype=np.float32
+            )
+            composites.append((period.start_time, composite))
+        return composites, out_bands
+
+    def iter_composite(self, freq: str = "1M", reducer: str = "median", tile: Optional[str] = None,
+                       index_band: str = "NDVI", cloud_band: Optional[str] = "SCL", bins: Optional[int] = None,
+                       value_range: Tuple[float, float] = (-10000, 10000), chunk_rows: Optional[int] = None,
+                       scheduler=None):
+        """Yield one temporal composite per period, computed when reached.
+
+        Only the composite of the current period is kept in memory, and each of its blocks of rows
+        only holds the dates of the period. See `composite` for the parameters.
+
+        Yields:
+        - (pd.Timestamp, np.ndarray, List[str]) - Period start, (band, y, x) float32 composite and band names.
+        """
+        composites, out_bands = self._period_composites(freq, reducer, tile, index_band, cloud_band, bins,
+                                                        value_range, chunk_rows)
+        for start, composite in composites:
+            values, = self._compute(composite, scheduler=scheduler)
+            yield start, values, out_bands
+
+    def composite(self, freq: str = "1M", reducer: str = "median", tile: Optional[str] = None,
+                  index_band: str = "NDVI", cloud_band: Optional[str] = "SCL", bins: Optional[int] = None,
+                  value_range: Tuple[float, float] = (-10000, 10000), chunk_rows: Optional[int] = None):
+        """Reduce the cube over time into one composite per period (monthly, seasonal, ...), as a lazy cube.
+
+        Each chunk reads a block of rows of the dates of one period, masks clouds with the SCL band
+        and reduces them, so computing holds one block of each period in flight and the result.
+        Median and percentiles are exact; with `bins`, periods longer than `bins` dates use a
+        per-pixel histogram instead. Computing the result holds every period in memory: use
+        `iter_composite` to get them one at a time.
+
+        Parameters:
+        - freq <string, optional>: Pandas period frequency, e.g. "1M" (monthly), "3M" or "Q-NOV" (seasons starting in December).
+        - reducer <string, optional>: One of mean, median, min, max, max_ndvi or a percentile like p90.
+        - tile <string, optional>: The tile to composite, the first tile by default.
+        - index_band <string, optional>: Band (or formula) used as key by max_ndvi.
+        - cloud_band <string, optional>: Band with the SCL classes used as cloud mask, ignored if not in query_bands.
+        - bins <int, optional>: Histogram bins of approximate quantiles for long periods, exact quantiles by default.
+        - value_range <tuple, optional>: Range of values covered by the histogram bins.
+        - chunk_rows <int, optional>: Rows of each block (sized to `memory_limit` by default).
+
+        Returns a (band, time, y, x) float32 xarray.DataArray backed by dask, one date per period start.
+
+        Raise:
+        - ValueError: If the reducer is not supported or the index band does not exist.
+        """
+        composites, bandas = self._period_composites(freq, reducer, tile, index_band, cloud_band, bins, value_range,
+                                                     chunk_rows)
+        if not composites:
+            return None
+        _data = da.stack([composite for _, composite in composites], axis=1)
+        return xr.DataArray(
+            _data,
+            coords={"band": bandas, "time": [start for start, _ in composites], "y": range(_data.shape[2]),
+                    "x": range(_data.shape[3])},
+            dims=["band", "time", "y", "x"],
+            name="Composite"
+        )
+
+    def _nearest_date(self, timeline, date):
+        """Return the date of the timeline closest to the given date."""
+        _date = pd.Timestamp(date).to_pydatetime()
+        return min(timeline, key=lambda time: abs(time - _date))
+
+    def classifyDifference(self, band: str, limiar_min: float = 0, limiar_max: float = 0,
+                           pairs: Optional[List[Tuple[str, str]]] = None, tile: Optional[str] = None,
+                           chunk_rows: int = 256):
+        """Classify the difference of a band between pairs of dates as a lazy change cube.
+
+        Each block of rows of a pair is classified by a parallel kernel that reads the block of
+        both dates and writes the uint8 classes in place (1 where limiar_min < t2 - t1 <= limiar_max,
+        0 otherwise), so only the blocks being computed are held in memory.
+
+        Parameters:
+        - band <string, required>: The band (e.g. NDVI) to compare, must be one of query_bands.
+        - limiar_min <float, optional>: The minimum value classified to difference (<= 0).
+        - limiar_max <float, optional>: The maximum value classified to difference (>= 0).
+        - pairs <list of tuple, optional>: (t1, t2) dates to compare, the nearest dates of the timeline are used.
+          Consecutive dates are compared by default.
+        - tile <string, optional>: The tile to classify, the first tile by default.
+        - chunk_rows <int, optional>: Rows of each block.
+
+        Returns:
+        - xarray.DataArray (time, y, x) backed by dask, with the reference date of each pair in the `reference` coordinate.
+
+        Raise:
+        - KeyError: If the band is not available in the cube.
+        """
+        if band not in self.query_bands:
+            raise KeyError(f"Band {band} is not available in the cube bands {self.query_bands}.")
+        spectral = Spectral()
+        spectral._validate_limiar(limiar_min, limiar_max)
+
+        tile = tile or self.n_tiles[0]
+        self._select_tile(tile)
+        values, timeline = self._band_stack(band, tile, chunk_rows)
+        if pairs is None:
+            pairs = list(zip(timeline[:-1], timeline[1:]))
+        else:
+            pairs = [(self._nearest_date(timeline, t1), self._nearest_date(timeline, t2)) for t1, t2 in pairs]
+        if not pairs:
+            raise ValueError("At least two dates are needed to classify differences.")
+
+        changes = [
+            da.map_blocks(spectral._classify_change, values[timeline.index(t1)], values[timeline.index(t2)],
+                          limiar_min, limiar_max, dtype=np.uint8)
+            for t1, t2 in pairs
+        ]
+        grid = self.grids[tile]
+        return xr.DataArray(
+            da.stack(changes),
+            coords={"time": [t2 for _, t2 in pairs], "reference": ("time", [t1 for t1, _ in pairs]),
+                    "y": range(grid.height), "x": range(grid.width)},
+            dims=["time", "y", "x"],
+            name=f"Change_{band}"
+        )
+
+    def _smoothing_inputs(self, band, method, window, order, cloud_band, tile, chunk_rows):
+        """Return the band and cloud stacks (one chunk per block of rows) and the smoothing coefficients."""
+        if method not in ("savgol", "whittaker"):
+            raise ValueError("Please insert a valid smoothing method: savgol or whittaker!")
+        coeffs = savgol_coefficients(window, order) if method == "savgol" else np.zeros(1, dtype=np.float32)
+
+        values, timeline = self._band_stack(band, tile, chunk_rows)
+        if cloud_band in self.query_bands:
+            cloud, _ = self._band_stack(cloud_band, tile, chunk_rows)
+        else:
+            # SCL class 4 (vegetation) keeps every date valid
+            cloud = da.full(values.shape, 4, dtype=np.uint8, chunks=values.chunks)
+        return values.rechunk({0: -1}), cloud.rechunk({0: -1}), coeffs, timeline
+
+    def smooth(self, band: str = "NDVI", method: str = "savgol", window: int = 5, order: int = 2,
+               lmbda: float = 10.0, cloud_band: Optional[str] = "SCL", tile: Optional[str] = None,
+               chunk_rows: int = 256):
+        """Smooth the time series of every pixel of a band as a lazy cube.
+
+        Blocks of rows are read for all dates and smoothed by parallel numba kernels over the
+        (pixel, time) matrix. Dates masked by the SCL band are interpolated before the
+        Savitzky-Golay filter, or get zero weight in the Whittaker smoother.
+
+        Parameters:
+        - band <string, optional>: The band to smooth, must be one of query_bands.
+        - method <string, optional>: savgol (Savitzky-Golay) or whittaker.
+        - window <int, optional>: Odd number of dates of the Savitzky-Golay window.
+        - order <int, optional>: Polynomial order of the Savitzky-Golay filter.
+        - lmbda <float, optional>: Smoothing parameter of the Whittaker smoother.
+        - cloud_band <string, optional>: Band with the SCL classes, ignored if not in query_bands.
+        - tile <string, optional>: The tile to smooth, the first tile by default.
+        - chunk_rows <int, optional>: Number of rows read per block.
+
+        Raise:
+        - KeyError: If the band is not available in the cube.
+        - ValueError: If the method or the window are not valid.
+        """
+        values, cloud, coeffs, timeline = self._smoothing_inputs(band, method, window, order, cloud_band,
+                                                                tile, chunk_rows)
+        smoothed = da.map_blocks(_smooth_block, values, cloud, method, coeffs, float(lmbda), dtype=np.float32)
+        return xr.DataArray(
+            smoothed,
+            coords={"time": timeline, "y": range(smoothed.shape[1]), "x": range(smoothed.shape[2])},
+            dims=["time", "y", "x"],
+            name=f"Smoothed_{band}"
+        )
+
+    def phenology(self, band: str = "NDVI", method: str = "savgol", threshold: float = 0.5, window: int = 5,
+                  order: int = 2, lmbda: float = 10.0, cloud_band: Optional[str] = "SCL",
+                  tile: Optional[str] = None, chunk_rows: int = 256):
+        """Calculate phenology metrics of the smoothed time series of every pixel as a lazy cube.
+
+        The metrics (sos, eos, los, peak, peak_time, amplitude, base and integral) are returned
+        as bands. Times are given in days since the first date of the timeline, and the start
+        and end of season are found where the series crosses `threshold` of the seasonal amplitude.
+
+        Parameters:
+        - band <string, optional>: The vegetation index band, must be one of query_bands.
+        - method <string, optional>: savgol (Savitzky-Golay) or whittaker.
+        - threshold <float, optional>: Fraction of the amplitude defining the start and end of season.
+        - window, order, lmbda, cloud_band, tile, chunk_rows: See `smooth`.
+
+        Raise:
+        - KeyError: If the band is not available in the cube.
+        - ValueError: If the method or the window are not valid.
+        """
+        values, cloud, coeffs, timeline = self._smoothing_inputs(band, method, window, order, cloud_band,
+                                                                tile, chunk_rows)
+        days = np.array([(time - timeline[0]).total_seconds() / 86400 for time in timeline], dtype=np.float64)
+        metrics = da.map_blocks(
+            _phenology_block, values, cloud, method, coeffs, float(lmbda), days, float(threshold),
+            chunks=((len(PHENOLOGY_METRICS),),) + values.chunks[1:], dtype=np.float32
+        )
+        return xr.DataArray(
+            metrics,
+            coords={"band": list(PHENOLOGY_METRICS), "y": range(metrics.shape[1]), "x": range(metrics.shape[2])},
+            dims=["band", "y", "x"],
+            name=f"Phenology_{band}"
+        )
+
+    def features(self, bands: Optional[List[str]] = None, quantiles: Tuple[float, ...] = (0.1, 0.5, 0.9),
+                 harmonics: int = 1, cloud_band: Optional[str] = "SCL", tile: Optional[str] = None,
+                 chunk_rows: int = 256):
+        """Extract per-pixel time series features as a compact lazy (pixel, feature) float32 matrix.
+
+        For each band: mean, std, min, max, quantiles, slope per day, days of the minimum and
+        maximum and the amplitude and phase of annual harmonics, computed in one parallel pass
+        over each block of rows. Dates masked by the SCL band are ignored. The result can
+        replace `utils.concatenate_bands` to train models on tens of features instead of every
+        band and date.
+
+        Parameters:
+        - bands <list of string, optional>: Bands to describe, all query_bands but the cloud band by default.
+        - quantiles <tuple of float, optional>: Quantiles computed for each band.
+        - harmonics <int, optional>: Number of annual harmonics for each band.
+        - cloud_band <string, optional>: Band with the SCL classes, ignored if not in query_bands.
+        - tile <string, optional>: The tile to describe, the first tile by default.
+        - chunk_rows <int, optional>: Number of rows read per block.
+
+        Raise:
+        - KeyError: If a band is not available in the cube.
+        """
+        if bands is None:
+            bands = [band for band in self.query_bands if band != cloud_band]
+        stacks = []
+        for band in bands:
+            values, timeline = self._band_stack(band, tile, chunk_rows)
+            stacks.append(values.rechunk({0: -1}))
+        if cloud_band in self.query_bands:
+            cloud, _ = self._band_stack(cloud_band, tile, chunk_rows)
+            cloud = cloud.rechunk({0: -1})
+        else:
+            cloud = da.full(stacks[0].shape, 4, dtype=np.uint8, chunks=stacks[0].chunks)
+
+        days = np.array([(time - timeline[0]).total_seconds() / 86400 for time in timeline], dtype=np.float64)
+        names = feature_names(bands, quantiles, harmonics)
+        values = da.stack(stacks)
+        matrix = da.map_blocks(
+            _features_block, values, cloud, days, np.asarray(quantiles, dtype=np.float64), harmonics,
+            drop_axis=0, chunks=((len(names),),) + values.chunks[2:], dtype=np.float32
+        )
+        height, width = matrix.shape[1:]
+        result = xr.DataArray(
+            matrix.reshape(len(names), -1).T,
+            coords={"pixel": range(height * width), "feature": names},
+            dims=["pixel", "feature"],
+            name="Features"
+        )
+        result.attrs['y_dim'] = height
+        result.attrs['x_dim'] = width
+        return result
+
+    def zonal_stats(self, polygons, stats: Tuple[str, ...] = ("mean", "median"), bands: Optional[List[str]] = None,
+                    tiles: Optional[List[str]] = None, crs: str = "EPSG:4326", nodata: Optional[float] = None,
+                    chunk_rows: Optional[int] = None, scheduler=None):
+        """Calculate statistics of every polygon for every band and date, reading only the rows covered by polygons.
+
+        The polygons are rasterized once on the grid of each tile. Blocks of rows (every date) that
+        contain zone pixels are read in parallel batches sized to `memory_limit` (or
+        `config.MEMORY_LIMIT`), other blocks are never read, and each block is reduced at once for
+        every zone with bincount. A polygon over several tiles gets one row by tile.
+
+        Parameters:
+        - polygons: GeoJSON FeatureCollection, GeoDataFrame, Dict[id, geometry] or list of geometries - The zones,
+          identified by the feature id, the dictionary key or the position in the list.
+        - stats: Tuple[str] - count, sum, mean, std, min, max, median and percentiles as "p10".
+        - bands: List[str], optional - Query bands and formulas, all by default.
+        - tiles: List[str], optional - Tiles to read, all tiles by default.
+        - crs: str - CRS of the polygons.
+        - nodata: float, optional - Value ignored by the statistics.
+        - chunk_rows: int, optional - Rows of each block, sized to the memory budget by default.
+        - scheduler: str or distributed.Client, optional - Overrides the cube scheduler.
+
+        Returns a pandas.DataFrame with the columns zone, tile, time, band, pixels (pixels of the zone
+        in the tile) and one column by statistic.
+
+        Raises:
+        - KeyError: If a band is not a query band nor a formula.
+        - ValueError: If a statistic is unknown.
+        """
+        bands = self._output_bands(bands)
+        ids, geometries = zone_geometries(polygons)
+        workers = os.cpu_count() or 1
+
+        frames = []
+        for tile in (tiles or self.n_tiles):
+            grid, timeline = self.grids[tile], self.timelines[tile]
+            labels = rasterize_zones(geometries, grid, crs)
+            covered = np.flatnonzero(labels.any(axis=1))
+            if not len(covered):
+                continue
+            accumulator = ZonalAccumulator(len(ids), (len(bands), len(timeline)), stats, nodata)
+
+            rows = chunk_rows
+            if not rows:
+                # A block holds every date, as `workers * len(timeline)` chunks of one date
+                _, rows = self._chunk_layout(tile, workers * len(timeline), self.memory_limit or config.MEMORY_LIMIT,
+                                             len(self.formulas or []))
+            _data, _ = self._output_stack(bands, tile, rows)
+            if _data is None:
+                return None
+
+            starts = sorted({int(row) // rows * rows for row in covered})
+            for batch in range(0, len(starts), workers):
+                blocks = starts[batch:batch + workers]
+                computed = self._compute(*[_data[:, :, start:start + rows] for start in blocks], scheduler=scheduler)
+                for start, values in zip(blocks, computed):
+                    accumulator.add(values, labels[start:start + rows])
+                del computed
+
+            results = accumulator.result()
+            present = np.flatnonzero(accumulator.pixels)
+            per_zone = len(bands) * len(timeline)
+            frame = pd.DataFrame({
+                "zone": np.repeat(np.array(ids, dtype=object)[present], per_zone),
+                "tile": tile,
+                "time": np.tile(np.array(timeline, dtype="datetime64[us]"), len(bands) * len(present)),
+                "band": np.tile(np.repeat(bands, len(timeline)), len(present)),
+                "pixels": np.repeat(accumulator.pixels[present], per_zone),
+            })
+            for stat in stats:
+                # (band, time, zone) to rows ordered by zone, band and time
+                frame[stat] = results[stat][:, :, present].transpose(2, 0, 1).reshape(-1)
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=["zone", "tile", "time", "band", "pixels"] + list(stats))
+        return pd.concat(frames, ignore_index=True)
+
+    def _sample_cell(self, tile):
+        """Return the largest internal block of the bands of a tile on its grid and the grid offset in that block.
+
+        The block is given as the (rows, cols) of grid pixels it covers, the offset as the (row, col)
+        of the first grid pixel inside its block, from the window of the grid over the asset.
+        """
+        rows, grid = self.tile_rows[tile], self.grids[tile]
+        cells = []
+        for band in self.query_bands:
+            dataset = open_dataset(self.table.hrefs[band][rows[min(rows)]])
+            scale_y = abs(dataset.transform.e / grid.transform.e)
+            scale_x = abs(dataset.transform.a / grid.transform.a)
+            block_height, block_width = dataset.block_shapes[0]
+            window = grid.source_window(dataset)
+            cell = (max(int(block_height * scale_y), 1), max(int(block_width * scale_x), 1))
+            offset = (int(round(window.row_off % block_height * scale_y)) % cell[0],
+                      int(round(window.col_off % block_width * scale_x)) % cell[1])
+            cells.append((cell[0] * cell[1], cell, offset))
+        _, cell, offset = max(cells)
+        return cell, offset
+
+    def sample(self, points_or_labels, n_per_class: Optional[int] = None, bands: Optional[List[str]] = None,
+               tiles: Optional[List[str]] = None, crs: str = "EPSG:4326", label: str = "label", ignore=None,
+               seed: int = 0, scheduler=None):
+        """Extract labeled training samples for every band and date, reading only the blocks holding them.
+
+        Samples are selected at random by class (stratified), grouped by the internal COG block
+        holding them, and each group is read as a small window of every date in parallel tasks,
+        so the cost grows with the number of blocks sampled instead of the area of the tiles.
+
+        Parameters:
+        - points_or_labels: GeoJSON FeatureCollection or GeoDataFrame of points, list of (lon, lat, label),
+          or a label raster on the grid of a tile ((y, x) array or a flat pixel vector, as `apply_labels` output).
+        - n_per_class: int, optional - Samples kept by class, all by default.
+        - bands: List[str], optional - Query bands and formulas, all by default.
+        - tiles: List[str], optional - Tiles holding the points, all by default; a label raster is on the first one.
+        - crs: str - CRS of the points.
+        - label: str - Label property of the point features.
+        - ignore: optional - Label of the unlabeled pixels of a label raster.
+        - seed: int - Seed of the random selection.
+        - scheduler: str or distributed.Client, optional - Overrides the cube scheduler.
+
+        Returns a float32 (sample, band, time) xarray.DataArray on the dates of all tiles (NaN on the dates
+        missing in the tile of a sample), with the coordinates label, tile, row, col, x, y (grid CRS), lon and lat.
+
+        Raises:
+        - KeyError: If a band is not a query band nor a formula.
+        - ValueError: If no sample falls on the cube.
+        """
+        bands = self._output_bands(bands)
+        tiles = list(tiles or self.n_tiles)
+
+        if isinstance(points_or_labels, (np.ndarray, xr.DataArray)):
+            grid = self.grids[tiles[0]]
+            labels = np.asarray(points_or_labels).reshape(grid.height, grid.width)
+            valid = np.ones(labels.shape, dtype=bool) if ignore is None else labels != ignore
+            if labels.dtype.kind == "f":
+                valid &= ~np.isnan(labels)
+            rows, cols = np.nonzero(valid)
+            labels = labels[rows, cols]
+            sample_tiles = np.full(len(rows), tiles[0], dtype=object)
+        else:
+            lon, lat, labels = point_labels(points_or_labels, label)
+            rows = np.full(len(lon), -1, dtype=np.int64)
+            cols = np.full(len(lon), -1, dtype=np.int64)
+            sample_tiles = np.full(len(lon), None, dtype=object)
+            for tile in tiles:
+                grid = self.grids[tile]
+                xs, ys = rasterio.warp.transform(crs, grid.crs, lon, lat)
+                tile_cols, tile_rows = ~grid.transform * (np.asarray(xs), np.asarray(ys))
+                tile_rows, tile_cols = np.floor(tile_rows).astype(np.int64), np.floor(tile_cols).astype(np.int64)
+                inside = (sample_tiles == None) & (tile_rows >= 0) & (tile_rows < grid.height) & \
+                    (tile_cols >= 0) & (tile_cols < grid.width)  # noqa: E711, elementwise test on object array
+                rows[inside], cols[inside], sample_tiles[inside] = tile_rows[inside], tile_cols[inside], tile
+            found = sample_tiles != None  # noqa: E711
+            rows, cols, labels, sample_tiles = rows[found], cols[found], labels[found], sample_tiles[found]
+        if not len(rows):
+            raise ValueError("No sample falls on the cube tiles!")
+
+        selected = stratify(labels, n_per_class, seed)
+        rows, cols, labels, sample_tiles = rows[selected], cols[selected], labels[selected], sample_tiles[selected]
+        timeline = sorted(set().union(*(self.timelines[tile] for tile in set(sample_tiles))))
+        time_index = {time: t for t, time in enumerate(timeline)}
+
+        tasks, targets = [], []
+        for tile in sorted(set(sample_tiles)):
+            in_tile = np.flatnonzero(sample_tiles == tile)
+            grid, tile_rows = self.grids[tile], self.tile_rows[tile]
+            cell_shape, offset = self._sample_cell(tile)
+            for (row, col, height, width), indices in block_cells(rows[in_tile], cols[in_tile], cell_shape, offset):
+                indices = in_tile[indices]
+                cell = grid.subgrid(row, col, height, width)
+                for time in self.timelines[tile]:
+                    hrefs = [self.table.hrefs[band][tile_rows[time]] for band in self.query_bands]
+                    group = self.tile_groups[tile].get(time)
+                    mosaic = self._mosaic_hrefs(group, self.query_bands) if group else None
+                    tasks.append(delayed(read_samples)(hrefs, list(self.query_bands), cell,
+                                                       rows[indices] - row, cols[indices] - col, mosaic))
+                    targets.append((indices, time_index[time]))
+
+        values = np.full((len(self.query_bands), len(timeline), len(rows)), np.nan, dtype=np.float32)
+        for (indices, t), read in zip(targets, self._compute(*tasks, scheduler=scheduler)):
+            values[:, t, indices] = read
+        missing = np.isnan(values[0])
+        values, bandas = self._apply_formulas(values, self.query_bands)
+        if values is None:
+            return None
+        values = values[[bandas.index(band) for band in bands]].astype(np.float32)
+        values[:, missing] = np.nan
+
+        grid_x = np.empty(len(rows))
+        grid_y = np.empty(len(rows))
+        for tile in set(sample_tiles):
+            in_tile = sample_tiles == tile
+            grid_x[in_tile], grid_y[in_tile] = self.grids[tile].transform * (cols[in_tile] + 0.5, rows[in_tile] + 0.5)
+        lons, lats = np.empty(len(rows)), np.empty(len(rows))
+        for tile in set(sample_tiles):
+            in_tile = sample_tiles == tile
+            lons[in_tile], lats[in_tile] = rasterio.warp.transform(self.grids[tile].crs, "EPSG:4326",
+                                                                   grid_x[in_tile], grid_y[in_tile])
+        return xr.DataArray(
+            values.transpose(2, 0, 1),
+            coords={"sample": range(len(rows)), "band": bands, "time": timeline, "label": ("sample", labels),
+                    "tile": ("sample", sample_tiles), "row": ("sample", rows), "col": ("sample", cols),
+                    "x": ("sample", grid_x), "y": ("sample", grid_y), "lon": ("sample", lons),
+                    "lat": ("sample", lats)},
+            dims=["sample", "band", "time"],
+            name="Samples"
+        )
+
+    def pixel_batches(self, bands: Optional[List[str]] = None, tile: Optional[str] = None, batch_size: int = 4096,
+                      chunk_rows: Optional[int] = None, seed: Optional[int] = 0, scheduler=None):
+        """Yield shuffled (pixel, band * time) float32 batches of a tile, reading one block of rows of every date at a time.
+
+        The features of a pixel are ordered by band then time, as `utils.concatenate_bands`, so
+        models trained on the batches work with `plot.plot_codebooks`. Blocks are sized to
+        `memory_limit` (or `config.MEMORY_LIMIT`), visited in random order and their pixels shuffled,
+        so consecutive batches are not spatially correlated.
+
+        Parameters:
+        - bands: List[str], optional - Query bands and formulas, all by default.
+        - tile: str, optional - The tile, the first tile by default.
+        - batch_size: int - Pixels by batch.
+        - chunk_rows: int, optional - Rows of each block, sized to the memory budget by default.
+        - seed: int, optional - Seed of the shuffling, None to read blocks in order without shuffling.
+        - scheduler: str or distributed.Client, optional - Overrides the cube scheduler.
+
+        Raises:
+        - KeyError: If a band is not a query band nor a formula.
+        """
+        bands = self._output_bands(bands)
+        tile = tile or self.n_tiles[0]
+        rows = chunk_rows or self._chunk_layout(tile, len(self.timelines[tile]), self.memory_limit or config.MEMORY_LIMIT,
+                                                len(self.formulas or []))[1]
+        _data, _ = self._output_stack(bands, tile, rows)
+        if _data is None:
+            return
+        starts = list(range(0, _data.shape[2], rows))
+        rng = np.random.default_rng(seed) if seed is not None else None
+        if rng is not None:
+            rng.shuffle(starts)
+        for start in starts:
+            values, = self._compute(_data[:, :, start:start + rows], scheduler=scheduler)
+            matrix = values.reshape(values.shape[0] * values.shape[1], -1).T.astype(np.float32)
+            del values
+            if rng is not None:
+                matrix = matrix[rng.permutation(len(matrix))]
+            for first in range(0, len(matrix), batch_size):
+                yield np.ascontiguousarray(matrix[first:first + batch_size])
+
+    def train(self, model, epochs: int = 1, bands: Optional[List[str]] = None, tile: Optional[str] = None,
+              batch_size: int = 4096, chunk_rows: Optional[int] = None, seed: int = 0, scheduler=None):
+        """Train a clustering model (cluster.MiniBatchKMeans, cluster.SOM or any model with partial_fit) out of core.
+
+        Every epoch streams the batches of `pixel_batches` to `model.partial_fit`, so only one block
+        of rows is in memory whatever the size of the tile.
+
+        Parameters:
+        - model: The model to train.
+        - epochs: int - Passes over the tile.
+        - bands, tile, batch_size, chunk_rows, scheduler: See `pixel_batches`.
+        - seed: int - Seed of the shuffling, changed at each epoch.
+
+        Returns the trained model.
+        """
+        for epoch in range(epochs):
+            for batch in self.pixel_batches(bands, tile, batch_size, chunk_rows, seed + epoch, scheduler):
+                model.partial_fit(batch)
+        return model
+
+    def cluster_map(self, model, bands: Optional[List[str]] = None, tile: Optional[str] = None,
+                    chunk_rows: Optional[int] = None):
+        """Predict the cluster (or neuron) of every pixel of a tile as a lazy (y, x) int32 map.
+
+        Each block of rows of every date is predicted as soon as it is read. The flattened map
+        (`.values.ravel()`) is the predictions expected by `plot.plot_cluster_map`, `utils.apply_labels`
+        and `utils.interactive_cluster_merging_with_timeseries`.
+
+        Parameters:
+        - model: A trained model with a predict method on (pixel, band * time) matrices.
+        - bands: List[str], optional - The bands used to train the model, all by default.
+        - tile: str, optional - The tile, the first tile by default.
+        - chunk_rows: int, optional - Rows of each block, sized to the memory budget by default.
+        """
+        bands = self._output_bands(bands)
+        tile = tile or self.n_tiles[0]
+        workers = os.cpu_count() or 1
+        rows = chunk_rows or self._chunk_layout(tile, workers * len(self.timelines[tile]),
+                                                self.memory_limit or config.MEMORY_LIMIT, len(self.formulas or []))[1]
+        _data, _ = self._output_stack(bands, tile, rows)
+        if _data is None:
+            return None
+        labels = da.map_blocks(_predict_block, _data.rechunk({0: -1, 1: -1}), model, drop_axis=[0, 1], dtype=np.int32)
+        result = xr.DataArray(
+            labels,
+            coords={"y": range(labels.shape[0]), "x": range(labels.shape[1])},
+            dims=["y", "x"],
+            name="Clusters"
+        )
+        result.attrs['y_dim'], result.attrs['x_dim'] = labels.shape
+        return result
+
+    def save(self, path: str, tiles: Optional[List[str]] = None, scheduler=None):
+        """Persist the cube (query bands and formulas) as a CubeStore, writing only the dates not stored yet.
+
+        Each date is written as soon as it is read, in batches of one date per CPU, so memory use
+        does not grow with the timeline. Date files are written atomically and the meta is updated
+        after each batch, so an interrupted save resumes where it stopped (existing date files count
+        as stored). Processes saving different tiles in the same store only replace their own tile
+        in meta.json. Use `CubeStore(path).update()` to append new acquisitions later.
+
+        Parameters:
+        - path: str - The store directory (created if needed).
+        - tiles: List[str], optional - Tiles to save, all tiles by default.
+        - scheduler: str or distributed.Client, optional - Overrides the cube scheduler.
+
+        Returns the list of (tile, datetime) written.
+
+        Raises:
+        - ValueError: If a formula uses a band that is not queried, before writing its date.
+        """
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as file:
+                meta = json.load(file)
+        else:
+            meta = {"timelines": {}, "grids": {}}
+        meta.update(
+            collections=self.collections, query_bands=self.query_bands, formulas=self.formulas, bbox=self.bbox,
+            resolution=self.resolution, resampling=self.resampling, snap=self.snap,
+            quality_band=self.quality_band, priority=self.priority,
+            bands=list(self.query_bands) + list(self.formulas or []),
+        )
+        meta["tiles"] = sorted(set(meta.get("tiles") or []) | set(self.n_tiles))
+        meta["start_date"] = min(meta.get("start_date") or self.start_date, self.start_date)
+        meta["end_date"] = max(meta.get("end_date") or self.end_date, self.end_date)
+
+        written = []
+        batch = os.cpu_count() or 1
+        for tile in (tiles or self.n_tiles):
+            array, timeline = self._select_tile(tile)
+            grid = self.grids[tile]
+            stored = set(meta["timelines"].get(tile, [])) | stored_dates(path, tile)
+            meta["grids"][tile] = {"crs": grid.crs.to_wkt(), "transform": list(grid.transform)[:6],
+                                   "width": grid.width, "height": grid.height}
+            pending = [time for time in timeline if f"{time:{TIME_FORMAT}}" not in stored]
+            for start in range(0, len(pending), batch):
+                dates = pending[start:start + batch]
+                computed = self._compute(*[task for time in dates for task in array.sel(time=time).values],
+                                         scheduler=scheduler)
+                for i, time in enumerate(dates):
+                    _data = np.array(computed[i * len(self.query_bands):(i + 1) * len(self.query_bands)])
+                    _data, _ = self._apply_formulas(_data, self.query_bands)
+                    if _data is None:
+                        raise ValueError(f"Cannot save {time} of tile {tile}: a formula uses a band not queried.")
+                    save_date(path, tile, time, _data)
+                    stored.add(f"{time:{TIME_FORMAT}}")
+                    written.append((tile, time))
+                meta["timelines"][tile] = sorted(stored)
+                meta = merge_meta(path, meta, tile)
+            meta["timelines"][tile] = sorted(stored)
+            meta = merge_meta(path, meta, tile)
+        return written
+
+    def to_cog(self, path: str, bands: Optional[List[str]] = None, times: Optional[List[str]] = None,
+               tiles: Optional[List[str]] = None, compress: str = "deflate", overviews: bool = True,
+               chunk_rows: Optional[int] = None, scheduler=None):
+        """Export dates of the cube (query bands and formulas) as Cloud Optimized GeoTIFFs, one file by tile and date.
+
+        Each file holds the selected bands as raster bands (named after them) on the grid of the
+        tile, with its CRS and transform. A date is read in blocks of rows sized to `memory_limit`
+        (or `config.MEMORY_LIMIT`), blocks are computed in parallel and written as they finish,
+        then compressed and reduced to overviews with every CPU. Results computed from `search`
+        (e.g. classifications) are exported with `eocube.export.write_cog(path, values, cube.grids[tile])`.
+
+        Parameters:
+        - path: str - The output directory, files are named <tile>_<yyyymmddThhmmss>.tif.
+        - bands: List[str], optional - Query bands and formulas to export, all by default.
+        - times: List[str], optional - Dates ("yyyy-mm-dd") to export, the whole timeline by default.
+        - tiles: List[str], optional - Tiles to export, all tiles by default.
+        - compress: str - Compression of the blocks (deflate, zstd, lzw, ...).
+        - overviews: bool - Build the overviews of each file.
+        - chunk_rows: int, optional - Rows of each block (the recommended value by default).
+        - scheduler: str, optional - "threads" (default) or "synchronous", blocks are written by this process.
+
+        Returns the list of written files.
+
+        Raises:
+        - KeyError: If a band is not a query band nor a formula.
+        """
+        bands = self._output_bands(bands)
+        dates = {pd.Timestamp(time).strftime("%Y-%m-%d") for time in times} if times else None
+        scheduler = self._local_scheduler(scheduler)
+        workers = 1 if scheduler != "threads" else (os.cpu_count() or 1)
+
+        written = []
+        for tile in (tiles or self.n_tiles):
+            rows = chunk_rows
+            if not rows:
+                _, rows = self._chunk_layout(tile, workers, self.memory_limit or config.MEMORY_LIMIT,
+                                             len(self.formulas or []))
+            _data, timeline = self._output_stack(bands, tile, rows)
+            if _data is None:
+                return written
+
+            for t, time in enumerate(timeline):
+                if dates is not None and time.strftime("%Y-%m-%d") not in dates:
+                    continue
+                target = os.path.join(path, f"{tile}_{time:{TIME_FORMAT}}.tif")
+                written.append(write_cog(target, _data[:, t], self.grids[tile], band_names=bands, compress=compress,
+                                         overviews=overviews, scheduler=scheduler))
+        return written
+
+    def to_parquet(self, path: str, bands: Optional[List[str]] = None, tiles: Optional[List[str]] = None,
+                   format: str = "parquet", compression: str = "zstd", chunk_rows: Optional[int] = None,
+                   scheduler=None):
+        """Stream the pixel time series of the cube to Parquet (or Arrow IPC) files, without building the cube in memory.
+
+        Each tile is written to <path>/<tile>.<format> (the directory is read at once by pandas,
+        pyarrow datasets and Spark) with one row by pixel and date and the columns tile, pixel, x, y,
+        time and one column by band. The tile is read in blocks of rows of every date sized to
+        `memory_limit` (or `config.MEMORY_LIMIT`), and each block becomes a row group, so peak memory
+        is one block whatever the area. Requires pyarrow (pip install eocube[parquet]).
+
+        Parameters:
+        - path: str - The output directory.
+        - bands: List[str], optional - Query bands and formulas to export, all by default.
+        - tiles: List[str], optional - Tiles to export, all tiles by default.
+        - format: str - "parquet" or "arrow".
+        - compression: str - Codec of the columns (zstd, snappy, lz4, ...).
+        - chunk_rows: int, optional - Grid rows of each row group, sized to the memory budget by default.
+        - scheduler: str or distributed.Client, optional - Overrides the cube scheduler.
+
+        Returns the list of written files.
+
+        Raises:
+        - KeyError: If a band is not a query band nor a formula.
+        """
+        bands = self._output_bands(bands)
+
+        written = []
+        for tile in (tiles or self.n_tiles):
+            grid, timeline = self.grids[tile], self.timelines[tile]
+            rows = chunk_rows
+            if not rows:
+                # A block holds the read bands and their table (values, pixel, x, y and time columns)
+                itemsize = max(np.dtype(open_dataset(self.table.hrefs[band][self.tile_rows[tile][timeline[0]]]).dtypes[0])
+                               .itemsize for band in self.query_bands)
+                values_bytes = (len(self.query_bands) + len(self.formulas or [])) * itemsize
+                row_bytes = grid.width * len(timeline) * (2 * values_bytes + len(bands) * itemsize + 32)
+                rows = int(min(max((self.memory_limit or config.MEMORY_LIMIT) // row_bytes, 1), grid.height))
+
+            _data, _ = self._output_stack(bands, tile, rows)
+            if _data is None:
+                return written
+
+            target = os.path.join(path, f"{tile}.{format}")
+            with TableWriter(target, pixel_schema(bands, _data.dtype), format, compression) as writer:
+                for start in range(0, grid.height, rows):
+                    values, = self._compute(_data[:, :, start:start + rows], scheduler=scheduler)
+                    writer.write(pixel_table(values, bands, timeline, grid, tile, start))
+                    del values
+            written.append(target)
+        return written
+
+    def to_shared(self, tile: Optional[str] = None, bands: Optional[List[str]] = None, as_time_series: bool = False,
+                  chunk_rows: Optional[int] = None, scheduler=None):
+        """Compute the cube of a tile into a shared memory block, to hand it to worker processes without copies.
+
+        Blocks of rows are computed in parallel and written directly in the block, so the cube is held
+        once. Passing the result to `ProcessPoolExecutor.submit` only sends its name: workers read the
+        values with `shared.values` or `shared.to_xarray()`. Release the block with `close()` or a `with`
+        block; it is also released when the result is garbage collected in this process.
+
+        Parameters:
+        - tile: str, optional - The tile (first tile by default).
+        - bands: List[str], optional - Query bands and formulas, all by default.
+        - as_time_series: bool - Lay the values out as `search(as_time_series=True)`: (band, pixel, time),
+          the series of a pixel contiguous.
+        - chunk_rows: int, optional - Rows of each block (the recommended value by default).
+        - scheduler: str, optional - "threads" (default) or "synchronous", blocks are written by this process.
+
+        Returns an eocube.shared.SharedArray with the dims and coords of the search result.
+
+        Raises:
+        - KeyError: If a band or the tile is not available.
+        """
+        bands = self._output_bands(bands)
+        tile = tile or self.n_tiles[0]
+        self._select_tile(tile)
+        scheduler = self._local_scheduler(scheduler)
+        if not chunk_rows:
+            workers = 1 if scheduler != "threads" else (os.cpu_count() or 1)
+            _, chunk_rows = self._chunk_layout(tile, workers, self.memory_limit or config.MEMORY_LIMIT,
+                                               len(self.formulas or []))
+        _data, timeline = self._output_stack(bands, tile, chunk_rows)
+        if _data is None:
+            return None
+
+        n_bands, n_times, height, width = _data.shape
+        if as_time_series:
+            values = xr.DataArray(
+                _data.reshape(n_bands, n_times, height * width).transpose(0, 2, 1),
+                coords={"band": bands, "pixel": range(height * width), "time": timeline},
+                dims=["band", "pixel", "time"],
+                attrs={"y_dim": height, "x_dim": width},
+                name="TimeSeries"
+            )
+        else:
+            values = xr.DataArray(
+                _data,
+                coords={"band": bands, "time": timeline, "y": range(height), "x": range(width)},
+                dims=["band", "time", "y", "x"],
+                name="DataCube"
+            )
+        return share(values, scheduler=scheduler)
+
     def cube_to_time_series(self, data_array, bands, time_coords):
         """Transform the data cube into a time series cube."""
         y_dim, x_dim = data_array.shape[2], data_array.shape[3]
@@ -453,7 +1765,50 @@ class DataCube:
         return _result
 
 
-    def interactPlot(self, method: str):
+    def _render_frame(self, date, method, out_shape=None, tile=None):
+        """Read the frame of a date for a plot method (rgb, ndvi, ndwi, ndbi or a band), from a tile when given."""
+        image = (self.tile_images[tile] if tile else self.data_images)[date]
+        if method == 'rgb':
+            return image.getRGB(out_shape=out_shape)
+        elif method == 'ndvi' and not (method in self.query_bands):
+            return image.getNDVI(out_shape=out_shape)
+        elif method == 'ndwi' and not (method in self.query_bands):
+            return image.getNDWI(out_shape=out_shape)
+        elif method == 'ndbi' and not (method in self.query_bands):
+            return image.getNDBI(out_shape=out_shape)
+        elif method in self.query_bands:
+            return image.getBand(method, out_shape=out_shape)
+        raise ValueError("Please insert a valid method rgb, ndvi, ndwi, ndbi, ... or any of selected bands!")
+
+    def _preview_shape(self, date, figsize, dpi=None, tile=None):
+        """Return the output shape matching the pixel size of a figure, or None when the window is already smaller."""
+        dpi = dpi or plt.rcParams['figure.dpi']
+        # The grid of the tile whose image is rendered for the date
+        grid = self.grids[tile] if tile else self.data_images.rows[date][1]
+        height, width = grid.height, grid.width
+        factor = max(1, math.ceil(height / (figsize[1] * dpi)), math.ceil(width / (figsize[0] * dpi)))
+        if factor == 1:
+            return None
+        return math.ceil(height / factor), math.ceil(width / factor)
+
+    def _preview(self, date, method, out_shape=None, tile=None):
+        """Return a future with the cached frame of (date, method), reading it in background when missing."""
+        key = (date, method, out_shape, tile)
+        with self._preview_lock:
+            future = self._preview_cache.get(key)
+            if future is None:
+                if self._preview_pool is None:
+                    self._preview_pool = ThreadPoolExecutor(max_workers=2)
+                future = self._preview_pool.submit(self._render_frame, date, method, out_shape, tile)
+                self._preview_cache[key] = future
+                while len(self._preview_cache) > config.PREVIEW_CACHE_SIZE:
+                    self._preview_cache.popitem(last=False)
+            else:
+                self._preview_cache.move_to_end(key)
+        return future
+
+    def interactPlot(self, method: str, preview: bool = True, figsize: Tuple[float, float] = (25, 8),
+                     tile: Optional[str] = None):
         #todo fazer receber qualquer composição e retornar um tif com um mos
         """Return all dataset with a interactive plot date time slider.
 
@@ -461,40 +1816,58 @@ class DataCube:
 
          - method <string, required>: The method like rgb, ndvi, ndwi, ndbi, ... or any of selected bands.
 
+         - preview <bool, optional>: Read frames from the COG overview matching the figure pixel size instead of
+           the full resolution window. Frames are cached by date and the adjacent dates are read in background.
+
+         - figsize <tuple, optional>: The figure size in inches.
+
+         - tile <string, optional>: Plot the dates of this tile (by default, each date shows the last tile having it).
+
         Raise:
 
          - KeyError: If the given parameter not exists.
         """
-        @interact(date=self.timeline)
+        if not (method in ('rgb', 'ndvi', 'ndwi', 'ndbi') or method in self.query_bands):
+            raise ValueError("Please insert a valid method rgb, ndvi, ndwi, ndbi, ... or any of selected bands!")
+
+        timeline = self.timelines[tile] if tile else self.timeline
+
+        @interact(date=timeline)
         def sliderplot(date):
+            out_shape = self._preview_shape(date, figsize, tile=tile) if preview else None
+            frame = self._preview(date, method, out_shape, tile).result()
+            # Prefetch the neighbours of the slider
+            index = timeline.index(date)
+            for neighbour in (index - 1, index + 1):
+                if 0 <= neighbour < len(timeline):
+                    self._preview(timeline[neighbour], method, out_shape, tile)
+
             plt.clf()
-            plt.figure(figsize=(25, 8))
+            plt.figure(figsize=figsize)
             if method == 'rgb':
-                plt.imshow(self.data_images[date].getRGB())
+                plt.imshow(frame)
                 plt.title(f'\nComposição Colorida Verdadeira {date} \n')
             elif method == 'ndvi' and not (method in self.query_bands):
                 colormap = plt.get_cmap('Greens', 1000)
-                plt.imshow(self.data_images[date].getNDVI(), cmap=colormap)
+                plt.imshow(frame, cmap=colormap)
                 plt.title(f'\nNDVI - Normalized Difference Vegetation Index {date} \n')
                 plt.colorbar()
             elif method == 'ndwi' and not (method in self.query_bands):
                 colormap = plt.get_cmap('Blues', 1000)
-                plt.imshow(self.data_images[date].getNDWI(), cmap=colormap)
+                plt.imshow(frame, cmap=colormap)
                 plt.title(f'\nNDWI - Normalized Difference Water Index {date} \n')
                 plt.colorbar()
             elif method == 'ndbi' and not (method in self.query_bands):
                 colormap = plt.get_cmap('Greys', 1000)
-                plt.imshow(self.data_images[date].getNDBI(), cmap=colormap)
+                plt.imshow(frame, cmap=colormap)
                 plt.title(f'\nNDBI - Normalized Difference Built-up Index {date} \n')
                 plt.colorbar()
-            elif method in self.query_bands:
+            else:
                 colormap = plt.get_cmap('Greys', 1000)
                 if method in ['red', 'green', 'blue']:
                     colormap = plt.get_cmap('Greys', 255).reversed()
-                plt.imshow(self.data_images[date].getBand(method), cmap=colormap)
+                plt.imshow(frame, cmap=colormap)
                 plt.title(f'\nComposição da Banda {method.upper()} {date} \n')
                 plt.colorbar()
-            else:
-                raise ValueError("Please insert a valid method rgb, ndvi, ndwi, ndbi, ... or any of selected bands!")
             plt.tight_layout()
             plt.show()
@@ -0,0 +1,233 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Export of cube values as georeferenced rasters and as pixel time series tables.
+
+Methods:
+
+    write_cog, pixel_schema, pixel_table, TableWriter
+"""
+
+import os
+import threading
+
+import dask.array as da
+import numpy as np
+import rasterio
+from rasterio.shutil import copy as copy_raster
+from rasterio.windows import Window
+
+from .utils import gdal_env
+
+
+class _WindowWriter():
+    """Target of dask.array.store writing each (band, y, x) block in its window of an opened raster."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __setitem__(self, key, values):
+        rows, cols = key[-2], key[-1]
+        window = Window(cols.start, rows.start, cols.stop - cols.start, rows.stop - rows.start)
+        self.dataset.write(values, window=window)
+
+
+def write_cog(path, data, grid, band_names=None, nodata=None, compress="deflate", blocksize=512,
+              overviews=True, overview_resampling="nearest", scheduler="threads"):
+    """Write a (band, y, x) or (y, x) array on the grid of a tile as a Cloud Optimized GeoTIFF.
+
+    The chunks of a dask array are computed in parallel and written one at a time in a tiled,
+    uncompressed temporary GeoTIFF, so memory is bounded by the chunks in flight. The COG driver
+    then compresses the blocks and builds the overviews with every CPU.
+
+    Parameters
+
+     - path <string, required>: The output .tif file.
+
+     - data <numpy.ndarray, dask.array.Array or xarray.DataArray, required>: The values, with the grid shape.
+
+     - grid <Grid, required>: The grid of the values (CRS and transform), as DataCube.grids[tile].
+
+     - band_names <list of string, optional>: Descriptions of the raster bands.
+
+     - nodata <number, optional>: The nodata value of the raster.
+
+     - compress <string, optional>: The compression of the blocks (deflate, zstd, lzw, ...).
+
+     - blocksize <int, optional>: The size of the internal blocks.
+
+     - overviews <bool, optional>: Build the overviews.
+
+     - overview_resampling <string, optional>: Resampling of the overviews, nearest (the default) keeps class values.
+
+     - scheduler <string, optional>: Dask scheduler of the chunks, it must run in this process.
+
+    Raise
+
+     - ValueError: If the array shape does not match the grid.
+    """
+    data = getattr(data, "data", data)
+    if not isinstance(data, da.Array):
+        data = da.from_array(np.asarray(data), chunks=(-1, blocksize, -1) if np.ndim(data) == 3 else (blocksize, -1))
+    if data.ndim == 2:
+        data = data[None]
+    if data.shape[1:] != (grid.height, grid.width):
+        raise ValueError(f"The array shape {data.shape[1:]} does not match the grid ({grid.height}, {grid.width}).")
+    # One chunk per block of rows, all bands together
+    data = data.rechunk({0: -1, 2: -1})
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = path + ".tmp.tif"
+    profile = dict(driver="GTiff", width=grid.width, height=grid.height, count=data.shape[0], dtype=data.dtype,
+                   crs=grid.crs, transform=grid.transform, nodata=nodata, tiled=True, blockxsize=blocksize,
+                   blockysize=blocksize, BIGTIFF="IF_SAFER")
+    try:
+        with gdal_env(), rasterio.open(temporary, "w", **profile) as dataset:
+            for index, name in enumerate(band_names or [], start=1):
+                dataset.set_band_description(index, str(name))
+            da.store(data, _WindowWriter(dataset), lock=threading.Lock(), scheduler=scheduler)
+
+        options = dict(compress=compress, blocksize=blocksize, num_threads="ALL_CPUS", bigtiff="IF_SAFER",
+                       overviews="AUTO" if overviews else "NONE", overview_resampling=overview_resampling)
+        if np.issubdtype(data.dtype, np.number):
+            options["predictor"] = "YES"
+        with gdal_env():
+            copy_raster(temporary, path + ".part", driver="COG", **options)
+        os.replace(path + ".part", path)
+    finally:
+        for leftover in (temporary, path + ".part"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return path
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Table export requires pyarrow, install it with: pip install eocube[parquet]")
+    return pyarrow
+
+
+def pixel_schema(bands, dtype):
+    """Return the Arrow schema of the tables built by pixel_table for bands of a numpy dtype."""
+    pa = _pyarrow()
+    fields = [("tile", pa.dictionary(pa.int32(), pa.string())), ("pixel", pa.int64()), ("x", pa.float64()),
+              ("y", pa.float64()), ("time", pa.timestamp("us"))]
+    return pa.schema(fields + [(band, pa.from_numpy_dtype(np.dtype(dtype))) for band in bands])
+
+
+def pixel_table(values, bands, timeline, grid, tile, row_start=0):
+    """Return the (band, time, y, x) values of a block of rows as an Arrow table with one row by pixel and date.
+
+    The columns are tile (dictionary encoded), pixel (the index of the pixel in the tile, as in the
+    time series cubes), x and y (the pixel center in the grid CRS), time and one column by band.
+    Rows are ordered by pixel then time.
+
+    Parameters
+
+     - values <numpy.ndarray, required>: The (band, time, y, x) values of the block.
+
+     - bands <list of string, required>: The band names.
+
+     - timeline <list of datetime, required>: The dates.
+
+     - grid <Grid, required>: The grid of the tile.
+
+     - tile <string, required>: The tile name.
+
+     - row_start <int, optional>: The grid row of the first row of the block.
+    """
+    pa = _pyarrow()
+    n_times, height, width = values.shape[1:]
+    rows = np.arange(row_start, row_start + height)
+    cols = np.arange(width)
+    pixels = (rows[:, None] * grid.width + cols[None, :]).reshape(-1)
+    x = grid.transform.c + (cols + 0.5) * grid.transform.a
+    y = grid.transform.f + (rows + 0.5) * grid.transform.e
+
+    columns = {
+        "tile": pa.DictionaryArray.from_arrays(np.zeros(len(pixels) * n_times, dtype=np.int32), [tile]),
+        "pixel": np.repeat(pixels, n_times),
+        "x": np.tile(np.repeat(x, n_times), height),
+        "y": np.repeat(y, width * n_times),
+        "time": np.tile(np.array(timeline, dtype="datetime64[us]"), height * width),
+    }
+    for band, band_values in zip(bands, values):
+        # (time, y, x) to (y, x, time), so the dates of a pixel are contiguous
+        columns[band] = np.ascontiguousarray(band_values.transpose(1, 2, 0)).reshape(-1)
+    return pa.table(columns, schema=pixel_schema(bands, values.dtype))
+
+
+class TableWriter():
+    """Stream Arrow tables to a Parquet file (one row group by table) or to an Arrow IPC file (one record batch by table).
+
+    Parameters
+
+     - path <string, required>: The output file, written as path.part and renamed when closed.
+
+     - schema <pyarrow.Schema, required>: The schema of the tables.
+
+     - format <string, optional>: parquet (default) or arrow.
+
+     - compression <string, optional>: The codec (zstd, snappy, lz4, ...).
+
+    Raise
+
+     - ValueError: If the format is unknown.
+    """
+
+    def __init__(self, path, schema, format="parquet", compression="zstd"):
+        """Open the file."""
+        pa = _pyarrow()
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if format == "parquet":
+            # tile, x, y and time repeat in every row group, their dictionaries are small
+            self._writer = pa.parquet.ParquetWriter(path + ".part", schema, compression=compression,
+                                                    use_dictionary=["tile", "x", "y", "time"])
+        elif format == "arrow":
+            options = pa.ipc.IpcWriteOptions(compression=compression if compression in ("zstd", "lz4") else None)
+            self._writer = pa.ipc.new_file(path + ".part", schema, options=options)
+        else:
+            raise ValueError(f"Unknown table format {format}, use parquet or arrow.")
+        self.format = format
+
+    def write(self, table):
+        """Append a table as a new row group or record batch."""
+        if self.format == "parquet":
+            self._writer.write_table(table, row_group_size=table.num_rows)
+        else:
+            self._writer.write_table(table, max_chunksize=table.num_rows)
+
+    def close(self):
+        """Close the file and move it to its final path."""
+        self._writer.close()
+        os.replace(self.path + ".part", self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._writer.close()
+            os.remove(self.path + ".part")
@@ -0,0 +1,142 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Per-pixel time series features for machine learning, a compact alternative to utils.concatenate_bands.
+
+Methods:
+
+    feature_names, features_mtx_numba, extract_features
+"""
+
+import numba as nb
+import numpy as np
+import xarray as xr
+
+YEAR_DAYS = 365.25
+
+
+def feature_names(bands, quantiles=(0.1, 0.5, 0.9), harmonics=1):
+    """List the names of the features computed for each band, in the order of features_mtx_numba.
+
+    Parameters
+
+     - bands <list of string, required>: The band names.
+
+     - quantiles <tuple of float, optional>: The quantiles computed for each band.
+
+     - harmonics <int, optional>: Number of annual harmonics (amplitude and phase) for each band.
+    """
+    names = ["mean", "std", "min", "max"]
+    names += [f"q{int(round(q * 100)):02d}" for q in quantiles]
+    names += ["slope", "day_min", "day_max"]
+    for k in range(1, harmonics + 1):
+        names += [f"amp{k}", f"phase{k}"]
+    return [f"{band}_{name}" for band in bands for name in names]
+
+
+@nb.njit(parallel=True)
+def features_mtx_numba(cube, days, quantiles, harmonics):
+    npixels, nbands, ntimes = cube.shape
+    nq = quantiles.shape[0]
+    nfeatures = 7 + nq + 2 * harmonics
+    out = np.full((npixels, nbands * nfeatures), np.nan, dtype=np.float32)
+
+    for i in nb.prange(npixels):
+        values = np.empty(ntimes)
+        t = np.empty(ntimes)
+        for b in range(nbands):
+            # Keep only the valid (not NaN) dates of the series
+            n = 0
+            for j in range(ntimes):
+                v = cube[i, b, j]
+                if not np.isnan(v):
+                    values[n] = v
+                    t[n] = days[j]
+                    n += 1
+            if n == 0:
+                continue
+            base = b * nfeatures
+            v = values[:n]
+            tv = t[:n]
+
+            mean = v.mean()
+            out[i, base + 0] = mean
+            out[i, base + 1] = np.sqrt(((v - mean) ** 2).mean())
+            jmin = np.argmin(v)
+            jmax = np.argmax(v)
+            out[i, base + 2] = v[jmin]
+            out[i, base + 3] = v[jmax]
+
+            ordered = np.sort(v)
+            for k in range(nq):
+                rank = quantiles[k] * (n - 1)
+                lo = int(rank)
+                hi = min(lo + 1, n - 1)
+                out[i, base + 4 + k] = ordered[lo] + (rank - lo) * (ordered[hi] - ordered[lo])
+
+            # Least squares slope per day
+            tmean = tv.mean()
+            var = ((tv - tmean) ** 2).sum()
+            slope = ((tv - tmean) * (v - mean)).sum() / var if var > 0 else 0.0
+            out[i, base + 4 + nq] = slope
+            out[i, base + 5 + nq] = tv[jmin]
+            out[i, base + 6 + nq] = tv[jmax]
+
+            for k in range(1, harmonics + 1):
+                a = 0.0
+                c = 0.0
+                for j in range(n):
+                    angle = 2 * np.pi * k * tv[j] / YEAR_DAYS
+                    a += (v[j] - mean) * np.cos(angle)
+                    c += (v[j] - mean) * np.sin(angle)
+                a *= 2.0 / n
+                c *= 2.0 / n
+                out[i, base + 5 + nq + 2 * k] = np.sqrt(a * a + c * c)
+                out[i, base + 6 + nq + 2 * k] = np.arctan2(c, a)
+
+    return out
+
+
+def extract_features(cubo, quantiles=(0.1, 0.5, 0.9), harmonics=1):
+    """
+    Calcula atributos por pixel das séries temporais de um cubo, em uma única passada paralela.
+
+    Parâmetros:
+    - cubo: xarray.DataArray com as dimensões 'band', 'pixel' e 'time' (ver DataCube.cube_to_time_series).
+      Valores NaN são ignorados.
+    - quantiles: quantis calculados para cada banda.
+    - harmonics: número de harmônicos anuais (amplitude e fase) para cada banda.
+
+    Retorna:
+    - xarray.DataArray float32 com 'pixel' como primeira dimensão e 'feature' como segunda dimensão.
+    """
+    cubo = cubo.transpose("pixel", "band", "time")
+    times = cubo.time.values.astype("datetime64[s]").astype(np.float64) / 86400
+    days = times - times[0]
+    matrix = features_mtx_numba(
+        np.ascontiguousarray(cubo.values, dtype=np.float32), days,
+        np.asarray(quantiles, dtype=np.float64), harmonics
+    )
+    result = xr.DataArray(
+        matrix,
+        coords={"pixel": cubo.pixel.values, "feature": feature_names(cubo.band.values, quantiles, harmonics)},
+        dims=["pixel", "feature"],
+        name="Features"
+    )
+    result.attrs['y_dim'] = cubo.attrs.get('y_dim')
+    result.attrs['x_dim'] = cubo.attrs.get('x_dim')
+    return result
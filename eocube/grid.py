@@ -0,0 +1,211 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Target grid shared by every band of a tile, so bands of different resolutions are resampled while reading.
+"""
+
+import math
+
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+
+# Tolerance used to snap bounds that are multiples of the resolution up to float errors
+_EPSILON = 1e-9
+
+
+class Grid():
+    """Abstraction of the pixel grid (CRS, transform and shape) of a data cube tile.
+
+    Parameters
+
+     - crs <rasterio.crs.CRS, required>: The CRS of the grid.
+
+     - transform <affine.Affine, required>: The transform of the upper left pixel of the grid.
+
+     - width <int, required>: Number of columns.
+
+     - height <int, required>: Number of rows.
+
+     - resampling <string or dictionary, optional>: Resampling method name (nearest, bilinear, average, ...)
+       for all bands or a dictionary with the method by band (default is nearest).
+
+     - snap <boolean, optional>: Expand each read to the internal blocks of the asset and crop in memory (default is False).
+
+    Raise
+
+     - KeyError: If a resampling method does not exist.
+    """
+
+    def __init__(self, crs, transform, width, height, resampling=None, snap=False):
+        """Build the grid of a tile."""
+        self.crs = crs
+        self.transform = transform
+        self.width = width
+        self.height = height
+        self.resampling = resampling or "nearest"
+        self.snap = snap
+        # Validate the methods early
+        for method in (self.resampling.values() if isinstance(self.resampling, dict) else [self.resampling]):
+            Resampling[method]
+
+    @property
+    def resolution(self):
+        """Pixel size of the grid in CRS units."""
+        return self.transform.a
+
+    @property
+    def bounds(self):
+        """The (left, bottom, right, top) bounds of the grid."""
+        left, top = self.transform.c, self.transform.f
+        return (left, top + self.height * self.transform.e, left + self.width * self.transform.a, top)
+
+    def getResampling(self, band_name):
+        """Get the rasterio resampling method of a band."""
+        if isinstance(self.resampling, dict):
+            return Resampling[self.resampling.get(band_name, "nearest")]
+        return Resampling[self.resampling]
+
+    def key(self, band_name):
+        """Hashable description of the pixels read for a band, used to cache reads."""
+        return (self.crs.to_string(), tuple(self.transform), self.width, self.height, self.getResampling(band_name).name)
+
+    def window_transform(self, rows=None):
+        """Get the transform of the grid or of a (start, stop) block of rows."""
+        start = rows[0] if rows else 0
+        return self.transform * Affine.translation(0, start)
+
+    def subgrid(self, row, col, height, width):
+        """Get the grid of a (row, col, height, width) window of this grid, whose pixels are the pixels of this grid."""
+        return Grid(self.crs, self.transform * Affine.translation(col, row), width, height, self.resampling, self.snap)
+
+    def read(self, dataset, band_name, rows=None, out_shape=None):
+        """Read a band of a dataset on the grid, resampling inside the GDAL read.
+
+        Datasets on the grid CRS are read through a (possibly fractional) window with the
+        grid shape as output shape, so coarser bands are never over-read and finer ones use
+        decimated or overview reads. Other CRSs are warped with a WarpedVRT.
+
+        Parameters
+
+         - dataset <rasterio.DatasetReader, required>: The opened raster.
+
+         - band_name <string, required>: The band commom name, used to select the resampling method.
+
+         - rows <tuple, optional>: The (start, stop) rows of the grid to read.
+
+         - out_shape <tuple, optional>: A smaller (rows, cols) shape for previews of the rows, read from the overviews.
+        """
+        start, stop = rows if rows else (0, self.height)
+        resampling = self.getResampling(band_name)
+        if dataset.crs != self.crs:
+            with WarpedVRT(dataset, crs=self.crs, transform=self.transform, width=self.width,
+                           height=self.height, resampling=resampling) as vrt:
+                return vrt.read(1, window=Window(0, start, self.width, stop - start), out_shape=out_shape)
+
+        window = self.source_window(dataset, rows)
+        if out_shape:
+            return dataset.read(1, window=window, out_shape=out_shape, resampling=resampling)
+        if self.snap:
+            aligned = self._block_window(dataset, window)
+            if aligned:
+                block_window, out_shape, (row, col) = aligned
+                asset = dataset.read(1, window=block_window, out_shape=out_shape, resampling=resampling)
+                return asset[row:row + stop - start, col:col + self.width]
+        return dataset.read(1, window=window, out_shape=(stop - start, self.width), resampling=resampling)
+
+    def source_window(self, dataset, rows=None):
+        """Get the (possibly fractional) window of a dataset covering a (start, stop) block of grid rows.
+
+        Datasets on another CRS get the window of the reprojected bounds, which is what the
+        WarpedVRT reads.
+        """
+        start, stop = rows if rows else (0, self.height)
+        left, _, right, top = self.bounds
+        bounds = (left, top + stop * self.transform.e, right, top + start * self.transform.e)
+        if dataset.crs != self.crs:
+            bounds = transform_bounds(self.crs, dataset.crs, *bounds)
+        return from_bounds(*bounds, dataset.transform)
+
+    def _block_window(self, dataset, window):
+        """Expand a window to the internal blocks of a dataset.
+
+        Whole blocks are fetched as contiguous byte ranges instead of partial blocks cut by the
+        window. Returns the block aligned window, its output shape on the grid resolution and the
+        (row, col) offset of the requested window inside it, or None when the expanded window does
+        not fall on whole grid pixels (non integer resolution ratios) or leaves the dataset.
+        """
+        block_height, block_width = dataset.block_shapes[0]
+        scale_y = abs(dataset.transform.e / self.transform.e)
+        scale_x = abs(dataset.transform.a / self.transform.a)
+        if window.row_off < 0 or window.col_off < 0 or \
+                window.row_off + window.height > dataset.height + _EPSILON or \
+                window.col_off + window.width > dataset.width + _EPSILON:
+            return None
+
+        row_start = math.floor(window.row_off / block_height) * block_height
+        col_start = math.floor(window.col_off / block_width) * block_width
+        row_stop = min(math.ceil((window.row_off + window.height) / block_height) * block_height, dataset.height)
+        col_stop = min(math.ceil((window.col_off + window.width) / block_width) * block_width, dataset.width)
+
+        values = [(row_stop - row_start) * scale_y, (col_stop - col_start) * scale_x,
+                  (window.row_off - row_start) * scale_y, (window.col_off - col_start) * scale_x]
+        if any(abs(value - round(value)) > 1e-6 for value in values):
+            return None
+        height, width, row, col = (int(round(value)) for value in values)
+        return Window(col_start, row_start, col_stop - col_start, row_stop - row_start), (height, width), (row, col)
+
+    @classmethod
+    def from_datasets(cls, datasets, bbox=None, resolution=None, resampling=None, snap=False):
+        """Build the grid covering a bounding box, aligned to the finest dataset.
+
+        Parameters
+
+         - datasets <list of rasterio.DatasetReader, required>: The bands of a tile, on the same CRS.
+
+         - bbox <list of float, optional>: Bounding box on the datasets CRS, the extent of the finest dataset by default.
+
+         - resolution <float, optional>: Pixel size on CRS units, the finest resolution of the datasets by default.
+
+         - resampling <string or dictionary, optional>: See Grid.
+
+         - snap <boolean, optional>: See Grid.
+        """
+        finest = min(datasets, key=lambda dataset: abs(dataset.transform.a))
+        resolution = float(resolution or abs(finest.transform.a))
+        x0, y0 = finest.transform.c, finest.transform.f
+        if bbox:
+            minx, maxx = sorted((bbox[0], bbox[2]))
+            miny, maxy = sorted((bbox[1], bbox[3]))
+        else:
+            minx, miny, maxx, maxy = finest.bounds
+
+        left = x0 + math.floor((minx - x0) / resolution + _EPSILON) * resolution
+        right = x0 + math.ceil((maxx - x0) / resolution - _EPSILON) * resolution
+        top = y0 - math.floor((y0 - maxy) / resolution + _EPSILON) * resolution
+        bottom = y0 - math.ceil((y0 - miny) / resolution - _EPSILON) * resolution
+
+        return cls(
+            finest.crs,
+            Affine(resolution, 0, left, 0, -resolution, top),
+            int(round((right - left) / resolution)),
+            int(round((top - bottom) / resolution)),
+            resampling,
+            snap
+        )
@@ -20,7 +20,7 @@ the Free Software Foundation; either version 2 of the License, or (at your optio
 import datetime
 
 from .spectral import Spectral
-from .utils import Utils
+from .utils import Utils, band_cache, check_authorization, gdal_env, open_dataset
 
 import rasterio
 from rasterio.crs import CRS
@@ -33,6 +33,80 @@ from rasterio.windows import Window
 
 
 
+def band_window(dataset, bbox=None, crs=None, rows=None):
+    """Get the window of a bounding box over a dataset (the full dataset without bounding box).
+
+    Lengths are rounded to whole pixels, so a subset of `rows` reads the same pixels as the full window.
+
+    Parameters
+
+     - dataset <rasterio.DatasetReader, required>: The opened raster.
+
+     - bbox <tupple, optional>: The bounding box value with longitude and latitude values.
+
+     - crs <string, optional>: The CRS of the bounding box (default is EPSG:4326).
+
+     - rows <tuple, optional>: The (start, stop) rows of the window.
+    """
+    if not bbox:
+        window = Window(0, 0, dataset.width, dataset.height)
+    else:
+        source_crs = 4326
+        if crs:
+            source_crs = CRS.from_string(crs)
+        new_bbox = Utils.reproj_bbox(bbox,source_crs)
+        window = from_bounds(*new_bbox, dataset.transform).round_lengths()
+    if rows:
+        start, stop = rows
+        window = Window(window.col_off, window.row_off + start, window.width, stop - start)
+    return window
+
+
+def read_band(href, band_name, bbox=None, grid=None, crs=None, rows=None, out_shape=None, cache=False):
+    """Read a band window from a raster href, without building an Image.
+
+    With `cache`, whole windows are kept in the process band cache (see config.BAND_CACHE_BYTES)
+    and shared as read-only arrays, so the indices of a date read each band once. Otherwise (and
+    for blocks of rows) the band is read directly into a new array.
+
+    Parameters
+
+     - href <string, required>: The raster file path or url.
+
+     - band_name <string, required>: The band commom name.
+
+     - bbox <tupple, optional>: The bounding box value with longitude and latitude values.
+
+     - grid <Grid, optional>: The target grid where the band is resampled while reading.
+
+     - crs <string, optional>: The CRS of the bounding box (default is EPSG:4326).
+
+     - rows <tuple, optional>: The (start, stop) rows to read, relative to the bounding box window.
+
+     - out_shape <tuple, optional>: A smaller (rows, cols) shape for previews, GDAL reads it from the matching overview.
+
+     - cache <bool, optional>: Return the read-only array of the band cache.
+    """
+    if rows or not cache:
+        return _read_band(href, band_name, bbox, grid, crs, rows, out_shape)
+    key = (href, band_name, crs, bbox and tuple(bbox), out_shape, grid and grid.key(band_name))
+    return band_cache.get(key, lambda: _read_band(href, band_name, bbox, grid, crs, None, out_shape))
+
+
+def _read_band(href, band_name, bbox=None, grid=None, crs=None, rows=None, out_shape=None):
+    if bbox:
+        # Check Authorization, once per href
+        check_authorization(href)
+
+    dataset = open_dataset(href)
+    with gdal_env():
+        if grid:
+            return grid.read(dataset, band_name, rows, out_shape)
+        elif bbox or rows:
+            return dataset.read(1, window=band_window(dataset, bbox, crs, rows), out_shape=out_shape)
+        return dataset.read(1, out_shape=out_shape)
+
+
 class Image():
     """Abstraction to rasters files collected by STAC.py.
 
@@ -44,6 +118,8 @@ class Image():
 
      - bbox <tupple, required>: The bounding box value with longitude and latitude values.
 
+     - grid <Grid, optional>: The target grid where every band is resampled while reading (default is the native grid of each band).
+
     Methods:
 
         listBands, getBand,
@@ -55,7 +131,7 @@ class Image():
      - AttributeError and ValueError: If a given parameter is not correctly formatted.
     """
 
-    def __init__(self, item, bands, bbox):
+    def __init__(self, item, bands, bbox, grid=None):
         """Build the Image Object for collected items from STAC."""
         self.utils = Utils()
         self.spectral = Spectral()
@@ -71,14 +147,14 @@ class Image():
         self.item = item
         self.bands = bands
         self.bbox = bbox
+        self.grid = grid
         self.tile = item.properties['bdc:tiles'][0]
 
     def listBands(self):
         """Get a list with available bands commom name."""
         return list(self.bands.keys())
 
-    def getBand(self, band_name,crs=None):
-        from rasterio.windows import from_bounds
+    def getBand(self, band_name,crs=None, rows=None, out_shape=None, cache=False):
         """Get bands from STAC item using commom name for band.
 
         Parameters
@@ -87,32 +163,19 @@ class Image():
 
          - wd <rasterio.Window, optional>: The window from rasterio abstration for crop images.
 
-        Raise
-
-         - ValueError: If the resquested key not exists.
-
-        """
+         - rows <tuple, optional>: The (start, stop) rows to read, relative to the bounding box window.
 
-        if self.bbox:
-                # Check Authorization
-            _ = Utils.safe_request(self.item.assets[band_name].href, method='head')
+         - out_shape <tuple, optional>: A smaller (rows, cols) shape for previews, GDAL reads it from the matching overview.
 
-            source_crs = 4326
-            if crs:
-                source_crs = CRS.from_string(crs)
+         - cache <bool, optional>: Share the read-only window of the band cache instead of reading a new array.
 
-            with rasterio.open(self.item.assets[band_name].href) as dataset:
-                new_bbox = Utils.reproj_bbox(self.bbox,source_crs)
-                window = from_bounds(*new_bbox, dataset.transform)
+        Raise
 
-                asset = dataset.read(1, window=window)
-        else:
-            with rasterio.open(self.item.assets[band_name].href) as dataset:
-                asset = dataset.read(1)
+         - ValueError: If the resquested key not exists.
 
-            
-    
-        return asset
+        """
+        return read_band(self.item.assets[band_name].href, band_name, self.bbox, self.grid, crs, rows, out_shape,
+                         cache)
     
     def read_raster(self,band_name, band=None, block_size=1):
         """Read all or some bands from raster
@@ -144,7 +207,7 @@ class Image():
 
         """
         def read_window(raster_path, window, band):
-            with rasterio.open(raster_path) as src:
+            with gdal_env(), rasterio.open(raster_path) as src:
                 return src.read(band, window=window)
 
         def resize_window(window, block_size):
@@ -158,7 +221,7 @@ class Image():
             return [(pos, resize_window(win, block_size))
                     for pos, win in dataset.block_windows(band)]
 
-        with rasterio.open(path) as src:
+        with gdal_env(), rasterio.open(path) as src:
             h, w = src.block_shapes[band - 1]
             chunks = (h * block_size, w * block_size)
             name = 'raster-{}'.format(tokenize(path, band, chunks))
@@ -174,7 +237,7 @@ class Image():
 
     def get_band_count(raster_path):
         """Read raster band count"""
-        with rasterio.open(raster_path) as src:
+        with gdal_env(), rasterio.open(raster_path) as src:
             return src.count
     
 
@@ -196,7 +259,7 @@ class Image():
             # Check Authorization
         _ = Utils.safe_request(self.item.assets[band_name].href, method='head')
 
-        with rasterio.open(self.item.assets[band_name].href) as dataset:
+        with gdal_env(), rasterio.open(self.item.assets[band_name].href) as dataset:
             windows = [window for ij, window in dataset.block_windows()]
 
             asset = dataset.read(1, window=windows[0])
@@ -206,53 +269,69 @@ class Image():
     
     
 
-    def getNDVI(self):
+    def getNDVI(self, out_shape=None):
         """Calculate the Normalized Difference Vegetation Index - NDVI by image colected values.
 
+        Parameters
+
+         - out_shape <tuple, optional>: A smaller (rows, cols) shape for previews.
+
         Raise
 
          - KeyError: If the required band does not exist.
         """
         return self.spectral._ndvi(
-            nir=self.getBand("B08"),
-            red=self.getBand("B04")
+            nir=self.getBand("B08", out_shape=out_shape, cache=True),
+            red=self.getBand("B04", out_shape=out_shape, cache=True)
         )
 
-    def getNDWI(self):
+    def getNDWI(self, out_shape=None):
         """Calculate the Normalized Difference Water Index - NDWI by image colected values.
 
+        Parameters
+
+         - out_shape <tuple, optional>: A smaller (rows, cols) shape for previews.
+
         Raise
 
          - KeyError: If the required band does not exist.
         """
         return self.spectral._ndwi(
-            nir=self.getBand("B08"),
-            green=self.getBand("B03")
+            nir=self.getBand("B08", out_shape=out_shape, cache=True),
+            green=self.getBand("B03", out_shape=out_shape, cache=True)
         )
 
-    def getNDBI(self):
+    def getNDBI(self, out_shape=None):
         """Calculate the Normalized Difference Built-up Index - NDBI by image colected values.
 
+        Parameters
+
+         - out_shape <tuple, optional>: A smaller (rows, cols) shape for previews.
+
         Raise
 
          - KeyError: If the required band does not exist.
         """
         return self.spectral._ndbi(
-            nir=self.getBand("B08"),
-            swir1=self.getBand("B11")
+            nir=self.getBand("B08", out_shape=out_shape, cache=True),
+            swir1=self.getBand("B11", out_shape=out_shape, cache=True)
         )
 
-    def getRGB(self):
+    def getRGB(self, out_shape=None):
         """Get thee RGB image with real color.
 
+        Parameters
+
+         - out_shape <tuple, optional>: A smaller (rows, cols) shape for previews.
+
         Raise
 
          - KeyError: If the required band does not exist.
         """
         return self.spectral._rgb(
-            red=self.getBand("B04"),
-            green=self.getBand("B03"),
-            blue=self.getBand("B02")
+            red=self.getBand("B04", out_shape=out_shape, cache=True),
+            green=self.getBand("B03", out_shape=out_shape, cache=True),
+            blue=self.getBand("B02", out_shape=out_shape, cache=True)
         )
 
     def _afimPointsToCoord(self, x, y, band):
@@ -0,0 +1,146 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Best-pixel mosaics of the items of a tile sharing a date (overlapping scenes or several collections).
+
+Methods:
+
+    scl_rank, mosaic_winner, mosaic_band, read_mosaic
+"""
+
+import numpy as np
+
+from .image import read_band
+from .utils import open_dataset
+
+# Rank of each SCL class, lower is better: vegetation, bare soil and water first, then
+# unclassified, dark areas, snow, cloud shadows, cirrus, medium and high probability clouds,
+# saturated pixels and no data (classes above 11 are ranked as no data)
+SCL_RANKS = np.array([9, 8, 2, 4, 0, 0, 0, 1, 6, 7, 5, 3, 9], dtype=np.uint8)
+WORST_RANK = 9
+
+
+def scl_rank(scl):
+    """Return the rank of each pixel of a SCL band, lower is better."""
+    return SCL_RANKS[np.minimum(scl, len(SCL_RANKS) - 1)]
+
+
+def _read(href, band_name, grid, rows=None):
+    # No bounding box: the items were already checked by the reads of the first item of each date
+    return read_band(href, band_name, None, grid, rows=rows)
+
+
+def _window_of(mask):
+    """Return the (row, col, height, width) box of the True pixels of a mask."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    return int(rows[0]), int(cols[0]), int(rows[-1] - rows[0] + 1), int(cols[-1] - cols[0] + 1)
+
+
+def mosaic_winner(hrefs, band_name, grid, quality_hrefs=None, quality_band=None, rows=None):
+    """Return the (y, x) index of the item giving each pixel of the mosaic of a date.
+
+    The quality of an item is the rank of its SCL class when it has the quality band, otherwise
+    whether its reference band has data. Each pixel takes the item with the best quality, ties
+    going to the first item, so the result only depends on the item order.
+
+    Parameters
+
+     - hrefs <list of string, required>: The href of the reference band of each item, by priority.
+
+     - band_name <string, required>: The reference band, used for items without the quality band.
+
+     - grid <Grid, required>: The grid of the tile.
+
+     - quality_hrefs <list of string, optional>: The href of the quality band of each item (None where missing).
+
+     - quality_band <string, optional>: The SCL band name.
+
+     - rows <tuple, optional>: The (start, stop) grid rows to read.
+    """
+    quality_hrefs = quality_hrefs or [None] * len(hrefs)
+    ranks = []
+    for href, quality_href in zip(hrefs, quality_hrefs):
+        if quality_href is not None:
+            ranks.append(scl_rank(_read(quality_href, quality_band, grid, rows)))
+        else:
+            values = _read(href, band_name, grid, rows)
+            nodata = open_dataset(href).nodata
+            ranks.append(np.where(values == nodata, WORST_RANK, 0).astype(np.uint8) if nodata is not None
+                         else np.zeros(values.shape, dtype=np.uint8))
+    # argmin keeps the first item among the best ranked ones
+    return np.argmin(np.stack(ranks), axis=0).astype(np.uint8)
+
+
+def mosaic_band(winner, hrefs, band_name, grid, rows=None):
+    """Read a band of the mosaic of a date from its winner map (see mosaic_winner).
+
+    Each item is only read in the box around the pixels it wins, items winning no pixel are not read.
+
+    Parameters
+
+     - winner <numpy.ndarray, required>: The (y, x) item index of each pixel.
+
+     - hrefs <list of string, required>: The href of the band of each item, by priority.
+
+     - band_name <string, required>: The band to read.
+
+     - grid <Grid, required>: The grid of the tile.
+
+     - rows <tuple, optional>: The (start, stop) grid rows of the winner map.
+    """
+    start = rows[0] if rows else 0
+    out = None
+    for k, href in enumerate(hrefs):
+        mask = winner == k
+        if not mask.any():
+            continue
+        row, col, height, width = _window_of(mask)
+        values = _read(href, band_name, grid.subgrid(start + row, col, height, width))
+        if out is None:
+            out = np.zeros(winner.shape, dtype=values.dtype)
+        region = (slice(row, row + values.shape[0]), slice(col, col + values.shape[1]))
+        np.copyto(out[region], values, where=mask[region])
+    return out
+
+
+def read_mosaic(hrefs, band_names, grid, quality_hrefs=None, quality_band=None, rows=None):
+    """Read the best pixel of the items of a date for a list of bands.
+
+    The winner map is computed once from the quality of every item (see mosaic_winner), then
+    each band is read where its items win (see mosaic_band).
+
+    Parameters
+
+     - hrefs <list of list of string, required>: The hrefs of the bands of each item, by priority.
+
+     - band_names <list of string, required>: The bands to read.
+
+     - grid <Grid, required>: The grid of the tile.
+
+     - quality_hrefs <list of string, optional>: The href of the quality band of each item (None where missing).
+
+     - quality_band <string, optional>: The SCL band name.
+
+     - rows <tuple, optional>: The (start, stop) grid rows to read.
+
+    Returns the list of (y, x) arrays of the bands.
+    """
+    winner = mosaic_winner([item_hrefs[0] for item_hrefs in hrefs], band_names[0], grid, quality_hrefs,
+                           quality_band, rows)
+    return [mosaic_band(winner, [item_hrefs[b] for item_hrefs in hrefs], band_name, grid, rows)
+            for b, band_name in enumerate(band_names)]
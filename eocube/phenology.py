@@ -0,0 +1,210 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Per-pixel time series smoothing and phenology kernels over (pixel, time) matrices.
+
+Methods:
+
+    savgol_coefficients, savgol_mtx_numba, whittaker_mtx_numba, phenology_mtx_numba
+"""
+
+import numba as nb
+import numpy as np
+
+from .interpolate import interpolate_vec_numba, nan_helper_numba
+
+PHENOLOGY_METRICS = ("sos", "eos", "los", "peak", "peak_time", "amplitude", "base", "integral")
+N_METRICS = len(PHENOLOGY_METRICS)
+
+
+def savgol_coefficients(window, order):
+    """Calculate the Savitzky-Golay smoothing coefficients.
+
+    Parameters
+
+     - window <int, required>: Odd number of dates in the moving window.
+
+     - order <int, required>: Order of the fitted polynomial, lower than window.
+
+    Raise
+
+     - ValueError: If the window is even or not greater than the order.
+    """
+    if window % 2 != 1 or window <= order:
+        raise ValueError("The window must be odd and greater than the polynomial order.")
+    half = window // 2
+    x = np.arange(-half, half + 1, dtype=np.float64)
+    vandermonde = np.vander(x, order + 1, increasing=True)
+    # First row of the pseudo inverse gives the fitted value at the center of the window
+    return np.linalg.pinv(vandermonde)[0].astype(np.float32)
+
+
+@nb.njit(parallel=True)
+def savgol_mtx_numba(mtx, cloud, coeffs):
+    nrows, ncols = mtx.shape
+    half = coeffs.shape[0] // 2
+    smoothed = np.empty(mtx.shape, dtype=np.float32)
+
+    for i in nb.prange(nrows):
+        # Fill masked dates before filtering, as in interpolate_mtx_numba
+        row = interpolate_vec_numba(mtx[i, :].copy(), cloud[i, :])
+        for j in range(ncols):
+            acc = 0.0
+            for k in range(-half, half + 1):
+                # Repeat the edge dates outside the series
+                idx = min(max(j + k, 0), ncols - 1)
+                acc += coeffs[k + half] * row[idx]
+            smoothed[i, j] = acc
+
+    return smoothed
+
+
+@nb.njit
+def whittaker_vec_numba(y, w, lmbda, out):
+    # Solve (W + lambda D'D) z = W y, D being the second order differences,
+    # with a LDL' factorization of the symmetric pentadiagonal system
+    n = y.shape[0]
+    d = np.empty(n)
+    e = np.zeros(n)
+    f = np.zeros(n)
+    for i in range(n):
+        if i == 0 or i == n - 1:
+            d[i] = w[i] + lmbda
+        elif i == 1 or i == n - 2:
+            d[i] = w[i] + 5 * lmbda
+        else:
+            d[i] = w[i] + 6 * lmbda
+        if i < n - 1:
+            e[i] = -2 * lmbda if i == 0 or i == n - 2 else -4 * lmbda
+        if i < n - 2:
+            f[i] = lmbda
+
+    diag = np.empty(n)
+    l1 = np.zeros(n)
+    l2 = np.zeros(n)
+    z = np.empty(n)
+    for i in range(n):
+        diag[i] = d[i]
+        z[i] = w[i] * y[i]
+        if i >= 1:
+            diag[i] -= l1[i - 1] * l1[i - 1] * diag[i - 1]
+            z[i] -= l1[i - 1] * z[i - 1]
+        if i >= 2:
+            diag[i] -= l2[i - 2] * l2[i - 2] * diag[i - 2]
+            z[i] -= l2[i - 2] * z[i - 2]
+        l1[i] = e[i]
+        if i >= 1:
+            l1[i] -= l1[i - 1] * diag[i - 1] * l2[i - 1]
+        l1[i] /= diag[i]
+        l2[i] = f[i] / diag[i]
+
+    for i in range(n - 1, -1, -1):
+        out[i] = z[i] / diag[i]
+        if i + 1 < n:
+            out[i] -= l1[i] * out[i + 1]
+        if i + 2 < n:
+            out[i] -= l2[i] * out[i + 2]
+    return out
+
+
+@nb.njit(parallel=True)
+def whittaker_mtx_numba(mtx, cloud, lmbda):
+    nrows, ncols = mtx.shape
+    smoothed = np.empty(mtx.shape, dtype=np.float32)
+
+    for i in nb.prange(nrows):
+        nans, idx = nan_helper_numba(mtx[i, :], cloud[i, :])
+        y = np.empty(ncols)
+        w = np.empty(ncols)
+        n_valid = 0
+        for j in range(ncols):
+            if nans[j]:
+                # Masked dates get zero weight and are filled by the smoother
+                y[j] = 0.0
+                w[j] = 0.0
+            else:
+                y[j] = mtx[i, j]
+                w[j] = 1.0
+                n_valid += 1
+        if n_valid < 2 or ncols < 3:
+            for j in range(ncols):
+                smoothed[i, j] = np.nan if nans[j] else mtx[i, j]
+            continue
+        out = np.empty(ncols)
+        whittaker_vec_numba(y, w, lmbda, out)
+        for j in range(ncols):
+            smoothed[i, j] = out[j]
+
+    return smoothed
+
+
+@nb.njit
+def _crossing(t0, t1, v0, v1, level):
+    if v1 == v0:
+        return t1
+    return t0 + (level - v0) * (t1 - t0) / (v1 - v0)
+
+
+@nb.njit(parallel=True)
+def phenology_mtx_numba(mtx, days, threshold):
+    nrows, ncols = mtx.shape
+    metrics = np.full((nrows, N_METRICS), np.nan, dtype=np.float32)
+
+    for i in nb.prange(nrows):
+        row = mtx[i, :]
+        if np.isnan(row).any():
+            continue
+        peak_idx = np.argmax(row)
+        peak = row[peak_idx]
+        left_min = row[:peak_idx + 1].min()
+        right_min = row[peak_idx:].min()
+        base = (left_min + right_min) / 2
+
+        # Start of season: last crossing of the threshold before the peak
+        sos_level = left_min + threshold * (peak - left_min)
+        sos_idx = 0
+        sos = days[0]
+        for j in range(peak_idx, 0, -1):
+            if row[j - 1] < sos_level <= row[j]:
+                sos_idx = j
+                sos = _crossing(days[j - 1], days[j], row[j - 1], row[j], sos_level)
+                break
+
+        # End of season: first crossing of the threshold after the peak
+        eos_level = right_min + threshold * (peak - right_min)
+        eos_idx = ncols - 1
+        eos = days[ncols - 1]
+        for j in range(peak_idx, ncols - 1):
+            if row[j] >= eos_level > row[j + 1]:
+                eos_idx = j
+                eos = _crossing(days[j], days[j + 1], row[j], row[j + 1], eos_level)
+                break
+
+        integral = 0.0
+        for j in range(sos_idx, eos_idx):
+            integral += (row[j] + row[j + 1]) * (days[j + 1] - days[j]) / 2
+
+        metrics[i, 0] = sos
+        metrics[i, 1] = eos
+        metrics[i, 2] = eos - sos
+        metrics[i, 3] = peak
+        metrics[i, 4] = days[peak_idx]
+        metrics[i, 5] = peak - base
+        metrics[i, 6] = base
+        metrics[i, 7] = integral
+
+    return metrics
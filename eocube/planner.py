@@ -0,0 +1,118 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Read cost estimates built from COG headers only, used by DataCube.plan.
+
+Methods:
+
+    block_range, asset_plan, recommend_chunk_rows
+"""
+
+import math
+
+import numpy as np
+
+
+def block_range(dataset, window):
+    """Return the (row_start, row_stop, col_start, col_stop) internal blocks of a dataset touched by a window.
+
+    Windows partially outside the dataset are clipped, windows fully outside touch no block.
+    """
+    block_height, block_width = dataset.block_shapes[0]
+    row_off = max(window.row_off, 0)
+    col_off = max(window.col_off, 0)
+    row_end = min(window.row_off + window.height, dataset.height)
+    col_end = min(window.col_off + window.width, dataset.width)
+    if row_end <= row_off or col_end <= col_off:
+        return 0, 0, 0, 0
+    return (int(math.floor(row_off / block_height)), int(math.ceil(row_end / block_height)),
+            int(math.floor(col_off / block_width)), int(math.ceil(col_end / block_width)))
+
+
+def _compressed_bytes(dataset, rows, cols, decoded_block):
+    """Sum the stored size of the blocks, the decoded size when the driver does not expose it."""
+    total = 0
+    for i in rows:
+        for j in cols:
+            try:
+                total += dataset.block_size(1, i, j)
+            except Exception:
+                total += decoded_block
+    return total
+
+
+def asset_plan(dataset, grid, row_blocks):
+    """Estimate the cost of reading one band of one date on a grid, block of rows by block of rows.
+
+    A tiled COG stores the blocks of a block row next to each other, so GDAL fetches every
+    block row touched by a read with one range request. Blocks shared by two consecutive
+    blocks of rows are fetched (and decoded) by both.
+
+    Parameters
+
+     - dataset <rasterio.DatasetReader, required>: The opened raster, only its header is used.
+
+     - grid <Grid, required>: The grid of the tile.
+
+     - row_blocks <list of tuple, required>: The (start, stop) grid rows read by each task.
+
+    Returns a dictionary with the window, blocks, requests, compressed, decompressed and output bytes.
+    """
+    itemsize = np.dtype(dataset.dtypes[0]).itemsize
+    block_height, block_width = dataset.block_shapes[0]
+    decoded_block = block_height * block_width * itemsize
+    window = grid.source_window(dataset).round_offsets().round_lengths()
+
+    blocks = requests = compressed = 0
+    for rows in row_blocks:
+        row_start, row_stop, col_start, col_stop = block_range(dataset, grid.source_window(dataset, rows))
+        blocks += (row_stop - row_start) * (col_stop - col_start)
+        requests += row_stop - row_start
+        compressed += _compressed_bytes(dataset, range(row_start, row_stop), range(col_start, col_stop), decoded_block)
+
+    return {
+        "window": (int(window.col_off), int(window.row_off), int(window.width), int(window.height)),
+        "blocks": blocks,
+        "requests": requests,
+        "compressed_bytes": compressed,
+        "decompressed_bytes": blocks * decoded_block,
+        "output_bytes": grid.height * grid.width * itemsize,
+    }
+
+
+def recommend_chunk_rows(grid, date_bytes_per_row, block_rows, workers, memory_limit):
+    """Recommend the rows of each chunk so that `workers` chunks of every band fit the memory limit.
+
+    The result is a multiple of the internal block height (on grid rows), so chunks do not split
+    blocks between tasks, and is at least one block and at most the grid height.
+
+    Parameters
+
+     - grid <Grid, required>: The grid of the tile.
+
+     - date_bytes_per_row <int, required>: Bytes held by one grid row of a chunk, for every band of a date.
+
+     - block_rows <float, required>: Grid rows covered by the tallest internal block of the bands.
+
+     - workers <int, required>: Number of chunks processed at the same time.
+
+     - memory_limit <int, required>: Memory budget in bytes.
+    """
+    block_rows = max(int(math.ceil(block_rows)), 1)
+    rows = memory_limit // max(workers * date_bytes_per_row, 1)
+    rows = max(rows // block_rows, 1) * block_rows
+    return int(min(rows, grid.height))
@@ -3,7 +3,19 @@ from ipywidgets import interact, IntSlider, fixed
 import numpy as np
 import re
 
-def plot_cube(cubo):
+def plot_cube(cubo, preview=True, figsize=(14, 10)):
+    """
+    Plota o cubo com sliders de banda e data.
+
+    Parâmetros:
+    -----------
+    cubo : xarray.DataArray
+        Cubo com as dimensões 'time', 'pixel' e opcionalmente 'band' (ver DataCube.cube_to_time_series).
+    preview : bool, opcional
+        Reduz a imagem ao tamanho em pixels da figura antes de plotar.
+    figsize : tuple, opcional
+        Tamanho da figura em polegadas.
+    """
     def plot_data(band, time_index):
         plt.clf()
         
@@ -17,9 +29,15 @@ def plot_cube(cubo):
         
     
         reshaped_data = data.values.reshape(cubo.attrs['y_dim'], cubo.attrs['x_dim'])
+        if preview:
+            # Pular pixels que não aparecem na resolução da figura
+            dpi = plt.rcParams['figure.dpi']
+            step = max(1, int(np.ceil(reshaped_data.shape[0] / (figsize[1] * dpi))),
+                       int(np.ceil(reshaped_data.shape[1] / (figsize[0] * dpi))))
+            reshaped_data = reshaped_data[::step, ::step]
         
         # Plotar a imagem
-        plt.figure(figsize=(14, 10))
+        plt.figure(figsize=figsize)
         img = plt.imshow(reshaped_data, cmap='Greens')
         cbar = plt.colorbar(img, fraction=0.046, pad=0.04)
         cbar.set_label('Value', rotation=270, labelpad=15)
@@ -0,0 +1,97 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Training samples: labeled points or label rasters, stratified selection and reads grouped by COG block.
+
+Methods:
+
+    point_labels, stratify, block_cells, read_samples
+"""
+
+import numpy as np
+
+from .image import read_band
+from .mosaic import read_mosaic
+
+
+def point_labels(points, label="label"):
+    """Return the longitudes, latitudes and labels of points.
+
+    Parameters
+
+     - points <required>: A GeoJSON FeatureCollection of points (or an object with __geo_interface__,
+       as a GeoDataFrame) whose label is the `label` property, or a list of (lon, lat, label) tuples.
+
+     - label <string, optional>: The label property of the features.
+    """
+    points = getattr(points, "__geo_interface__", points)
+    if isinstance(points, dict) and points.get("type") == "FeatureCollection":
+        features = points["features"]
+        coords = [feature["geometry"]["coordinates"][:2] for feature in features]
+        labels = [(feature.get("properties") or {}).get(label) for feature in features]
+    else:
+        coords = [point[:2] for point in points]
+        labels = [point[2] if len(point) > 2 else None for point in points]
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    return coords[:, 0], coords[:, 1], np.asarray(labels, dtype=object)
+
+
+def stratify(labels, n_per_class=None, seed=0):
+    """Return the sorted indices of at most `n_per_class` random samples of each label (all samples when None)."""
+    if not n_per_class:
+        return np.arange(len(labels))
+    rng = np.random.default_rng(seed)
+    keys = np.array([str(value) for value in labels])
+    selected = []
+    for key in np.unique(keys):
+        candidates = np.flatnonzero(keys == key)
+        selected.append(rng.choice(candidates, min(n_per_class, len(candidates)), replace=False))
+    return np.sort(np.concatenate(selected))
+
+
+def block_cells(rows, cols, cell_shape, offset=(0, 0)):
+    """Group grid pixels by the cell of `cell_shape` (the internal block footprint on the grid) holding them.
+
+    The grid rarely starts on a block boundary: `offset` is the (row, col) position of the first grid
+    pixel inside its block, so cells follow the blocks of the asset instead of the grid origin.
+
+    Returns a list of ((row, col, height, width) window covering the pixels of a cell, indices of the pixels).
+    """
+    cell_rows, cell_cols = cell_shape
+    block_rows, block_cols = (rows + offset[0]) // cell_rows, (cols + offset[1]) // cell_cols
+    cells = block_rows * (block_cols.max() + 1) + block_cols
+    order = np.argsort(cells, kind="stable")
+    _, starts = np.unique(cells[order], return_index=True)
+    groups = []
+    for indices in np.split(order, starts[1:]):
+        row, col = rows[indices].min(), cols[indices].min()
+        window = (int(row), int(col), int(rows[indices].max() - row + 1), int(cols[indices].max() - col + 1))
+        groups.append((window, indices))
+    return groups
+
+
+def read_samples(hrefs, band_names, grid, rows, cols, mosaic=None):
+    """Read the bands of one date on a small grid and return the (band, sample) values at its (row, col) pixels.
+
+    When several items share the date, `mosaic` holds the first arguments of mosaic.read_mosaic
+    (hrefs by item, bands, quality hrefs and quality band) and replaces `hrefs`.
+    """
+    if mosaic:
+        hrefs, bands, quality_hrefs, quality_band = mosaic
+        return np.stack([values[rows, cols] for values in read_mosaic(hrefs, bands, grid, quality_hrefs, quality_band)])
+    # No bounding box: the authorization check would double the requests of these small reads
+    return np.stack([read_band(href, band_name, None, grid)[rows, cols] for href, band_name in zip(hrefs, band_names)])
@@ -0,0 +1,210 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Shared HTTP session layer: connection pooling, retries with jittered backoff and per-host rate limiting.
+
+Methods:
+
+    RateLimitedRetry, get_session, get_adapter, mount, reset_sessions
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from eocube import config
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_lock = threading.Lock()
+_state = {"pid": None, "adapter": None}
+_sessions = threading.local()
+
+
+class TokenBucket():
+    """Thread safe token bucket allowing `rate` requests per second with bursts of `burst` requests.
+
+    Parameters
+
+     - rate <float, required>: Tokens added per second.
+
+     - burst <int, required>: Maximum number of tokens kept.
+    """
+
+    def __init__(self, rate, burst):
+        """Build a full bucket."""
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedRetry(Retry):
+    """urllib3 Retry taking a token from the bucket of the request host before each retry.
+
+    Retries happen inside urllib3, after the adapter took the token of the first send, so
+    without it retries (POST searches included) would bypass the rate limit.
+
+    Parameters
+
+     - limiter <callable, optional>: Called with the host before each retry, blocking until it may be sent.
+    """
+
+    def __init__(self, *args, limiter=None, host=None, **kwargs):
+        """Build the retry, args and kwargs are passed to urllib3.util.retry.Retry."""
+        self.limiter = limiter
+        self.host = host
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.limiter = self.limiter
+        retry.host = self.host
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if _pool is not None:
+            retry.host = _pool.host
+        return retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.limiter is not None and self.host:
+            self.limiter(self.host)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter taking a token from the bucket of the request host before each send.
+
+    Retries of a send happen inside urllib3: with a RateLimitedRetry as `max_retries` (see
+    get_adapter), each retry also takes a token after its jittered backoff.
+
+    Parameters
+
+     - rate <float, optional>: Requests per second by host, no limit when None or 0.
+
+     - burst <int, optional>: Requests allowed at once by host.
+
+     - timeout <float, optional>: Default timeout of requests sent without one.
+    """
+
+    def __init__(self, rate=None, burst=None, timeout=None, **kwargs):
+        """Build the adapter, kwargs are passed to requests.adapters.HTTPAdapter."""
+        self.rate = rate
+        self.burst = burst or rate
+        self.timeout = timeout
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def bucket(self, host):
+        """Return the token bucket of a host."""
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def acquire(self, host):
+        """Take a token from the bucket of a host, when rate limited."""
+        if self.rate:
+            self.bucket(host).acquire()
+
+    def send(self, request, **kwargs):
+        self.acquire(urlparse(request.url).hostname)
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _retry(limiter=None):
+    kwargs = dict(
+        limiter=limiter,
+        total=config.HTTP_RETRIES, backoff_factor=config.HTTP_BACKOFF, status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"HEAD", "GET", "POST", "OPTIONS"}), respect_retry_after_header=True,
+        raise_on_status=False, backoff_jitter=config.HTTP_BACKOFF_JITTER
+    )
+    try:
+        return RateLimitedRetry(**kwargs)
+    except TypeError:
+        # urllib3 < 2 has no jitter option
+        kwargs.pop("backoff_jitter")
+        return RateLimitedRetry(**kwargs)
+
+
+def get_adapter():
+    """Return the adapter shared by every session of this process, built from the HTTP_* settings of config.
+
+    The connection pools and the per-host token buckets live in the adapter, so they are shared
+    by all threads. A forked process builds its own adapter on first use.
+    """
+    with _lock:
+        if _state["pid"] != os.getpid() or _state["adapter"] is None:
+            adapter = RateLimitedAdapter(
+                rate=config.HTTP_RATE_LIMIT, burst=config.HTTP_BURST, timeout=config.HTTP_TIMEOUT,
+                pool_connections=config.HTTP_POOL_SIZE, pool_maxsize=config.HTTP_POOL_SIZE
+            )
+            # Retries take their token from the buckets of this adapter
+            adapter.max_retries = _retry(adapter.acquire)
+            _state["adapter"] = adapter
+            _state["pid"] = os.getpid()
+        return _state["adapter"]
+
+
+def mount(session):
+    """Mount the shared adapter on a requests.Session (for http and https) and return it."""
+    adapter = get_adapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Return the requests.Session of the current thread, mounted on the shared adapter."""
+    adapter = get_adapter()
+    session = getattr(_sessions, "session", None)
+    if session is None or session.get_adapter("https://") is not adapter:
+        session = _sessions.session = mount(requests.Session())
+    return session
+
+
+def reset_sessions():
+    """Drop the shared adapter, so the next session uses the current config (e.g. in tests)."""
+    with _lock:
+        if _state["adapter"] is not None:
+            _state["adapter"].close()
+        _state["adapter"] = None
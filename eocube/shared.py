@@ -0,0 +1,204 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Cube values in shared memory, handed to worker processes by name instead of being pickled.
+
+Methods:
+
+    SharedArray, share
+"""
+
+import threading
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+_TRACKER_LOCK = threading.Lock()
+
+
+def _open(name):
+    """Attach to an existing block without tracking it, the creating process owns its lifecycle."""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Before Python 3.13 attaching registers the block in the resource tracker of the process, which
+    # would unlink it when a worker exits (or warn when the owner unlinks it): only the registration of
+    # this block is skipped, blocks created meanwhile by other threads are still tracked
+    with _TRACKER_LOCK:
+        register = resource_tracker.register
+
+        def skip_block(block, rtype):
+            if rtype != "shared_memory" or block.lstrip("/") != name.lstrip("/"):
+                register(block, rtype)
+
+        resource_tracker.register = skip_block
+        try:
+            return SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _release(shm, owner):
+    try:
+        shm.close()
+    except BufferError:
+        # Arrays still view the block: it stays mapped until they are gone
+        pass
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _pack(coord):
+    """Replace evenly spaced integer values (as the pixel index of a time series) by a range, pickled in a few bytes."""
+    dims, values = coord if isinstance(coord, tuple) else (None, coord)
+    if isinstance(values, np.ndarray) and values.ndim == 1 and len(values) and np.issubdtype(values.dtype, np.integer):
+        step = int(values[1] - values[0]) if len(values) > 1 else 1
+        if step and np.array_equal(values, np.arange(int(values[0]), int(values[0]) + step * len(values), step)):
+            values = range(int(values[0]), int(values[0]) + step * len(values), step)
+    return (dims, values) if dims is not None else values
+
+
+def _attach(spec):
+    return SharedArray.attach(spec)
+
+
+class SharedArray():
+    """NumPy array in a named shared memory block.
+
+    Pickling a SharedArray (as done by ProcessPoolExecutor.submit or map) only sends its name, shape,
+    dtype and coordinates: the worker attaches to the same block and reads the values without a copy.
+    The process that created the block owns it and unlinks it on `close`, at the end of a `with`
+    block or when the object is garbage collected; attached copies only unmap it.
+
+    Parameters
+
+     - shape <tuple, required>: The shape of the array.
+
+     - dtype <numpy.dtype, required>: The type of the values.
+
+     - dims <list of string, optional>: The dimension names, used by to_xarray.
+
+     - coords <dictionary, optional>: The coordinates, used by to_xarray.
+
+     - attrs <dictionary, optional>: The attributes, used by to_xarray.
+
+    Methods:
+
+        attach, to_xarray, close
+    """
+
+    def __init__(self, shape, dtype, dims=None, coords=None, attrs=None, _shm=None):
+        """Create a new zeroed block, or wrap an attached one."""
+        self.shape = tuple(int(size) for size in shape)
+        self.dtype = np.dtype(dtype)
+        self.dims = list(dims) if dims is not None else None
+        self.coords = coords or {}
+        self.attrs = attrs or {}
+        self.owner = _shm is None
+        nbytes = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        self._shm = SharedMemory(create=True, size=nbytes) if _shm is None else _shm
+        self.name = self._shm.name
+        self.values = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        self._finalizer = weakref.finalize(self, _release, self._shm, self.owner)
+        self._spec = None
+
+    @property
+    def spec(self):
+        """The picklable description of the block: name, shape, dtype, dims, coords and attrs.
+
+        Coordinates that are integer ranges are sent as range objects, so the spec stays small.
+        """
+        if self._spec is None:
+            coords = {name: _pack(coord) for name, coord in self.coords.items()}
+            self._spec = dict(name=self.name, shape=self.shape, dtype=self.dtype.str, dims=self.dims, coords=coords,
+                              attrs=self.attrs)
+        return self._spec
+
+    @classmethod
+    def attach(cls, spec):
+        """Attach to the block described by `spec` (a SharedArray.spec dictionary), without copying its values."""
+        spec = dict(spec)
+        return cls(spec["shape"], spec["dtype"], spec.get("dims"), spec.get("coords"), spec.get("attrs"),
+                   _shm=_open(spec["name"]))
+
+    def __reduce__(self):
+        return _attach, (self.spec,)
+
+    def to_xarray(self):
+        """Return the values as an xarray.DataArray viewing the block."""
+        return xr.DataArray(self.values, coords=self.coords, dims=self.dims, attrs=dict(self.attrs))
+
+    def close(self):
+        """Release the block: unmap it, and unlink it when this process created it."""
+        self.values = None
+        self._finalizer()
+
+    @property
+    def closed(self):
+        """Whether the block was released."""
+        return not self._finalizer.alive
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        state = "closed" if self.closed else ("owner" if self.owner else "attached")
+        return f"<SharedArray {self.name} {self.shape} {self.dtype} {state}>"
+
+
+def share(data, scheduler="threads"):
+    """Copy an array into a new SharedArray.
+
+    The chunks of a dask array are computed and written directly in the shared block, so the
+    values are never held twice. Dimensions, coordinates and attributes of an xarray.DataArray
+    are kept.
+
+    Parameters
+
+     - data <numpy.ndarray, dask.array.Array or xarray.DataArray, required>: The values.
+
+     - scheduler <string, optional>: Dask scheduler of the chunks, it must run in this process.
+    """
+    dims = coords = attrs = None
+    if isinstance(data, xr.DataArray):
+        dims = list(data.dims)
+        coords = {name: (coord.dims, coord.values) if coord.dims else coord.values.item()
+                  for name, coord in data.coords.items()}
+        attrs = dict(data.attrs)
+        data = data.data
+    shared = SharedArray(data.shape, data.dtype, dims, coords, attrs)
+    try:
+        if isinstance(data, da.Array):
+            # Each chunk writes its own region of the block
+            da.store(data, shared.values, lock=False, scheduler=scheduler)
+        else:
+            np.copyto(shared.values, np.asarray(data))
+    except BaseException:
+        shared.close()
+        raise
+    return shared
@@ -17,9 +17,39 @@ the Free Software Foundation; either version 2 of the License, or (at your optio
 """
 
 
+import numba as nb
 import numpy as np
 
 
+@nb.njit(parallel=True)
+def matrix_diff_numba(matrix_t1, matrix_t2, out):
+    nrows, ncols = matrix_t1.shape
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            out[i, j] = np.float32(matrix_t2[i, j]) - np.float32(matrix_t1[i, j])
+    return out
+
+
+@nb.njit(parallel=True)
+def classify_diff_numba(_result, limiar_min, limiar_max, out):
+    nrows, ncols = _result.shape
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            d = _result[i, j]
+            out[i, j] = 1 if limiar_min < d <= limiar_max else 0
+    return out
+
+
+@nb.njit(parallel=True)
+def classify_change_numba(matrix_t1, matrix_t2, limiar_min, limiar_max, out):
+    nrows, ncols = matrix_t1.shape
+    for i in nb.prange(nrows):
+        for j in range(ncols):
+            d = np.float32(matrix_t2[i, j]) - np.float32(matrix_t1[i, j])
+            out[i, j] = 1 if limiar_min < d <= limiar_max else 0
+    return out
+
+
 class Spectral():
     """Abstraction to deal with indexes and operations related to image processing."""
 
@@ -149,24 +179,29 @@ class Spectral():
         # Função para verificar se as dimensões das matrizes são equivalentes
         return matrix_t1.shape == matrix_t2.shape
 
-    def _matrix_diff(self, matrix_t1, matrix_t2):
-        """Calculate the arithmetic difference (matrix_t1 - matrix_t).
+    def _matrix_diff(self, matrix_t1, matrix_t2, out=None):
+        """Calculate the arithmetic difference (matrix_t2 - matrix_t1) as float32.
 
         Parameters
 
-         - matrix_t1 <np.array, required>: A multidimensional matrix.
+         - matrix_t1 <np.array, required>: A 2-D matrix.
 
-         - matrix_t2 <np.array, required>: A multidimensional matrix.
+         - matrix_t2 <np.array, required>: A 2-D matrix.
+
+         - out <np.array, optional>: A float32 matrix to write the difference in place.
 
         Raise
 
          - ValueError: If the given matrix is not correctly formated.
         """
         # Função para cálculo das diferenças entre duas matrizes
-        _result = matrix_t2 - matrix_t1
-        return _result
+        if not self._validate_shape(matrix_t1, matrix_t2):
+            raise ValueError("As matrizes devem ter as mesmas dimensões")
+        if out is None:
+            out = np.empty(matrix_t1.shape, dtype=np.float32)
+        return matrix_diff_numba(matrix_t1, matrix_t2, out)
 
-    def _classify_diff(self, _result, limiar_min=0, limiar_max=0):
+    def _classify_diff(self, _result, limiar_min=0, limiar_max=0, out=None):
         """Classify difference based on limiar min and max.
 
         Parameters
@@ -177,18 +212,52 @@ class Spectral():
 
          - limiar_max <float, required>: The maximum value classified to difference to complete the interval.
 
+         - out <np.array, optional>: A uint8 matrix to write the classes in place.
+
         Raise
 
          - ValueError: If the given matrix is not correctly formated.
         """
         # Função para classificar as diferenças de uma matriz
-        if limiar_min > 0:
-            raise Exception("LimiarMin Inválido")
-        if limiar_max < 0:
-            raise Exception("LimiarMax Inválido")
+        self._validate_limiar(limiar_min, limiar_max)
         # Criar uma matriz de zeros (com o mesmo shape da matriz resultante)
         # limiar_min <= |_result| <= limiar_max
         # Critério de mudança:
         # As matrizes são consideradas iguais ou muito semelhantes
         # As matrizes sofreram "grandes" alterações
-        return np.where(_result <= limiar_min, 0, np.where(_result <= limiar_max, 1, 0))
+        if out is None:
+            out = np.empty(_result.shape, dtype=np.uint8)
+        return classify_diff_numba(_result, limiar_min, limiar_max, out)
+
+    def _classify_change(self, matrix_t1, matrix_t2, limiar_min=0, limiar_max=0, out=None):
+        """Classify the difference (matrix_t2 - matrix_t1) in a single pass, without difference temporaries.
+
+        Parameters
+
+         - matrix_t1 <np.array, required>: A 2-D matrix.
+
+         - matrix_t2 <np.array, required>: A 2-D matrix.
+
+         - limiar_min <float, required>: The minimum value classified to difference.
+
+         - limiar_max <float, required>: The maximum value classified to difference to complete the interval.
+
+         - out <np.array, optional>: A uint8 matrix to write the classes in place.
+
+        Raise
+
+         - ValueError: If the given matrix is not correctly formated.
+        """
+        if not self._validate_shape(matrix_t1, matrix_t2):
+            raise ValueError("As matrizes devem ter as mesmas dimensões")
+        self._validate_limiar(limiar_min, limiar_max)
+        if out is None:
+            out = np.empty(matrix_t1.shape, dtype=np.uint8)
+        return classify_change_numba(matrix_t1, matrix_t2, limiar_min, limiar_max, out)
+
+    def _validate_limiar(self, limiar_min, limiar_max):
+        """Verify the interval used to classify differences."""
+        if limiar_min > 0:
+            raise Exception("LimiarMin Inválido")
+        if limiar_max < 0:
+            raise Exception("LimiarMax Inválido")
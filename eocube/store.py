@@ -0,0 +1,237 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Persisted data cubes: one .npy file per tile and date plus a meta.json, refreshed incrementally.
+"""
+
+import contextlib
+import datetime
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+META_FILE = "meta.json"
+TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def date_file(path, tile, time):
+    """Return the .npy file of a tile and date inside a store."""
+    return os.path.join(path, tile, f"{time:{TIME_FORMAT}}.npy")
+
+
+def save_date(path, tile, time, data):
+    """Write the (band, y, x) values of a date, replacing the file only when complete."""
+    target = date_file(path, tile, time)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = target[:-4] + ".tmp.npy"
+    np.save(temporary, data)
+    os.replace(temporary, target)
+
+
+def stored_dates(path, tile):
+    """Return the dates (TIME_FORMAT strings) with a complete file in the directory of a tile."""
+    directory = os.path.join(path, tile)
+    if not os.path.isdir(directory):
+        return set()
+    return {name[:-4] for name in os.listdir(directory) if name.endswith(".npy") and not name.endswith(".tmp.npy")}
+
+
+def write_meta(path, meta):
+    """Replace the meta.json of a store."""
+    target = os.path.join(path, META_FILE)
+    with open(target + ".tmp", "w") as file:
+        json.dump(meta, file, indent=2)
+    os.replace(target + ".tmp", target)
+
+
+@contextlib.contextmanager
+def _meta_lock(path):
+    """Hold an exclusive lock of the meta.json of a store across processes (where fcntl is available)."""
+    with open(os.path.join(path, META_FILE + ".lock"), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def merge_meta(path, meta, tile):
+    """Write the parameters of `meta` and the timeline and grid of one tile, keeping the other tiles on disk.
+
+    Several processes can save different tiles in the same store: each one only replaces its tile.
+    """
+    with _meta_lock(path):
+        target = os.path.join(path, META_FILE)
+        current = {"timelines": {}, "grids": {}}
+        if os.path.exists(target):
+            with open(target) as file:
+                current = json.load(file)
+        merged = dict(meta, timelines=dict(current.get("timelines", {})), grids=dict(current.get("grids", {})))
+        merged["timelines"][tile] = meta["timelines"][tile]
+        merged["grids"][tile] = meta["grids"][tile]
+        merged["tiles"] = sorted(set(current.get("tiles") or []) | set(meta.get("tiles") or []))
+        for key, pick in (("start_date", min), ("end_date", max)):
+            values = [value for value in (current.get(key), meta.get(key)) if value]
+            merged[key] = pick(values) if values else None
+        write_meta(path, merged)
+    return merged
+
+
+class CubeStore():
+    """A data cube persisted on disk by DataCube.save.
+
+    Each date of each tile is a (band, y, x) .npy file, with the query bands followed by the
+    formulas, so new acquisitions are appended without touching the stored dates. meta.json keeps
+    the cube parameters, the grid of each tile and the stored timelines.
+
+    Parameters
+
+     - path <string, required>: The store directory.
+
+    Methods:
+
+        timeline, load, update
+
+    Raise
+
+     - FileNotFoundError: If the directory has no meta.json.
+    """
+
+    def __init__(self, path):
+        """Open an existing store."""
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as file:
+            self.meta = json.load(file)
+
+    @property
+    def tiles(self):
+        """The stored tiles."""
+        return sorted(self.meta["timelines"])
+
+    def timeline(self, tile=None):
+        """Return the stored dates of a tile (first tile by default) as datetime.datetime."""
+        tile = tile or self.tiles[0]
+        return [datetime.datetime.strptime(time, TIME_FORMAT) for time in self.meta["timelines"][tile]]
+
+    def load(self, tile=None, start_date=None, end_date=None, as_time_series=False):
+        """Return the stored cube of a tile as a lazy array backed by the memory mapped files.
+
+        Parameters
+
+         - tile <string, optional>: The tile to load, the first tile by default.
+
+         - start_date <string, optional>: First date formatted as "yyyy-mm-dd".
+
+         - end_date <string, optional>: Last date (inclusive) formatted as "yyyy-mm-dd".
+
+         - as_time_series <bool, optional>: Return a (band, pixel, time) time series cube, as DataCube.search.
+        """
+        tile = tile or self.tiles[0]
+        timeline = self.timeline(tile)
+        if start_date:
+            timeline = [time for time in timeline if time >= datetime.datetime.fromisoformat(start_date)]
+        if end_date:
+            last = datetime.datetime.fromisoformat(end_date) + datetime.timedelta(days=1)
+            timeline = [time for time in timeline if time < last]
+        if not timeline:
+            raise ValueError("No stored dates in the requested interval!")
+
+        dates = [da.from_array(np.load(date_file(self.path, tile, time), mmap_mode="r"), chunks=-1)
+                 for time in timeline]
+        data = da.stack(dates, axis=1)
+        bands = self.meta["bands"]
+        if as_time_series:
+            height, width = data.shape[2:]
+            result = xr.DataArray(
+                data.reshape(len(bands), len(timeline), -1).transpose(0, 2, 1),
+                coords={"band": bands, "pixel": range(height * width), "time": timeline},
+                dims=["band", "pixel", "time"],
+                name="TimeSeries"
+            )
+            result.attrs['y_dim'] = height
+            result.attrs['x_dim'] = width
+            return result
+        return xr.DataArray(
+            data,
+            coords={"band": bands, "time": timeline, "y": range(data.shape[2]), "x": range(data.shape[3])},
+            dims=["band", "time", "y", "x"],
+            name="DataCube"
+        )
+
+    def update(self, end_date=None, scheduler=None):
+        """Append the acquisitions published after the stored timeline.
+
+        STAC is queried only from the day after the last stored date of the tile lagging most
+        (interrupted runs resume), and only the dates missing from each tile are read and computed. Time series built by `load` include the new dates
+        as new columns, the stored rows are not rewritten.
+
+        Parameters
+
+         - end_date <string, optional>: Last date to query formatted as "yyyy-mm-dd", today by default.
+
+         - scheduler <string or distributed.Client, optional>: Dask scheduler used to read the new dates.
+
+        Returns the list of (tile, datetime) appended.
+
+        Raise
+
+         - ValueError: If the grid of a stored tile changed.
+        """
+        from .eocube import DataCube
+
+        meta = self.meta
+        # Each tile resumes after its own last date (from the store start for a tile without dates),
+        # the query starts at the earliest and save skips the dates a tile already has
+        starts = []
+        for tile in sorted(set(meta.get("tiles") or []) | set(self.tiles)):
+            timeline = self.timeline(tile) if tile in meta["timelines"] else []
+            starts.append((max(timeline) + datetime.timedelta(days=1)).strftime("%Y-%m-%d") if timeline
+                          else meta["start_date"])
+        start_date = min(starts)
+        end_date = end_date or datetime.date.today().strftime("%Y-%m-%d")
+        if start_date > end_date:
+            return []
+        try:
+            cube = DataCube(
+                collections=meta["collections"], query_bands=meta["query_bands"], start_date=start_date,
+                end_date=end_date, tiles=meta["tiles"], bbox=meta["bbox"], formulas=meta["formulas"],
+                scheduler=scheduler, resolution=meta["resolution"], resampling=meta["resampling"], snap=meta["snap"],
+                quality_band=meta.get("quality_band"), priority=meta.get("priority")
+            )
+        except ValueError:
+            # No new item since the last stored date
+            return []
+
+        for tile, grid in cube.grids.items():
+            stored = meta["grids"].get(tile)
+            if stored and (list(grid.transform)[:6] != stored["transform"] or
+                           [grid.width, grid.height] != [stored["width"], stored["height"]]):
+                raise ValueError(f"The grid of tile {tile} changed, please build a new store!")
+        appended = cube.save(self.path, scheduler=scheduler)
+        with open(os.path.join(self.path, META_FILE)) as file:
+            self.meta = json.load(file)
+        return appended
@@ -0,0 +1,146 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Multi-tile container keeping the own timeline of each tile, with alignment to regular time grids on request.
+
+Methods:
+
+    regular_times, half_step, fill_index, TileArrays
+"""
+
+import re
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+FILL_METHODS = ("nan", "nearest", "ffill", "bfill")
+
+
+def _start_freq(freq):
+    # Grids are anchored on starts: "1M", "Q" or "Y" (removed from recent pandas) become "1MS", "QS" or "YS"
+    match = re.fullmatch(r"(\d*)(M|Q|Y|A)", str(freq))
+    if match:
+        return f"{match.group(1)}{'Y' if match.group(2) == 'A' else match.group(2)}S"
+    return freq
+
+
+def regular_times(start, end, freq):
+    """Return the dates of a regular time grid from `start` to `end` (inclusive) as datetime.datetime.
+
+    Monthly, quarterly and yearly frequencies ("1M", "MS", "Q", "Y") give the first day of each month, quarter or year.
+    """
+    return [time.to_pydatetime() for time in pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end),
+                                                           freq=_start_freq(freq))]
+
+
+def half_step(times, freq):
+    """Return half the step of a regular time grid, the distance covered by each of its dates on either side.
+
+    Irregular steps (as "1M", months of 28 to 31 days) use the median step of the grid.
+    """
+    if len(times) > 1:
+        return pd.Series(pd.DatetimeIndex(times)).diff().median() / 2
+    start = pd.Timestamp(times[0]) if len(times) else pd.Timestamp(0)
+    return (start + pd.tseries.frequencies.to_offset(_start_freq(freq)) - start) / 2
+
+
+def fill_index(timeline, times, fill="nan", tolerance=None):
+    """Return, for each date of `times`, the position in `timeline` of the date filling it (-1 for a gap).
+
+    Parameters
+
+     - timeline <list of datetime, required>: The sorted dates of a tile.
+
+     - times <list of datetime, required>: The target dates.
+
+     - fill <string, optional>: nan (only exact dates), nearest, ffill (last date before) or bfill (first date after).
+
+     - tolerance <string or pandas.Timedelta, optional>: Maximum distance between a target and its filling date.
+
+    Raise
+
+     - ValueError: If the fill method is unknown.
+    """
+    if fill not in FILL_METHODS:
+        raise ValueError(f"Unknown fill method {fill}, use one of {list(FILL_METHODS)}.")
+    method = None if fill == "nan" else fill
+    index = pd.DatetimeIndex(timeline)
+    if method is None:
+        return index.get_indexer(pd.DatetimeIndex(times))
+    return index.get_indexer(pd.DatetimeIndex(times), method=method,
+                             tolerance=pd.Timedelta(tolerance) if tolerance is not None else None)
+
+
+class TileArrays(Mapping):
+    """Mapping of tile to its lazy (band, time) array of read tasks, each tile on its own timeline.
+
+    Unlike a concatenation over a tile dimension, no tile is padded with the dates of the others.
+    The timelines are also kept as a ragged index: `times` holds every date once and, for each
+    tile, `positions[offsets[i]:offsets[i + 1]]` the positions of its dates in `times`.
+
+    Parameters
+
+     - arrays <dictionary, required>: The xarray.DataArray of each tile, with band and time dimensions.
+
+    Methods:
+
+        sel, isel, timeline_of
+    """
+
+    def __init__(self, arrays):
+        """Build the container and its ragged time index."""
+        self._arrays = dict(arrays)
+        self.tiles = list(self._arrays)
+        timelines = [np.asarray(array.time.values, dtype="datetime64[us]") for array in self._arrays.values()]
+        self.times = np.unique(np.concatenate(timelines)) if timelines else np.array([], dtype="datetime64[us]")
+        self.positions = np.concatenate([np.searchsorted(self.times, timeline) for timeline in timelines]
+                                        ).astype(np.int32) if timelines else np.array([], dtype=np.int32)
+        self.offsets = np.cumsum([0] + [len(timeline) for timeline in timelines])
+
+    def __getitem__(self, tile):
+        return self._arrays[tile]
+
+    def __iter__(self):
+        return iter(self.tiles)
+
+    def __len__(self):
+        return len(self.tiles)
+
+    @property
+    def timeline(self):
+        """The dates of every tile, sorted, as datetime.datetime."""
+        return [time.item() for time in self.times]
+
+    def timeline_of(self, tile):
+        """The dates of a tile as datetime.datetime."""
+        i = self.tiles.index(tile)
+        return [self.times[position].item() for position in self.positions[self.offsets[i]:self.offsets[i + 1]]]
+
+    def sel(self, tile=None, **indexers):
+        """Select a tile (the first by default), then band or time with xarray.DataArray.sel."""
+        array = self._arrays[tile if tile is not None else self.tiles[0]]
+        return array.sel(**indexers) if indexers else array
+
+    def isel(self, tile=0, **indexers):
+        """Select a tile by position, then band or time with xarray.DataArray.isel."""
+        array = self._arrays[self.tiles[tile]]
+        return array.isel(**indexers) if indexers else array
+
+    def __repr__(self):
+        dates = ", ".join(f"{tile}: {self.offsets[i + 1] - self.offsets[i]}" for i, tile in enumerate(self.tiles))
+        return f"<TileArrays {len(self.tiles)} tiles, {len(self.times)} distinct dates ({dates})>"
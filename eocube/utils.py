@@ -17,6 +17,9 @@ the Free Software Foundation; either version 2 of the License, or (at your optio
 """
 
 import json
+import os
+import threading
+from collections import OrderedDict
 
 import rasterio
 import requests
@@ -25,6 +28,133 @@ import re
 import numpy as np
 import numba as nb
 
+from eocube import config
+from eocube.session import get_session
+
+_dataset_pool = threading.local()
+_authorized = set()
+_authorized_lock = threading.Lock()
+
+
+def gdal_env():
+    """Return a rasterio.Env with the GDAL options of `config.GDAL_ENV` tuned for remote COG reads.
+
+    Options already defined as environment variables are left to the environment. rasterio.Env
+    is thread local, so it is entered around each open and read instead of once per process.
+    """
+    options = {key: value for key, value in config.GDAL_ENV.items() if key not in os.environ}
+    return rasterio.Env(**options)
+
+
+def check_authorization(href):
+    """Check once per process that an href is readable with a HEAD request (see Utils.safe_request).
+
+    Only successful checks are remembered, so a denied href raises on every read.
+
+    Parameters
+
+     - href <string, required>: The raster url.
+    """
+    with _authorized_lock:
+        if href in _authorized:
+            return
+    Utils.safe_request(href, method='head')
+    with _authorized_lock:
+        _authorized.add(href)
+
+
+def open_dataset(href):
+    """Open a raster using the handle pool of the current thread.
+
+    Handles are kept open between reads and closed in least recently used order when the
+    pool exceeds `config.DATASET_POOL_SIZE`. Each thread (and therefore each dask worker)
+    keeps its own pool, since rasterio datasets must not be shared across threads.
+
+    Parameters
+
+     - href <string, required>: The raster file path or url.
+    """
+    pool = getattr(_dataset_pool, "handles", None)
+    if pool is None:
+        pool = _dataset_pool.handles = OrderedDict()
+    dataset = pool.get(href)
+    if dataset is not None and not dataset.closed:
+        pool.move_to_end(href)
+        return dataset
+    with gdal_env():
+        dataset = rasterio.open(href)
+    pool[href] = dataset
+    while len(pool) > max(config.DATASET_POOL_SIZE, 1):
+        _, expired = pool.popitem(last=False)
+        expired.close()
+    return dataset
+
+
+class BandCache():
+    """Process wide LRU of decoded band windows with single-flight loading.
+
+    Concurrent requests for the same key wait for the first one instead of reading the
+    raster again, so every band of a date is decoded once however many products use it.
+    Cached arrays are read-only, since they are shared by every caller.
+
+    Parameters
+
+     - max_bytes <int, optional>: Memory budget of the cache, `config.BAND_CACHE_BYTES` by default.
+    """
+
+    def __init__(self, max_bytes=None):
+        """Build an empty cache."""
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._arrays = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Return the array of a key, calling `loader()` only when no other thread is loading it."""
+        while True:
+            with self._lock:
+                array = self._arrays.get(key)
+                if array is not None:
+                    self._arrays.move_to_end(key)
+                    return array
+                event = self._loading.get(key)
+                if event is None:
+                    event = self._loading[key] = threading.Event()
+                    break
+            # Another thread is reading the key, take its result (or retry if it failed)
+            event.wait()
+
+        try:
+            array = loader()
+            array.setflags(write=False)
+            self._store(key, array)
+            return array
+        finally:
+            with self._lock:
+                del self._loading[key]
+            event.set()
+
+    def _store(self, key, array):
+        max_bytes = config.BAND_CACHE_BYTES if self.max_bytes is None else self.max_bytes
+        if array.nbytes > max_bytes:
+            return
+        with self._lock:
+            self._arrays[key] = array
+            self.nbytes += array.nbytes
+            while self.nbytes > max_bytes:
+                _, expired = self._arrays.popitem(last=False)
+                self.nbytes -= expired.nbytes
+
+    def clear(self):
+        """Drop every cached array."""
+        with self._lock:
+            self._arrays.clear()
+            self.nbytes = 0
+
+
+band_cache = BandCache()
+
 
 @nb.njit(parallel=True)
 def apply_labels(predictions, labels):
@@ -95,10 +225,10 @@ class Utils():
         # Verify if json_obj exists by boolean key
         if json_obj:
             # Return the requested response from url
-            return requests.post(url, data=json.dumps(obj), headers=headers).json()
+            return get_session().post(url, data=json.dumps(obj), headers=headers).json()
         else:
             # Uses get if json_obj not exists
-            return requests.get(url).json()
+            return get_session().get(url).json()
 
     def _validateBBOX(self, bbox):
         """Validate an input bounding box from user.
@@ -143,7 +273,7 @@ class Utils():
 
          - ValueError: If the resquested coordinate is invalid or not typed.
         """
-        with rasterio.open(raster_file) as dataset:
+        with gdal_env(), rasterio.open(raster_file) as dataset:
             coord = dataset.transform * (y, x)
             lon, lat = transform(
                 dataset.crs.wkt,
@@ -167,7 +297,7 @@ class Utils():
 
          - ValueError: If the resquested coordinate is invalid or not typed.
         """
-        with rasterio.open(raster_file) as dataset:
+        with gdal_env(), rasterio.open(raster_file) as dataset:
             coord = transform(
                 Proj(init=CRS.from_string("EPSG:4326")),
                 dataset.crs.wkt,
@@ -184,13 +314,16 @@ class Utils():
         :param method: HTTP Method name.
         :param kwargs: (optional) Any argument supported by `requests.request <https://docs.python-requests.org/en/latest/api/#requests.request>`_
 
+        The request goes through the shared session (see eocube.session), with pooled connections,
+        retries of transient errors and per-host rate limiting.
+
         :raise HTTPError - For any HTTP error related.
         :raise ConnectionError - For any error related ConnectionError such InternetError
 
         :rtype: requests.Response
         """
         try:
-            response = requests.request(method, url, **kwargs)
+            response = get_session().request(method, url, **kwargs)
 
             response.raise_for_status()
 
@@ -0,0 +1,187 @@
+"""
+API - EO Data Cube.
+
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Zonal statistics: polygons rasterized on the grid of a tile and reduced block by block with bincount.
+
+Methods:
+
+    zone_geometries, rasterize_zones, ZonalAccumulator
+"""
+
+import re
+
+import numpy as np
+from rasterio.features import rasterize
+from rasterio.warp import transform_geom
+
+ZONAL_STATS = ("count", "sum", "mean", "std", "min", "max", "median")
+_PERCENTILE = re.compile(r"^p(\d{1,2}(\.\d+)?|100)$")
+
+
+def zone_geometries(polygons):
+    """Return the zone ids and GeoJSON geometries of polygons.
+
+    Parameters
+
+     - polygons <required>: A GeoJSON FeatureCollection (or an object with __geo_interface__, as a
+       GeoDataFrame), a dictionary of id to geometry or a list of geometries. Features use their
+       "id" (the index of the feature when missing), lists use the position.
+    """
+    polygons = getattr(polygons, "__geo_interface__", polygons)
+    if isinstance(polygons, dict) and polygons.get("type") == "FeatureCollection":
+        features = polygons["features"]
+        ids = [feature.get("id", i) for i, feature in enumerate(features)]
+        geometries = [feature["geometry"] for feature in features]
+    elif isinstance(polygons, dict) and "type" not in polygons:
+        ids, geometries = list(polygons.keys()), list(polygons.values())
+    else:
+        if isinstance(polygons, dict):
+            polygons = [polygons]
+        ids, geometries = list(range(len(polygons))), list(polygons)
+    geometries = [getattr(geometry, "__geo_interface__", geometry) for geometry in geometries]
+    return ids, geometries
+
+
+def rasterize_zones(geometries, grid, crs="EPSG:4326"):
+    """Burn the zones on the grid of a tile, pixel values are the zone index plus one (0 outside every zone).
+
+    Where polygons overlap, the pixel belongs to the last one.
+
+    Parameters
+
+     - geometries <list of dictionary, required>: The GeoJSON geometries of the zones.
+
+     - grid <Grid, required>: The grid of the tile.
+
+     - crs <string, optional>: The CRS of the geometries.
+    """
+    shapes = [(transform_geom(crs, grid.crs, geometry), index + 1) for index, geometry in enumerate(geometries)]
+    return rasterize(shapes, out_shape=(grid.height, grid.width), transform=grid.transform, fill=0,
+                     dtype=np.int32)
+
+
+def _check_stats(stats):
+    for stat in stats:
+        if stat not in ZONAL_STATS and not _PERCENTILE.match(stat):
+            raise ValueError(f"Unknown statistic {stat}, use {list(ZONAL_STATS)} or percentiles as p10, p90.")
+
+
+class ZonalAccumulator():
+    """Accumulate statistics of every zone, band and date over blocks of rows.
+
+    Counts, sums and sums of squares are reduced with one bincount over the (band, date, zone)
+    index of every value, minimum and maximum with reduceat over the values sorted by zone.
+    Median and percentiles need the values themselves, so only the values inside zones are kept.
+
+    Parameters
+
+     - n_zones <int, required>: Number of zones.
+
+     - shape <tuple, required>: The (band, time) shape of the values.
+
+     - stats <list of string, required>: Statistics (count, sum, mean, std, min, max, median, pNN).
+
+     - nodata <number, optional>: Value ignored by the statistics.
+
+    Raise
+
+     - ValueError: If a statistic is unknown.
+    """
+
+    def __init__(self, n_zones, shape, stats, nodata=None):
+        """Build empty accumulators."""
+        _check_stats(stats)
+        self.n_zones = n_zones
+        self.shape = tuple(shape)
+        self.stats = list(stats)
+        self.nodata = nodata
+        size = self.shape + (n_zones,)
+        self.count = np.zeros(size, dtype=np.float64)
+        self.sum = np.zeros(size, dtype=np.float64)
+        self.sumsq = np.zeros(size, dtype=np.float64)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.pixels = np.zeros(n_zones, dtype=np.int64)
+        self._keep = any(stat == "median" or _PERCENTILE.match(stat) for stat in self.stats)
+        self._zones = []
+        self._values = []
+
+    def add(self, values, labels):
+        """Add a (band, time, y, x) block of values and the (y, x) zone labels of its pixels."""
+        inside = labels > 0
+        zones = labels[inside] - 1
+        if not len(zones):
+            return
+        order = np.argsort(zones, kind="stable")
+        zones = zones[order]
+        values = values[:, :, inside][:, :, order].astype(np.float64)
+        valid = np.ones(values.shape, dtype=bool) if self.nodata is None else values != self.nodata
+        self.pixels += np.bincount(zones, minlength=self.n_zones)
+
+        n_bands, n_times = self.shape
+        index = (np.arange(n_bands * n_times)[:, None] * self.n_zones + zones[None, :]).reshape(-1)
+        size = n_bands * n_times * self.n_zones
+        flat = values.reshape(-1)
+        weights = valid.reshape(-1).astype(np.float64)
+        self.count += np.bincount(index, weights=weights, minlength=size).reshape(self.count.shape)
+        self.sum += np.bincount(index, weights=flat * weights, minlength=size).reshape(self.sum.shape)
+        self.sumsq += np.bincount(index, weights=flat * flat * weights, minlength=size).reshape(self.sumsq.shape)
+
+        present, starts = np.unique(zones, return_index=True)
+        lowest = np.minimum.reduceat(np.where(valid, values, np.inf), starts, axis=2)
+        highest = np.maximum.reduceat(np.where(valid, values, -np.inf), starts, axis=2)
+        self.min[:, :, present] = np.minimum(self.min[:, :, present], lowest)
+        self.max[:, :, present] = np.maximum(self.max[:, :, present], highest)
+
+        if self._keep:
+            self._zones.append(zones)
+            self._values.append(np.where(valid, values, np.nan).astype(np.float32))
+
+    def _quantiles(self, q):
+        """Return the (band, time, zone) quantiles q (in [0, 1]) of the kept values."""
+        result = np.full(self.shape + (len(q), self.n_zones), np.nan)
+        if not self._zones:
+            return result
+        zones = np.concatenate(self._zones)
+        values = np.concatenate(self._values, axis=2)
+        order = np.argsort(zones, kind="stable")
+        zones, values = zones[order], values[:, :, order]
+        present, starts, counts = np.unique(zones, return_index=True, return_counts=True)
+        for zone, start, count in zip(present, starts, counts):
+            result[:, :, :, zone] = np.moveaxis(np.nanquantile(values[:, :, start:start + count], q, axis=2), 0, -1)
+        return result
+
+    def result(self):
+        """Return the dictionary of (band, time, zone) arrays of each statistic, NaN where a zone has no valid value."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum / self.count
+            output = {
+                "count": self.count.astype(np.int64),
+                "sum": self.sum,
+                "mean": mean,
+                "std": np.sqrt(np.maximum(self.sumsq / self.count - mean * mean, 0)),
+                "min": np.where(self.count > 0, self.min, np.nan),
+                "max": np.where(self.count > 0, self.max, np.nan),
+            }
+        percentiles = [stat for stat in self.stats if stat == "median" or _PERCENTILE.match(stat)]
+        if percentiles:
+            q = [0.5 if stat == "median" else float(stat[1:]) / 100 for stat in percentiles]
+            with np.errstate(invalid="ignore"):
+                values = self._quantiles(q)
+            for i, stat in enumerate(percentiles):
+                output[stat] = values[:, :, i]
+        return {stat: output[stat] for stat in self.stats}
@@ -37,7 +37,8 @@ tests_require = [
 
 extras_require = {
     'docs': docs_require,
-    'tests': tests_require
+    'tests': tests_require,
+    'parquet': ['pyarrow>=8']
 }
 
 extras_require['all'] = [req for _, reqs in extras_require.items() for req in reqs]
@@ -79,7 +80,11 @@ setup(
     zip_safe=False,
     include_package_data=True,
     platforms='any',
-    entry_points={},
+    entry_points={
+        'console_scripts': [
+            'eocube-build = eocube.cli:main',
+        ],
+    },
     extras_require=extras_require,
     install_requires=install_requires,
     setup_requires=setup_requires,
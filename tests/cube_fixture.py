@@ -0,0 +1,129 @@
+"""
+API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+
+Local Sentinel-2 like tiles and a STAC client answering from them, to build cubes without network.
+"""
+
+import datetime
+import os
+import zlib
+from unittest import mock
+
+import numpy as np
+import pystac
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+
+from eocube.eocube import DataCube
+from eocube.utils import Utils
+
+# Albers equal area projection of the BDC tiles
+BDC_WKT = (
+    'PROJCS["unknown",GEOGCS["unknown",DATUM["Unknown based on GRS80 ellipsoid",SPHEROID["GRS 1980",6378137,'
+    '298.257222101]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]],PROJECTION["Albers_Conic_Equal_Area"],'
+    'PARAMETER["latitude_of_center",-12],PARAMETER["longitude_of_center",-54],PARAMETER["standard_parallel_1",-2],'
+    'PARAMETER["standard_parallel_2",-22],PARAMETER["false_easting",5000000],PARAMETER["false_northing",10000000],'
+    'UNIT["metre",1],AXIS["Easting",EAST],AXIS["Northing",NORTH]]'
+)
+# Around the projection center (5000000, 10000000), not aligned on the 64 pixels blocks of the files
+BBOX = [-54.01, -12.01, -53.99, -11.99]
+ORIGIN = (4998000, 10002000)
+EXTENT = 4000
+BANDS10 = ("B02", "B03", "B04", "B08")
+BANDS20 = ("B11", "SCL")
+COLLECTION = "S2-16D-2"
+
+
+def write_band(path, band, resolution, seed):
+    """Write a tiled GeoTIFF with overviews, random reflectances or SCL classes."""
+    rng = np.random.default_rng(seed)
+    size = EXTENT // resolution
+    if band == "SCL":
+        values = rng.integers(3, 10, (size, size)).astype(np.uint8)
+    else:
+        values = rng.integers(0, 5000, (size, size)).astype(np.int16)
+    with rasterio.open(path, "w", driver="GTiff", width=size, height=size, count=1, dtype=values.dtype,
+                       crs=BDC_WKT, transform=from_origin(*ORIGIN, resolution, resolution), tiled=True,
+                       blockxsize=64, blockysize=64, compress="deflate") as dataset:
+        dataset.write(values, 1)
+        dataset.build_overviews([2, 4], Resampling.average)
+
+
+def make_items(root, dates=4, tiles=("028022",), collection=COLLECTION):
+    """Write the bands of each tile and date (every 16 days from 2021-01-01) and return their STAC items."""
+    items = []
+    for tile in tiles:
+        for d in range(dates):
+            time = datetime.datetime(2021, 1, 1) + datetime.timedelta(days=16 * d)
+            item_id = f"S2-16D_V2_{tile}_{time:%Y%m%d}"
+            item = pystac.Item(item_id, None, [-54.2, -12.2, -53.8, -11.8], time,
+                               {"bdc:tiles": [tile], "eo:cloud_cover": float(d)}, collection=collection)
+            item.properties["datetime"] = time.strftime("%Y-%m-%dT%H:%M:%SZ")
+            for band in BANDS10 + BANDS20:
+                path = os.path.join(root, f"{collection}_{item_id}_{band}.tif")
+                if not os.path.exists(path):
+                    write_band(path, band, 10 if band in BANDS10 else 20, seed=zlib.crc32(os.path.basename(path).encode()))
+                item.add_asset(band, pystac.Asset(path))
+            items.append(item)
+    return items
+
+
+class Client():
+    """STAC client searching a list of items by collection, date and tile.
+
+    Parameters
+
+     - items <list, required>: The STAC items of the catalog.
+    """
+
+    def __init__(self, items):
+        """Keep the items and count the searches."""
+        self.items = items
+        self.searches = []
+
+    def add_conforms_to(self, name):
+        pass
+
+    def search(self, collections=None, datetime=None, query=None, bbox=None, limit=None):
+        """Return a search whose items() are the matching items."""
+        self.searches.append(dict(collections=collections, datetime=datetime, query=query, bbox=bbox))
+        start, end = datetime.split("/")
+        tiles = (query or {}).get("bdc:tile", {}).get("in")
+        found = [item for item in self.items
+                 if item.collection_id in collections and start <= item.properties["datetime"][:10] <= end
+                 and (not tiles or item.properties["bdc:tiles"][0] in tiles)]
+        return mock.Mock(items=lambda: iter(found))
+
+
+def patch_stac(test, items):
+    """Answer the STAC searches of DataCube from `items` for the duration of a test, returns the client."""
+    client = Client(items)
+    for patcher in (mock.patch.object(DataCube, "_initialize_stac_client", lambda self: client),
+                    mock.patch.object(Utils, "safe_request", staticmethod(lambda *args, **kwargs: None))):
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return client
+
+
+def make_cube(query_bands=("B04", "B08"), start_date="2021-01-01", end_date="2021-03-31", **kwargs):
+    """Build a DataCube of COLLECTION over BBOX, with the synchronous scheduler unless given."""
+    kwargs.setdefault("collections", [COLLECTION])
+    kwargs.setdefault("bbox", BBOX)
+    kwargs.setdefault("scheduler", "synchronous")
+    return DataCube(query_bands=list(query_bands), start_date=start_date, end_date=end_date, **kwargs)
@@ -0,0 +1,122 @@
+"""
+API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eocube import config, session
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answers 503 to the first `failures` requests, then 200."""
+
+    failures = 0
+    requests = []
+
+    def _answer(self):
+        _Handler.requests.append((self.command, time.monotonic()))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        status = 503 if len(_Handler.requests) <= _Handler.failures else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSession(unittest.TestCase):
+    """Tests the token buckets and the retries of the shared HTTP session."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/search"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.settings = {name: getattr(config, name) for name in
+                         ("HTTP_RETRIES", "HTTP_BACKOFF", "HTTP_BACKOFF_JITTER", "HTTP_RATE_LIMIT", "HTTP_BURST")}
+        config.HTTP_BACKOFF = 0
+        config.HTTP_BACKOFF_JITTER = 0
+        config.HTTP_RETRIES = 5
+        _Handler.requests = []
+        _Handler.failures = 0
+        session.reset_sessions()
+
+    def tearDown(self):
+        for name, value in self.settings.items():
+            setattr(config, name, value)
+        session.reset_sessions()
+
+    def test_token_bucket(self):
+        """A bucket lets `burst` requests through at once, then `rate` by second."""
+        bucket = session.TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_retry_on_status(self):
+        """Requests failing with a retryable status are sent again, POST included."""
+        _Handler.failures = 2
+        response = session.get_session().post(self.url, json={})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([method for method, _ in _Handler.requests], ["POST"] * 3)
+
+    def test_retries_are_rate_limited(self):
+        """Each retry waits for a token of the host bucket, as the first send."""
+        config.HTTP_RATE_LIMIT = 10
+        config.HTTP_BURST = 1
+        _Handler.failures = 3
+        response = session.get_session().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        times = [sent for _, sent in _Handler.requests]
+        self.assertEqual(len(times), 4)
+        # One token each 0.1 second, with a small margin for the timer resolution
+        self.assertGreaterEqual(times[-1] - times[0], 0.25)
+
+    def test_shared_adapter(self):
+        """Sessions of different threads share the adapter, reset drops it."""
+        adapter = session.get_adapter()
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(session.get_session()))
+        thread.start()
+        thread.join()
+        self.assertIs(sessions[0].get_adapter(self.url), adapter)
+        self.assertIsInstance(adapter.max_retries, session.RateLimitedRetry)
+        session.reset_sessions()
+        self.assertIsNot(session.get_adapter(), adapter)
+
+
+if __name__ == '__main__':
+    unittest.main()
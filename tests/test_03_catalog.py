@@ -0,0 +1,127 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import datetime
+import tempfile
+import unittest
+
+import numpy as np
+import pystac
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.catalog import ItemTable, item_bounds
+
+
+def _item(id, date, tile, bbox=None, cloud=None, bands=("B04", "B08"), collection="S2-16D-2"):
+    item = pystac.Item(id, None, bbox, datetime.datetime.fromisoformat(date), {"bdc:tiles": [tile]},
+                       collection=collection)
+    # As items read from the STAC API
+    item.properties["datetime"] = date + "T00:00:00Z"
+    if cloud is not None:
+        item.properties["eo:cloud_cover"] = cloud
+    for band in bands:
+        item.add_asset(band, pystac.Asset(f"https://data/{id}_{band}.tif"))
+    return item
+
+
+class TestItemTable(unittest.TestCase):
+    """Tests the columnar table of STAC items."""
+
+    def setUp(self):
+        self.items = [
+            _item("c", "2021-01-17", "029022", [-47, -16, -46, -15], 40),
+            _item("a", "2021-01-01", "029022", [-47, -16, -46, -15], 10),
+            _item("b", "2021-01-01", "030022", [-46, -16, -45, -15], bands=("B04",)),
+            _item("d", "2021-02-02", "030022", [-46, -16, -45, -15], 5),
+        ]
+        self.table = ItemTable(self.items, ["B04", "B08"])
+
+    def test_sorted_by_datetime(self):
+        """Rows are sorted by datetime, keeping the input order of equal dates."""
+        self.assertEqual(list(self.table.ids), ["a", "b", "c", "d"])
+        self.assertEqual(self.table.time(2), datetime.datetime(2021, 1, 17))
+        self.assertEqual(self.table.hrefs["B08"][1], None)
+
+    def test_query(self):
+        """Rows are selected by date range (end date inclusive), bbox and tile, grouped by tile."""
+        groups = self.table.query(start_date="2021-01-01", end_date="2021-01-17")
+        self.assertEqual([list(self.table.ids[rows]) for rows in groups], [["a", "c"], ["b"]])
+        groups = self.table.query(bbox=[-45.9, -15.5, -45.5, -15.2])
+        self.assertEqual([list(self.table.ids[rows]) for rows in groups], [["b", "d"]])
+        groups = self.table.query(tiles=["029022"], end_date="2021-01-16")
+        self.assertEqual([list(self.table.ids[rows]) for rows in groups], [["a"]])
+        self.assertEqual(self.table.query(start_date="2022-01-01"), [])
+
+    def test_complete(self):
+        """Rows missing a band are dropped and the band reported."""
+        rows, missing = self.table.complete([0, 1, 2], ["B04", "B08"])
+        self.assertEqual(list(rows), [0, 2])
+        self.assertEqual(missing, {"B08"})
+
+    def test_order(self):
+        """Rows are sorted by collection priority, cloud cover (unknown last) then id."""
+        self.assertEqual(list(self.table.ids[self.table.order([0, 1, 2, 3])]), ["d", "a", "c", "b"])
+
+    def test_take_and_item(self):
+        """A subset keeps its columns, rows materialize back to pystac items."""
+        subset = self.table.take(np.array([2, 3]))
+        self.assertEqual(len(subset), 2)
+        self.assertEqual(list(subset.tiles), ["029022", "030022"])
+        item = subset.item(1)
+        self.assertEqual(item.id, "d")
+        self.assertEqual(item.properties["bdc:tiles"], ["030022"])
+        self.assertEqual(item.assets["B08"].href, "https://data/d_B08.tif")
+        self.assertEqual(item_bounds(item), (-46, -16, -45, -15))
+
+    def test_other_assets(self):
+        """Hrefs of assets outside the requested bands are kept for the materialized items."""
+        table = ItemTable(self.items, ["B04"])
+        self.assertEqual(sorted(table.hrefs), ["B04", "B08"])
+        self.assertEqual(table.item(0).assets["B08"].href, "https://data/a_B08.tif")
+
+    def test_bounds_without_footprint(self):
+        """Items without bbox or geometry are never filtered out by space."""
+        table = ItemTable([_item("e", "2021-01-01", "029022")], ["B04"])
+        self.assertEqual(len(table.query(bbox=[10, 10, 11, 11])), 1)
+
+
+class TestCubeImages(unittest.TestCase):
+    """Tests the Images of a cube built from the item table."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_indices_of_bands_not_queried(self):
+        """getRGB and getNDWI read B02 and B03 even when the cube only queried B04 and B08."""
+        patch_stac(self, self.items)
+        cube = make_cube(["B04", "B08"])
+        image = cube.data_images[cube.timeline[0]]
+        rgb = image.getRGB()
+        grid = cube.grids["028022"]
+        self.assertEqual(rgb.shape[:2], (grid.height, grid.width))
+        self.assertEqual(image.getNDWI().shape, (grid.height, grid.width))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import datetime
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.tiles import TileArrays, fill_index, half_step, regular_times
+
+
+def _dates(*days):
+    return [datetime.datetime(2021, 1, day) for day in days]
+
+
+class TestTiles(unittest.TestCase):
+    """Tests the regular time grids and the multi-tile container."""
+
+    def test_regular_times(self):
+        """The grid starts at the start day and includes the end date."""
+        self.assertEqual(regular_times("2021-01-01T10:00:00", "2021-01-17", "8D"), _dates(1, 9, 17))
+
+    def test_fill_index(self):
+        """Each fill method picks its date, -1 marks the gaps."""
+        timeline = _dates(3, 10, 20)
+        times = _dates(1, 10, 12, 25)
+        self.assertEqual(list(fill_index(timeline, times, "nan")), [-1, 1, -1, -1])
+        self.assertEqual(list(fill_index(timeline, times, "nearest")), [0, 1, 1, 2])
+        self.assertEqual(list(fill_index(timeline, times, "ffill")), [-1, 1, 1, 2])
+        self.assertEqual(list(fill_index(timeline, times, "bfill")), [0, 1, 2, -1])
+        self.assertEqual(list(fill_index(timeline, times, "nearest", "3D")), [0, 1, 1, -1])
+
+    def test_half_step(self):
+        """Half the step of a grid, the median step for months."""
+        self.assertEqual(half_step(regular_times("2021-01-01", "2021-02-28", "16D"), "16D"), pd.Timedelta("8D"))
+        self.assertEqual(half_step(regular_times("2021-01-01", "2021-12-31", "MS"), "MS"), pd.Timedelta("15D12h"))
+        self.assertEqual(half_step(_dates(1), "16D"), pd.Timedelta("8D"))
+        self.assertEqual(half_step(_dates(1), "1M"), pd.Timedelta("15D12h"))
+
+    def test_monthly_times(self):
+        """Monthly grids hold the first day of each month, "1M" included."""
+        months = [datetime.datetime(2021, month, 1) for month in (1, 2, 3)]
+        self.assertEqual(regular_times("2021-01-01", "2021-03-31", "MS"), months)
+        self.assertEqual(regular_times("2021-01-01", "2021-03-31", "1M"), months)
+        self.assertEqual(regular_times("2021-01-01", "2021-12-31", "Q"), months[:1] + [
+            datetime.datetime(2021, month, 1) for month in (4, 7, 10)])
+        timeline = [datetime.datetime(2021, 1, 1) + datetime.timedelta(days=16 * d) for d in range(6)]
+        self.assertEqual(list(fill_index(timeline, months, "nearest", half_step(months, "1M"))), [0, 2, 4])
+
+    def test_fill_index_unknown_method(self):
+        """An unknown fill method raises ValueError."""
+        with self.assertRaises(ValueError):
+            fill_index(_dates(1), _dates(1), "linear")
+
+    def test_tile_arrays(self):
+        """Each tile keeps its own timeline, the ragged index holds the union of the dates."""
+        arrays = {
+            tile: xr.DataArray(np.zeros((1, len(dates)), dtype=object), coords={"band": ["B04"], "time": dates},
+                               dims=["band", "time"])
+            for tile, dates in (("029022", _dates(1, 17)), ("030022", _dates(5, 17, 21)))
+        }
+        tiles = TileArrays(arrays)
+        self.assertEqual(list(tiles), ["029022", "030022"])
+        self.assertEqual(tiles.timeline, _dates(1, 5, 17, 21))
+        self.assertEqual(tiles.timeline_of("030022"), _dates(5, 17, 21))
+        self.assertEqual(list(tiles.offsets), [0, 2, 5])
+        self.assertIs(tiles.sel(), arrays["029022"])
+        self.assertEqual(tiles.isel(1, time=0).time.values, np.datetime64("2021-01-05"))
+        self.assertEqual(tiles.sel("030022", time="2021-01-21").shape, (1,))
+
+
+class TestAlign(unittest.TestCase):
+    """Tests the alignment of a tile of a cube on regular time grids."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=6)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_monthly(self):
+        """Each month start takes the nearest date of the tile, read from the cube."""
+        patch_stac(self, self.items)
+        cube = make_cube(["B04"])
+        aligned = cube.align("1M")
+        self.assertEqual(list(aligned.time.values.astype("datetime64[D]").astype(str)),
+                         ["2021-01-01", "2021-02-01", "2021-03-01"])
+        self.assertEqual(list(aligned.source_time.values.astype("datetime64[D]").astype(str)),
+                         ["2021-01-01", "2021-02-02", "2021-03-06"])
+        stack = cube.search(tile="028022")
+        np.testing.assert_array_equal(aligned.values[0, 2], stack.sel(band="B04").values[4])
+
+
+if __name__ == '__main__':
+    unittest.main()
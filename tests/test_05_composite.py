@@ -0,0 +1,97 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+
+from eocube.composite import PeriodAccumulator, cloud_mask
+
+
+def _dates(seed=0, n=5, shape=(2, 4, 3)):
+    rng = np.random.default_rng(seed)
+    data = rng.integers(-2000, 9000, size=(n,) + shape).astype(np.float32)
+    valid = rng.random((n,) + shape[1:]) > 0.3
+    return data, valid
+
+
+class TestPeriodAccumulator(unittest.TestCase):
+    """Tests the streaming reducers of composites against NumPy."""
+
+    def _reduce(self, reducer, **kwargs):
+        data, valid = _dates()
+        accumulator = PeriodAccumulator(reducer, data.shape[1:], **kwargs)
+        for values, mask in zip(data, valid):
+            accumulator.add(values, mask)
+        masked = np.where(valid[:, None], data, np.nan)
+        return accumulator.result(), masked
+
+    def _nan(self, function, *args, **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return function(*args, **kwargs)
+
+    def test_running_reducers(self):
+        """Mean, min and max match the NumPy reductions of the clear values."""
+        for reducer, function in (("mean", np.nanmean), ("min", np.nanmin), ("max", np.nanmax)):
+            result, masked = self._reduce(reducer)
+            np.testing.assert_allclose(result, self._nan(function, masked, axis=0), rtol=1e-6)
+
+    def test_exact_quantiles(self):
+        """Median and percentiles are exact by default."""
+        result, masked = self._reduce("median")
+        np.testing.assert_allclose(result, self._nan(np.nanmedian, masked, axis=0))
+        result, masked = self._reduce("p90")
+        np.testing.assert_allclose(result, self._nan(np.nanpercentile, masked, 90, axis=0), rtol=1e-6)
+
+    def test_histogram_quantiles(self):
+        """With bins, periods longer than bins use histograms, exact to the bin width."""
+        self.assertFalse(PeriodAccumulator("median", (1, 2, 2), bins=10, n_dates=5).histogram)
+        self.assertTrue(PeriodAccumulator("median", (1, 2, 2), bins=10, n_dates=20).histogram)
+        result, masked = self._reduce("median", bins=200, value_range=(-10000, 10000))
+        expected = self._nan(np.nanmedian, masked, axis=0)
+        self.assertEqual(np.isnan(result).tolist(), np.isnan(expected).tolist())
+        np.testing.assert_allclose(result, expected, atol=100)
+
+    def test_max_ndvi(self):
+        """Every band is taken from the date with the highest key."""
+        data, valid = _dates()
+        accumulator = PeriodAccumulator("max_ndvi", data.shape[1:], key_index=1)
+        for values, mask in zip(data, valid):
+            accumulator.add(values, mask)
+        keys = np.where(valid, data[:, 1], -np.inf)
+        best = np.argmax(keys, axis=0)
+        expected = np.take_along_axis(data, best[None, None], axis=0)[0]
+        expected[:, ~valid.any(axis=0)] = np.nan
+        np.testing.assert_array_equal(accumulator.result(), expected)
+
+    def test_invalid_reducer(self):
+        """Unknown reducers and max_ndvi without key raise ValueError."""
+        with self.assertRaises(ValueError):
+            PeriodAccumulator("mode", (1, 2, 2))
+        with self.assertRaises(ValueError):
+            PeriodAccumulator("max_ndvi", (1, 2, 2))
+
+    def test_cloud_mask(self):
+        """Only the clear SCL classes (4 to 7) are valid."""
+        self.assertEqual(cloud_mask(np.arange(12)).tolist(), [False] * 4 + [True] * 4 + [False] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import unittest
+
+import numpy as np
+
+from eocube.zonal import ZonalAccumulator
+
+
+class TestZonalAccumulator(unittest.TestCase):
+    """Tests the zonal statistics reduced over blocks of rows."""
+
+    def test_blocks(self):
+        """Statistics reduced block by block match the statistics of all the values of each zone."""
+        rng = np.random.default_rng(1)
+        values = rng.integers(0, 100, size=(2, 3, 6, 5)).astype(np.float64)
+        values[0, 0, 0, :] = -1
+        labels = rng.integers(0, 4, size=(6, 5))
+        stats = ["count", "sum", "mean", "std", "min", "max", "median", "p25"]
+        accumulator = ZonalAccumulator(3, (2, 3), stats, nodata=-1)
+        for start in range(0, 6, 4):
+            accumulator.add(values[:, :, start:start + 4], labels[start:start + 4])
+        result = accumulator.result()
+
+        self.assertEqual(list(result), stats)
+        for zone in range(3):
+            zone_values = values[:, :, labels == zone + 1]
+            zone_values = np.where(zone_values == -1, np.nan, zone_values)
+            expected = {
+                "count": np.sum(~np.isnan(zone_values), axis=2), "sum": np.nansum(zone_values, axis=2),
+                "mean": np.nanmean(zone_values, axis=2), "std": np.nanstd(zone_values, axis=2),
+                "min": np.nanmin(zone_values, axis=2), "max": np.nanmax(zone_values, axis=2),
+                "median": np.nanmedian(zone_values, axis=2), "p25": np.nanpercentile(zone_values, 25, axis=2),
+            }
+            for stat in stats:
+                np.testing.assert_allclose(result[stat][:, :, zone], expected[stat], err_msg=stat)
+
+    def test_empty_zone(self):
+        """A zone without pixels has a count of zero and NaN statistics."""
+        accumulator = ZonalAccumulator(2, (1, 1), ["count", "mean", "median"])
+        accumulator.add(np.ones((1, 1, 2, 2)), np.ones((2, 2), dtype=np.int32))
+        result = accumulator.result()
+        self.assertEqual(result["count"][0, 0].tolist(), [4, 0])
+        self.assertTrue(np.isnan(result["mean"][0, 0, 1]))
+        self.assertTrue(np.isnan(result["median"][0, 0, 1]))
+
+    def test_unknown_statistic(self):
+        """An unknown statistic raises ValueError."""
+        with self.assertRaises(ValueError):
+            ZonalAccumulator(1, (1, 1), ["mode"])
+
+
+if __name__ == '__main__':
+    unittest.main()
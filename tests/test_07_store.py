@@ -0,0 +1,183 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import xarray as xr
+from affine import Affine
+from dask import delayed
+from rasterio.crs import CRS
+
+from eocube.eocube import DataCube
+from eocube.grid import Grid
+from eocube.store import META_FILE, CubeStore, merge_meta, save_date, stored_dates
+from eocube.tiles import TileArrays
+
+BANDS = ["B04", "B08"]
+
+
+def _read(calls, band, time):
+    calls.append((band, time))
+    return np.full((3, 2), time.day * 10 + BANDS.index(band), dtype=np.int16)
+
+
+def _cube(timelines, calls, start_date="2021-01-01", end_date="2021-01-31"):
+    """Build a DataCube whose reads return constant dates, without searching STAC."""
+    cube = DataCube.__new__(DataCube)
+    cube.collections = ["S2-16D-2"]
+    cube.query_bands = BANDS
+    cube.formulas = None
+    cube.bbox = None
+    cube.resolution = cube.resampling = cube.quality_band = cube.priority = None
+    cube.snap = False
+    cube.scheduler = "synchronous"
+    cube.start_date, cube.end_date = start_date, end_date
+    cube.n_tiles = sorted(timelines)
+    cube.timelines = {tile: dates for tile, dates in timelines.items()}
+    cube.grids = {tile: Grid(CRS.from_epsg(32723), Affine(10, 0, 0, 0, -10, 0), 2, 3) for tile in timelines}
+    cube.final_array = TileArrays({
+        tile: xr.DataArray(
+            np.array([[delayed(_read)(calls, band, time) for time in dates] for band in BANDS], dtype=object),
+            coords={"band": BANDS, "time": dates}, dims=["band", "time"]
+        )
+        for tile, dates in timelines.items()
+    })
+    return cube
+
+
+def _dates(*days):
+    return [datetime.datetime(2021, 1, day) for day in days]
+
+
+class TestStore(unittest.TestCase):
+    """Tests the persisted cubes: date files, meta merges, save, load and incremental updates."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stored_dates(self):
+        """Only complete date files count as stored."""
+        save_date(self.path, "029022", datetime.datetime(2021, 1, 1), np.zeros((1, 2, 2)))
+        open(os.path.join(self.path, "029022", "20210117T000000.tmp.npy"), "w").close()
+        self.assertEqual(stored_dates(self.path, "029022"), {"20210101T000000"})
+        self.assertEqual(stored_dates(self.path, "030022"), set())
+
+    def test_merge_meta(self):
+        """Each process replaces only its tile, dates span every save."""
+        grid = {"width": 1}
+        merge_meta(self.path, {"tiles": ["029022"], "start_date": "2021-01-01", "end_date": "2021-01-31",
+                               "timelines": {"029022": ["a"]}, "grids": {"029022": grid}}, "029022")
+        merged = merge_meta(self.path, {"tiles": ["030022"], "start_date": "2020-12-01", "end_date": "2021-01-15",
+                                        "timelines": {"030022": ["b"]}, "grids": {"030022": grid}}, "030022")
+        with open(os.path.join(self.path, META_FILE)) as file:
+            self.assertEqual(json.load(file), merged)
+        self.assertEqual(merged["tiles"], ["029022", "030022"])
+        self.assertEqual(merged["timelines"], {"029022": ["a"], "030022": ["b"]})
+        self.assertEqual((merged["start_date"], merged["end_date"]), ("2020-12-01", "2021-01-31"))
+
+    def test_save_and_load(self):
+        """Saved dates load back as lazy cubes and time series."""
+        calls = []
+        written = _cube({"029022": _dates(1, 17)}, calls).save(self.path)
+        self.assertEqual(written, [("029022", time) for time in _dates(1, 17)])
+
+        store = CubeStore(self.path)
+        self.assertEqual(store.timeline(), _dates(1, 17))
+        cube = store.load()
+        self.assertEqual(cube.shape, (2, 2, 3, 2))
+        self.assertEqual(cube.sel(band="B08").values[:, 0, 0].tolist(), [11, 171])
+        self.assertEqual(store.load(start_date="2021-01-02").time.size, 1)
+        series = store.load(as_time_series=True)
+        self.assertEqual(series.shape, (2, 6, 2))
+        self.assertEqual(series.attrs["y_dim"], 3)
+        with self.assertRaises(ValueError):
+            store.load(end_date="2020-12-31")
+
+    def test_save_resumes(self):
+        """Dates already written are not read again, even when meta.json missed them."""
+        calls = []
+        _cube({"029022": _dates(1)}, calls).save(self.path)
+        os.remove(os.path.join(self.path, META_FILE))
+        calls.clear()
+        written = _cube({"029022": _dates(1, 17)}, calls).save(self.path)
+        self.assertEqual(written, [("029022", datetime.datetime(2021, 1, 17))])
+        self.assertEqual({time for _, time in calls}, {datetime.datetime(2021, 1, 17)})
+        self.assertEqual(CubeStore(self.path).timeline(), _dates(1, 17))
+
+    def test_save_formula_error(self):
+        """A formula using a band not queried stops the save without writing the date."""
+        cube = _cube({"029022": _dates(1)}, [])
+        cube.formulas = ["(B08 - B05)"]
+        with self.assertRaises(ValueError):
+            cube.save(self.path)
+        self.assertEqual(stored_dates(self.path, "029022"), set())
+
+    def test_update(self):
+        """Update queries from the day after the last date of the lagging tile and appends the new dates."""
+        calls = []
+        _cube({"029022": _dates(1, 17), "030022": _dates(1)}, calls).save(self.path)
+        calls.clear()
+        starts = []
+
+        def search(**kwargs):
+            starts.append(kwargs["start_date"])
+            return _cube({"029022": _dates(17, 25), "030022": _dates(17, 25)}, calls, kwargs["start_date"],
+                         kwargs["end_date"])
+
+        with mock.patch("eocube.eocube.DataCube", side_effect=search):
+            store = CubeStore(self.path)
+            appended = store.update(end_date="2021-01-31")
+        self.assertEqual(starts, ["2021-01-02"])
+        self.assertEqual(sorted(appended), [("029022", _dates(25)[0])] + [("030022", time) for time in _dates(17, 25)])
+        self.assertEqual(store.timeline("030022"), _dates(1, 17, 25))
+        self.assertEqual(store.meta["start_date"], "2021-01-01")
+
+    def test_update_without_new_items(self):
+        """Nothing is appended when STAC has no new item or the store is up to date."""
+        _cube({"029022": _dates(17)}, []).save(self.path)
+        store = CubeStore(self.path)
+        with mock.patch("eocube.eocube.DataCube", side_effect=ValueError):
+            self.assertEqual(store.update(end_date="2021-01-31"), [])
+        self.assertEqual(store.update(end_date="2021-01-17"), [])
+
+    def test_grid_change(self):
+        """A tile whose grid changed cannot be updated."""
+        _cube({"029022": _dates(1)}, []).save(self.path)
+
+        def search(**kwargs):
+            cube = _cube({"029022": _dates(17)}, [], kwargs["start_date"], kwargs["end_date"])
+            cube.grids["029022"].width = 4
+            return cube
+
+        with mock.patch("eocube.eocube.DataCube", side_effect=search):
+            with self.assertRaises(ValueError):
+                CubeStore(self.path).update(end_date="2021-01-31")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import multiprocessing
+import pickle
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.shared import SharedArray, share
+
+
+def _total(shared):
+    """Sum the values of a SharedArray in a worker process, checking the coordinates came along."""
+    result = shared.to_xarray()
+    return float(result.sum()), list(result.pixel.values[:3]), result.attrs
+
+
+class TestShared(unittest.TestCase):
+    """Tests cube values handed to other processes through shared memory."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_share_dask(self):
+        """The chunks of a dask array are written in the block, coords and attrs are kept."""
+        values = xr.DataArray(da.arange(24, chunks=5).reshape(2, 12), coords={"band": ["a", "b"]},
+                              dims=["band", "pixel"], attrs={"y_dim": 3})
+        with share(values) as shared:
+            self.assertTrue(shared.owner)
+            np.testing.assert_array_equal(shared.values, np.arange(24).reshape(2, 12))
+            self.assertEqual(shared.to_xarray().attrs, {"y_dim": 3})
+        self.assertTrue(shared.closed)
+
+    def test_pickle_is_small(self):
+        """Pickles carry the name of the block and ranges for integer coordinates, not the values."""
+        pixels = 1000000
+        values = xr.DataArray(np.zeros((1, pixels), dtype=np.float32), coords={"band": ["a"], "pixel": range(pixels)},
+                              dims=["band", "pixel"])
+        with share(values) as shared:
+            data = pickle.dumps(shared)
+            self.assertLess(len(data), 2000)
+            attached = pickle.loads(data)
+            self.assertFalse(attached.owner)
+            self.assertEqual(attached.to_xarray().pixel.values[-1], pixels - 1)
+            attached.values[0, 0] = 7
+            self.assertEqual(shared.values[0, 0], 7)
+            attached.close()
+            self.assertEqual(shared.values[0, 0], 7)
+
+    def test_worker_process(self):
+        """A worker process reads the time series of a cube without copies, the block outlives it."""
+        patch_stac(self, self.items)
+        cube = make_cube(["B04", "B08"])
+        expected = cube.search(as_time_series=True)
+        with cube.to_shared(as_time_series=True) as shared:
+            np.testing.assert_array_equal(shared.values, expected.values)
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                total, pixels, attrs = executor.submit(_total, shared).result()
+            self.assertEqual(total, float(expected.values.astype(np.float64).sum()))
+            self.assertEqual(pixels, [0, 1, 2])
+            self.assertEqual(attrs["y_dim"], expected.attrs["y_dim"])
+            np.testing.assert_array_equal(shared.values, expected.values)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.sampling import block_cells, stratify
+from eocube.utils import open_dataset
+
+
+class TestSampling(unittest.TestCase):
+    """Tests the stratified samples read by COG block."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_stratify(self):
+        """At most n samples of each label are kept."""
+        labels = np.array(["a"] * 5 + ["b"] * 2)
+        selected = stratify(labels, 3)
+        self.assertEqual(sorted(labels[selected].tolist()), ["a", "a", "a", "b", "b"])
+        self.assertEqual(len(stratify(labels)), 7)
+
+    def test_block_cells_offset(self):
+        """Cells follow the blocks of the asset when the grid does not start on a block boundary."""
+        rows, cols = np.array([0, 5, 6, 9]), np.array([0, 0, 0, 0])
+        self.assertEqual([indices.tolist() for _, indices in block_cells(rows, cols, (10, 10))], [[0, 1, 2, 3]])
+        groups = block_cells(rows, cols, (10, 10), offset=(4, 0))
+        self.assertEqual([indices.tolist() for _, indices in groups], [[0, 1], [2, 3]])
+        self.assertEqual([window for window, _ in groups], [(0, 0, 6, 1), (6, 0, 4, 1)])
+
+    def test_cells_are_asset_blocks(self):
+        """Each cell read by sample holds pixels of a single internal block, values match search."""
+        patch_stac(self, self.items)
+        cube = make_cube(["B04", "B08"])
+        tile = "028022"
+        grid = cube.grids[tile]
+        rng = np.random.default_rng(0)
+        rows, cols = rng.integers(0, grid.height, 40), rng.integers(0, grid.width, 40)
+        labels = np.full((grid.height, grid.width), -1)
+        labels[rows, cols] = np.arange(40) % 3
+
+        cell_shape, offset = cube._sample_cell(tile)
+        dataset = open_dataset(cube.table.hrefs["B04"][cube.tile_rows[tile][cube.timeline[0]]])
+        self.assertEqual(cell_shape, dataset.block_shapes[0])
+        for (row, col, height, width), indices in block_cells(rows, cols, cell_shape, offset):
+            x, y = grid.transform * (cols[indices] + 0.5, rows[indices] + 0.5)
+            source_cols, source_rows = ~dataset.transform * (x, y)
+            self.assertEqual(len(set(zip(np.floor(source_rows) // 64, np.floor(source_cols) // 64))), 1)
+
+        samples = cube.sample(labels, ignore=-1)
+        stack = cube.search()
+        self.assertEqual(samples.shape, (40, 2, 2))
+        for band in ("B04", "B08"):
+            expected = stack.sel(band=band).values[:, samples.row.values, samples.col.values]
+            np.testing.assert_array_equal(samples.sel(band=band).values, expected.T)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from cube_fixture import COLLECTION, make_cube, make_items, patch_stac
+from eocube import mosaic
+from eocube.image import read_band
+from eocube.mosaic import mosaic_band, scl_rank
+
+OTHER = "S2-16D-1"
+
+
+class TestMosaic(unittest.TestCase):
+    """Tests the best pixel mosaics of the items of a tile sharing a date."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=2) + make_items(cls.directory.name, dates=2,
+                                                                         collection=OTHER)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+        self.cube = make_cube(["B04"], collections=[COLLECTION, OTHER], quality_band="SCL")
+        self.tile = "028022"
+        self.grid = self.cube.grids[self.tile]
+        time = self.cube.timeline[0]
+        self.hrefs = [self.cube.table.hrefs["B04"][row] for row in self.cube.tile_groups[self.tile][time]]
+        self.quality = [self.cube.table.hrefs["SCL"][row] for row in self.cube.tile_groups[self.tile][time]]
+
+    def test_reads_only_won_boxes(self):
+        """Each item is read only in the box of the pixels it wins."""
+        winner = np.ones((self.grid.height, self.grid.width), dtype=np.uint8)
+        winner[:5, 2:9] = 0
+        with mock.patch.object(mosaic, "read_band", wraps=read_band) as reads:
+            values = mosaic_band(winner, self.hrefs, "B04", self.grid)
+        shapes = sorted((call.args[3].height, call.args[3].width) for call in reads.call_args_list)
+        self.assertEqual(shapes, [(5, 7), (self.grid.height, self.grid.width)])
+        full = [read_band(href, "B04", None, self.grid) for href in self.hrefs]
+        np.testing.assert_array_equal(values, np.where(winner == 0, full[0], full[1]))
+
+    def test_best_pixel(self):
+        """Each pixel of the cube comes from the item with the best SCL class, the first collection on ties."""
+        ranks = np.stack([scl_rank(read_band(href, "SCL", None, self.grid)) for href in self.quality])
+        full = np.stack([read_band(href, "B04", None, self.grid) for href in self.hrefs])
+        expected = np.take_along_axis(full, np.argmin(ranks, axis=0)[None], axis=0)[0]
+        self.assertEqual(self.cube.table.collections[self.cube.tile_groups[self.tile][self.cube.timeline[0]][0]],
+                         COLLECTION)
+        np.testing.assert_array_equal(self.cube.search().sel(band="B04").values[0], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
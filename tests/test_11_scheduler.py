@@ -0,0 +1,73 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+from distributed import Client, LocalCluster
+
+from cube_fixture import BBOX, make_cube, make_items, patch_stac
+
+
+class TestScheduler(unittest.TestCase):
+    """Tests the read tasks of a cube and the schedulers computing them."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+
+    def test_read_tasks(self):
+        """One task per image and band, keyed by the band, the grid and the bbox."""
+        bands = ["B04", "B08", "B11"]
+        tasks = make_cube(bands).final_array["028022"]
+        keys = {task.key for task in tasks.values.ravel()}
+        self.assertEqual(len(keys), 9)
+        for band in bands:
+            self.assertTrue(all(task.key.startswith(f"read-{band}-") for task in tasks.sel(band=band).values))
+
+        def cube_keys(**kwargs):
+            return {task.key for task in make_cube(bands, **kwargs).final_array["028022"].values.ravel()}
+
+        self.assertEqual(cube_keys(), keys)
+        self.assertFalse(cube_keys(bbox=[BBOX[0] + 0.001, BBOX[1], BBOX[2] + 0.001, BBOX[3]]) & keys)
+        self.assertFalse(cube_keys(resolution=20) & keys)
+
+    def test_local_cluster(self):
+        """A distributed LocalCluster computes the same cube as the synchronous and threaded schedulers."""
+        cube = make_cube(["B04", "B11"])
+        expected = cube.search()
+        np.testing.assert_array_equal(cube.search(scheduler="threads").values, expected.values)
+        with LocalCluster(n_workers=1, threads_per_worker=2, processes=False, dashboard_address=None) as cluster, \
+                Client(cluster) as client:
+            np.testing.assert_array_equal(cube.search(scheduler=client).values, expected.values)
+            clustered = make_cube(["B04", "B11"], scheduler=client)
+            np.testing.assert_array_equal(clustered.search(as_time_series=True).values,
+                                          cube.search(as_time_series=True).values)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import datetime
+import tempfile
+import unittest
+
+import numpy as np
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.spectral import Spectral
+
+
+def _classes(t1, t2, limiar_min, limiar_max):
+    difference = t2.astype(np.float32) - t1.astype(np.float32)
+    return ((difference > limiar_min) & (difference <= limiar_max)).astype(np.uint8)
+
+
+class TestChange(unittest.TestCase):
+    """Tests the change detection kernels and the change cube."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=3, tiles=("028022", "029022"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_kernels(self):
+        """The difference and classification kernels match NumPy."""
+        rng = np.random.default_rng(0)
+        t1, t2 = rng.integers(0, 5000, (2, 30, 20)).astype(np.int16)
+        spectral = Spectral()
+        difference = spectral._matrix_diff(t1, t2)
+        self.assertEqual(difference.dtype, np.float32)
+        np.testing.assert_array_equal(difference, t2.astype(np.float32) - t1)
+        np.testing.assert_array_equal(spectral._classify_diff(difference, -500, 800), _classes(t1, t2, -500, 800))
+        np.testing.assert_array_equal(spectral._classify_change(t1, t2, -500, 800), _classes(t1, t2, -500, 800))
+        with self.assertRaises(ValueError):
+            spectral._classify_change(t1, t2[:10], -500, 800)
+
+    def test_change_cube(self):
+        """Blocks of rows of each pair are classified on the grid of the selected tile."""
+        patch_stac(self, self.items)
+        cube = make_cube(["B04"], tiles=["028022", "029022"], bbox=None)
+        stack = cube.search(tile="029022").sel(band="B04").values
+        changes = cube.classifyDifference("B04", -500, 800, tile="029022", chunk_rows=70)
+        self.assertEqual(changes.shape, (2,) + stack.shape[1:])
+        self.assertEqual(changes.data.chunks[1][0], 70)
+        for k in range(2):
+            np.testing.assert_array_equal(changes.values[k], _classes(stack[k], stack[k + 1], -500, 800))
+        pair = cube.classifyDifference("B04", -500, 800, pairs=[("2021-01-02", "2021-02-01")], tile="029022")
+        self.assertEqual(pair.reference.values[0], np.datetime64(datetime.datetime(2021, 1, 1)))
+        np.testing.assert_array_equal(pair.values[0], _classes(stack[0], stack[2], -500, 800))
+        with self.assertRaises(KeyError):
+            cube.classifyDifference("B08")
+
+
+if __name__ == '__main__':
+    unittest.main()
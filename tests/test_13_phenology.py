@@ -0,0 +1,110 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.phenology import (PHENOLOGY_METRICS, phenology_mtx_numba, savgol_coefficients, savgol_mtx_numba,
+                              whittaker_mtx_numba)
+
+CLEAR = 4
+CLOUD = 9
+
+
+def _whittaker(y, w, lmbda):
+    """Dense solution of (W + lambda D'D) z = W y."""
+    d = np.diff(np.eye(len(y)), 2, axis=0)
+    return np.linalg.solve(np.diag(w) + lmbda * d.T @ d, w * y)
+
+
+class TestPhenology(unittest.TestCase):
+    """Tests the smoothing and phenology kernels and the lazy cubes built with them."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_savgol(self):
+        """The filter keeps quadratic series inside the window and interpolates cloudy dates first."""
+        with self.assertRaises(ValueError):
+            savgol_coefficients(4, 2)
+        coeffs = savgol_coefficients(5, 2)
+        self.assertAlmostEqual(float(coeffs.sum()), 1, places=6)
+        series = np.array([[(t - 3) ** 2 for t in range(9)]], dtype=np.float32)
+        cloud = np.full(series.shape, CLEAR, dtype=np.uint8)
+        np.testing.assert_allclose(savgol_mtx_numba(series, cloud, coeffs)[0, 2:-2], series[0, 2:-2], atol=1e-4)
+        linear = np.arange(9, dtype=np.float32)[None] * 10
+        cloudy = linear.copy()
+        cloudy[0, 4] = 5000
+        cloud[0, 4] = CLOUD
+        np.testing.assert_allclose(savgol_mtx_numba(cloudy, cloud, coeffs), savgol_mtx_numba(linear, cloud, coeffs),
+                                   atol=1e-3)
+
+    def test_whittaker(self):
+        """The banded solver matches the dense system, cloudy dates get zero weight."""
+        rng = np.random.default_rng(0)
+        series = rng.random((3, 12)).astype(np.float32) * 1000
+        cloud = np.full(series.shape, CLEAR, dtype=np.uint8)
+        cloud[1, [2, 7]] = CLOUD
+        smoothed = whittaker_mtx_numba(series, cloud, 10.0)
+        for i in range(3):
+            weights = (cloud[i] == CLEAR).astype(np.float64)
+            np.testing.assert_allclose(smoothed[i], _whittaker(series[i].astype(np.float64), weights, 10.0),
+                                       rtol=1e-4)
+
+    def test_phenology_metrics(self):
+        """Season start and end are the threshold crossings around the peak."""
+        series = np.array([[0, 2, 4, 2, 0], [0, 1, np.nan, 1, 0]], dtype=np.float32)
+        metrics = phenology_mtx_numba(series, np.arange(5, dtype=np.float64) * 16, 0.5)
+        self.assertEqual(dict(zip(PHENOLOGY_METRICS, metrics[0].tolist())),
+                         {"sos": 16, "eos": 48, "los": 32, "peak": 4, "peak_time": 32, "amplitude": 4, "base": 0,
+                          "integral": 96})
+        self.assertTrue(np.isnan(metrics[1]).all())
+
+    def test_cube(self):
+        """smooth and phenology compute the kernels over blocks of rows of the cube."""
+        patch_stac(self, self.items)
+        cube = make_cube(["B08", "SCL"], end_date="2021-04-30")
+        stack = cube.search()
+        values, cloud = stack.sel(band="B08").values, stack.sel(band="SCL").values
+        n_times, height, width = values.shape
+        matrix = values.reshape(n_times, -1).T.astype(np.float32)
+        cloud_matrix = cloud.reshape(n_times, -1).T
+
+        smoothed = cube.smooth("B08", method="whittaker", lmbda=5.0, chunk_rows=60)
+        self.assertEqual(smoothed.shape, (n_times, height, width))
+        expected = whittaker_mtx_numba(matrix, cloud_matrix, 5.0)
+        np.testing.assert_allclose(smoothed.values.reshape(n_times, -1).T, expected, rtol=1e-5)
+
+        metrics = cube.phenology("B08", method="whittaker", lmbda=5.0, chunk_rows=60)
+        self.assertEqual(metrics.shape, (len(PHENOLOGY_METRICS), height, width))
+        days = np.arange(n_times, dtype=np.float64) * 16
+        np.testing.assert_allclose(metrics.values.reshape(len(PHENOLOGY_METRICS), -1).T,
+                                   phenology_mtx_numba(expected, days, 0.5), rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
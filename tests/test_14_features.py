@@ -0,0 +1,93 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.features import YEAR_DAYS, extract_features, feature_names
+
+
+class TestFeatures(unittest.TestCase):
+    """Tests the per-pixel time series features."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_names(self):
+        """Features are named by band, statistic, quantile and harmonic."""
+        self.assertEqual(feature_names(["B04"], (0.5,), 1),
+                         ["B04_mean", "B04_std", "B04_min", "B04_max", "B04_q50", "B04_slope", "B04_day_min",
+                          "B04_day_max", "B04_amp1", "B04_phase1"])
+
+    def test_extract_features(self):
+        """Each feature matches NumPy on the valid dates of the series."""
+        rng = np.random.default_rng(0)
+        values = rng.random((2, 5, 7)).astype(np.float32) * 1000
+        values[1, 2, [1, 4]] = np.nan
+        values[0, 3] = np.nan
+        times = pd.date_range("2021-01-01", periods=7, freq="16D")
+        cube = xr.DataArray(values, coords={"band": ["B04", "B08"], "pixel": range(5), "time": times},
+                            dims=["band", "pixel", "time"], attrs={"y_dim": 1, "x_dim": 5})
+        features = extract_features(cube, quantiles=(0.25, 0.5), harmonics=1)
+        self.assertEqual(features.shape, (5, 22))
+        self.assertEqual(features.attrs["x_dim"], 5)
+
+        days = np.arange(7) * 16.0
+        for band in range(2):
+            for pixel in range(5):
+                result = features.sel(pixel=pixel).values[band * 11:(band + 1) * 11]
+                series = values[band, pixel]
+                valid = ~np.isnan(series)
+                if not valid.any():
+                    self.assertTrue(np.isnan(result).all())
+                    continue
+                v, t = series[valid].astype(np.float64), days[valid]
+                angle = 2 * np.pi * t / YEAR_DAYS
+                a = 2 / len(v) * ((v - v.mean()) * np.cos(angle)).sum()
+                c = 2 / len(v) * ((v - v.mean()) * np.sin(angle)).sum()
+                expected = [v.mean(), v.std(), v.min(), v.max(), np.quantile(v, 0.25), np.quantile(v, 0.5),
+                            np.polyfit(t, v, 1)[0], t[np.argmin(v)], t[np.argmax(v)], np.hypot(a, c), np.arctan2(c, a)]
+                np.testing.assert_allclose(result, expected, rtol=1e-4)
+
+    def test_cube_features(self):
+        """DataCube.features masks the cloudy dates and computes the features of every pixel."""
+        patch_stac(self, self.items)
+        cube = make_cube(["B04", "SCL"])
+        series = cube.search(as_time_series=True)
+        cloud = series.sel(band="SCL")
+        masked = series.sel(band=["B04"]).where((cloud > 3) & (cloud <= 7)).astype(np.float32)
+        masked.attrs = series.attrs
+        features = cube.features(quantiles=(0.5,), chunk_rows=50)
+        expected = extract_features(masked, quantiles=(0.5,))
+        self.assertEqual(list(features.feature.values), list(expected.feature.values))
+        np.testing.assert_allclose(features.values, expected.values, rtol=1e-4, atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.grid import Grid
+
+
+def _nearest(path, grid):
+    """Read the pixel of a file holding the center of each pixel of a grid."""
+    with rasterio.open(path) as dataset:
+        values = dataset.read(1)
+        cols, rows = np.meshgrid(np.arange(grid.width) + 0.5, np.arange(grid.height) + 0.5)
+        x, y = grid.transform * (cols, rows)
+        source_cols, source_rows = ~dataset.transform * (x, y)
+        return values[np.floor(source_rows).astype(int), np.floor(source_cols).astype(int)]
+
+
+class TestResampling(unittest.TestCase):
+    """Tests the common grid of the bands of a tile and the resampling while reading."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+
+    def test_finest_grid(self):
+        """Bands of 10 and 20 meters are read on the 10 meters grid, 20 meters pixels repeated by nearest."""
+        cube = make_cube(["B04", "B11"])
+        grid = cube.grids["028022"]
+        self.assertEqual(grid.resolution, 10)
+        self.assertEqual(grid.transform.c % 10, 0)
+        stack = cube.search()
+        self.assertEqual(stack.shape, (2, 1, grid.height, grid.width))
+        for band in ("B04", "B11"):
+            np.testing.assert_array_equal(stack.sel(band=band).values[0], _nearest(self.items[0].assets[band].href, grid))
+
+    def test_coarser_grid(self):
+        """With a coarser resolution, the average resampling of a band takes the mean of the finer pixels."""
+        cube = make_cube(["B04", "B11"], resolution=20, resampling={"B04": "average"})
+        grid = cube.grids["028022"]
+        self.assertEqual(grid.resolution, 20)
+        stack = cube.search()
+        fine = Grid(grid.crs, grid.transform * grid.transform.scale(0.5), grid.width * 2, grid.height * 2)
+        b04 = _nearest(self.items[0].assets["B04"].href, fine).astype(np.float64)
+        mean = b04.reshape(grid.height, 2, grid.width, 2).mean(axis=(1, 3))
+        np.testing.assert_allclose(stack.sel(band="B04").values[0], mean, atol=1)
+        np.testing.assert_array_equal(stack.sel(band="B11").values[0], _nearest(self.items[0].assets["B11"].href, grid))
+
+    def test_unknown_resampling(self):
+        """An unknown resampling method raises KeyError."""
+        with self.assertRaises(KeyError):
+            make_cube(["B04"], resampling="closest")
+
+
+if __name__ == '__main__':
+    unittest.main()
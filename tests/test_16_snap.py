@@ -0,0 +1,82 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from cube_fixture import make_cube, make_items, patch_stac
+
+
+class TestSnap(unittest.TestCase):
+    """Tests the reads expanded to the internal blocks of the assets."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+
+    def test_same_values(self):
+        """Snapped reads give the same pixels as the window reads, for 10 and 20 meters bands."""
+        bands = ["B04", "B11", "SCL"]
+        snapped = make_cube(bands, snap=True).search()
+        plain = make_cube(bands).search()
+        self.assertEqual(snapped.shape, plain.shape)
+        np.testing.assert_array_equal(snapped.values, plain.values)
+
+    def test_block_window(self):
+        """The window is expanded to whole 64 pixels blocks and the offset points back to it."""
+        cube = make_cube(["B04"], snap=True)
+        grid = cube.grids["028022"]
+        with rasterio.open(self.items[0].assets["B04"].href) as dataset:
+            window = grid.source_window(dataset)
+            block_window, out_shape, (row, col) = grid._block_window(dataset, window)
+            self.assertEqual((block_window.row_off % 64, block_window.col_off % 64), (0, 0))
+            self.assertEqual(out_shape, (block_window.height, block_window.width))
+            self.assertEqual((block_window.row_off + row, block_window.col_off + col), (window.row_off, window.col_off))
+            self.assertIsNone(grid._block_window(dataset, Window(-1, 0, 10, 10)))
+
+    def test_reads_whole_blocks(self):
+        """Every read of a snapped cube starts on a block boundary."""
+        windows = []
+        read = rasterio.io.DatasetReader.read
+
+        def spy(dataset, *args, **kwargs):
+            windows.append(kwargs.get("window"))
+            return read(dataset, *args, **kwargs)
+
+        with mock.patch.object(rasterio.io.DatasetReader, "read", spy):
+            make_cube(["B04", "B11"], snap=True).search()
+        self.assertTrue(windows)
+        for window in windows:
+            self.assertEqual((window.row_off % 64, window.col_off % 64), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
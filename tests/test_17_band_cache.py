@@ -0,0 +1,108 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from cube_fixture import make_items
+from eocube.image import read_band
+from eocube.utils import BandCache, band_cache
+
+
+class TestBandCache(unittest.TestCase):
+    """Tests the single-flight loading and the memory budget of the band cache."""
+
+    def test_single_flight(self):
+        """Threads asking for a key being loaded wait for it instead of loading it again."""
+        cache = BandCache(max_bytes=1 << 20)
+        calls = []
+
+        def loader():
+            calls.append(threading.get_ident())
+            time.sleep(0.2)
+            return np.arange(10)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("key", loader))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertFalse(results[0].flags.writeable)
+
+    def test_failed_load(self):
+        """A failed load is not cached, the next request loads the key again."""
+        cache = BandCache(max_bytes=1 << 20)
+
+        def failing():
+            raise OSError("unreachable")
+
+        with self.assertRaises(OSError):
+            cache.get("key", failing)
+        np.testing.assert_array_equal(cache.get("key", lambda: np.ones(3)), np.ones(3))
+
+    def test_budget(self):
+        """The least recently used arrays are dropped beyond the budget, larger arrays are not kept."""
+        cache = BandCache(max_bytes=2 * 80)
+        for key in ("a", "b"):
+            cache.get(key, lambda: np.zeros(10))
+        cache.get("a", lambda: None)
+        cache.get("c", lambda: np.zeros(10))
+        self.assertEqual(list(cache._arrays), ["a", "c"])
+        self.assertEqual(cache.nbytes, 160)
+        cache.get("d", lambda: np.zeros(100))
+        self.assertNotIn("d", cache._arrays)
+        cache.clear()
+        self.assertEqual(cache.nbytes, 0)
+
+
+class TestReadBand(unittest.TestCase):
+    """Tests the cached and direct reads of a band."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.href = make_items(cls.directory.name, dates=1)[0].assets["B04"].href
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        band_cache.clear()
+        self.addCleanup(band_cache.clear)
+
+    def test_cached_read(self):
+        """Cached reads share one read-only array, direct reads return new writable arrays."""
+        first = read_band(self.href, "B04", cache=True)
+        self.assertIs(read_band(self.href, "B04", cache=True), first)
+        self.assertFalse(first.flags.writeable)
+        direct = read_band(self.href, "B04")
+        self.assertTrue(direct.flags.writeable)
+        np.testing.assert_array_equal(direct, first)
+
+
+if __name__ == '__main__':
+    unittest.main()
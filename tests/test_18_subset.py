@@ -0,0 +1,80 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from cube_fixture import BBOX, make_cube, make_items, patch_stac
+
+
+class TestSubset(unittest.TestCase):
+    """Tests the cubes selected from the items already found, without new STAC searches."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, tiles=("028022", "028023"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.client = patch_stac(self, self.items)
+
+    def test_dates(self):
+        """A period subset equals the slice of the cube and reuses its grids."""
+        cube = make_cube(tiles=["028022"])
+        searches = len(self.client.searches)
+        subset = cube.subset(start_date="2021-01-10", end_date="2021-02-20")
+        self.assertEqual(len(self.client.searches), searches)
+        self.assertIs(subset.grids["028022"], cube.grids["028022"])
+        stack = cube.search()
+        expected = stack.sel(time=slice("2021-01-10", "2021-02-20"))
+        self.assertEqual(expected.sizes["time"], 3)
+        np.testing.assert_array_equal(subset.search().values, expected.values)
+
+    def test_bbox(self):
+        """A smaller bounding box gives a smaller grid on the same pixels."""
+        cube = make_cube(tiles=["028022"])
+        subset = cube.subset(bbox=[BBOX[0], BBOX[1], -54.0, -12.0])
+        grid, small = cube.grids["028022"], subset.grids["028022"]
+        self.assertLess(small.width, grid.width)
+        self.assertLess(small.height, grid.height)
+        self.assertEqual((small.transform.c - grid.transform.c) % 10, 0)
+        row = int(round((grid.transform.f - small.transform.f) / 10))
+        col = int(round((small.transform.c - grid.transform.c) / 10))
+        full = cube.search().values
+        np.testing.assert_array_equal(subset.search().values,
+                                      full[..., row:row + small.height, col:col + small.width])
+
+    def test_tiles(self):
+        """A tile subset keeps only the items of the tiles, an empty subset raises ValueError."""
+        cube = make_cube()
+        searches = len(self.client.searches)
+        subset = cube.subset(tiles=["028023"])
+        self.assertEqual(list(subset.grids), ["028023"])
+        self.assertEqual(len(self.client.searches), searches)
+        with self.assertRaises(ValueError):
+            cube.subset(start_date="2021-03-10", end_date="2021-03-20")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import math
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import rasterio
+
+from cube_fixture import make_cube, make_items, patch_stac
+
+
+class TestPlan(unittest.TestCase):
+    """Tests the read cost estimated from the headers of the assets."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+
+    def test_search_plan(self):
+        """Each band and date touches the blocks of its window, once, and no pixel is read."""
+        cube = make_cube(["B04", "B11"])
+        grid = cube.grids["028022"]
+        with mock.patch.object(rasterio.io.DatasetReader, "read", side_effect=AssertionError("pixels read")):
+            plan = cube.plan()
+        self.assertEqual(len(plan), 4 * 2)
+        stack = cube.search()
+        for band, resolution in (("B04", 10), ("B11", 20)):
+            rows = plan[plan["band"] == band]
+            href = self.items[0].assets[band].href
+            with rasterio.open(href) as dataset:
+                window = grid.source_window(dataset)
+            block_rows = math.ceil((window.row_off + window.height) / 64) - math.floor(window.row_off / 64)
+            block_cols = math.ceil((window.col_off + window.width) / 64) - math.floor(window.col_off / 64)
+            self.assertTrue((rows["blocks"] == block_rows * block_cols).all())
+            self.assertTrue((rows["requests"] == block_rows).all())
+            self.assertTrue((rows["output_bytes"] == stack.sel(band=band).values[0].nbytes).all())
+            self.assertTrue((rows["compressed_bytes"] > 0).all())
+            self.assertTrue((rows["compressed_bytes"] < os.path.getsize(href)).all())
+        summary = plan.attrs["summary"]["028022"]
+        self.assertEqual(summary["dates"], 4)
+        self.assertEqual(summary["output_bytes"], stack.values.nbytes)
+
+    def test_chunked_plan(self):
+        """Chunks fetch the blocks they share again, a small memory limit gives one block of rows by chunk."""
+        # The 64 rows blocks of the 20 meters band cover 128 rows of the grid
+        cube = make_cube(["B04", "B11"])
+        search = cube.plan(memory_limit=1)
+        chunked = cube.plan("chunked", memory_limit=1)
+        summary = chunked.attrs["summary"]["028022"]
+        self.assertEqual(summary["chunk_rows"], 128)
+        self.assertFalse(summary["fits"])
+        self.assertGreaterEqual(chunked["blocks"].sum(), search["blocks"].sum())
+        self.assertGreater(chunked["requests"].sum(), search["requests"].sum())
+        self.assertTrue(cube.plan(memory_limit=1 << 40).attrs["summary"]["028022"]["fits"])
+        with self.assertRaises(ValueError):
+            cube.plan("eager")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import os
+import tempfile
+import unittest
+
+import dask.array as da
+import numpy as np
+
+from cube_fixture import make_cube, make_items, patch_stac
+
+
+class TestChunkedSearch(unittest.TestCase):
+    """Tests the lazy search of cubes with a memory limit against the eager search."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+
+    def test_equals_eager(self):
+        """The chunked cube, formulas included, has the values of the eager cube in chunks of one date."""
+        formulas = ["((B08-B04)/(B08+B04))"]
+        eager = make_cube(["B04", "B08", "B11"], formulas=formulas).search()
+        chunked = make_cube(["B04", "B08", "B11"], formulas=formulas, memory_limit=1).search()
+        self.assertIsInstance(chunked.data, da.Array)
+        self.assertEqual(list(chunked.band.values), list(eager.band.values))
+        self.assertEqual(list(chunked.time.values), list(eager.time.values))
+        self.assertEqual(set(chunked.data.chunks[1]), {1})
+        # One block of rows of the 20 meters band, 128 rows of the grid
+        self.assertEqual(max(chunked.data.chunks[2]), 128)
+        self.assertGreater(len(chunked.data.chunks[2]), 1)
+        np.testing.assert_array_equal(chunked.values, eager.values)
+
+    def test_store(self):
+        """With a store the chunked cube is written to a memory mapped file."""
+        eager = make_cube().search()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cube.npy")
+            stored = make_cube(memory_limit="1KB").search(store=path)
+            self.assertIsInstance(stored.data, np.memmap)
+            np.testing.assert_array_equal(stored.values, eager.values)
+            np.testing.assert_array_equal(np.load(path), eager.values)
+            del stored
+
+
+if __name__ == '__main__':
+    unittest.main()
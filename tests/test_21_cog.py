@@ -0,0 +1,95 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.export import write_cog
+
+
+class TestCOG(unittest.TestCase):
+    """Tests the Cloud Optimized GeoTIFFs written from a cube, read back with rasterio."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+        self.output = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output.cleanup)
+
+    def test_round_trip(self):
+        """Each date is a tiled COG with the bands, grid and values of the cube."""
+        cube = make_cube(["B04", "B08"], formulas=["(B08-B04)"])
+        grid = cube.grids["028022"]
+        stack = cube.search()
+        written = cube.to_cog(self.output.name, chunk_rows=64)
+        self.assertEqual([os.path.basename(path) for path in written],
+                         ["028022_20210101T000000.tif", "028022_20210117T000000.tif"])
+        for t, path in enumerate(written):
+            with rasterio.open(path) as dataset:
+                self.assertEqual(dataset.tags(ns="IMAGE_STRUCTURE").get("LAYOUT"), "COG")
+                self.assertEqual(dataset.crs, grid.crs)
+                self.assertEqual(dataset.transform, grid.transform)
+                self.assertEqual(dataset.descriptions, tuple(stack.band.values))
+                np.testing.assert_array_equal(dataset.read(), stack.values[:, t])
+
+    def test_selected_dates(self):
+        """Only the requested dates and bands are written."""
+        cube = make_cube(["B04", "B08"])
+        written = cube.to_cog(self.output.name, bands=["B08"], times=["2021-01-17"], overviews=False)
+        self.assertEqual(len(written), 1)
+        with rasterio.open(written[0]) as dataset:
+            self.assertEqual(dataset.count, 1)
+            self.assertEqual(dataset.overviews(1), [])
+            np.testing.assert_array_equal(dataset.read(1), cube.search().sel(band="B08").values[1])
+
+    def test_write_cog(self):
+        """Small blocks give overviews, kept by nearest so class values stay classes."""
+        grid = make_cube().grids["028022"]
+        classes = np.random.default_rng(0).integers(0, 5, (grid.height, grid.width)).astype(np.uint8)
+        path = write_cog(os.path.join(self.output.name, "classes.tif"), classes, grid, blocksize=64)
+        with rasterio.open(path) as dataset:
+            self.assertEqual(dataset.block_shapes[0], (64, 64))
+            self.assertTrue(dataset.overviews(1))
+            overview = dataset.read(1, out_shape=(grid.height // 2, grid.width // 2))
+            self.assertTrue(np.isin(overview, np.arange(5)).all())
+            np.testing.assert_array_equal(dataset.read(1), classes)
+
+    def test_shape_mismatch(self):
+        """An array off the grid shape raises ValueError and writes nothing."""
+        grid = make_cube().grids["028022"]
+        path = os.path.join(self.output.name, "wrong.tif")
+        with self.assertRaises(ValueError):
+            write_cog(path, np.zeros((grid.height + 1, grid.width), dtype=np.int16), grid)
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
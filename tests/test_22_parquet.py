@@ -0,0 +1,97 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import math
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from cube_fixture import make_cube, make_items, patch_stac
+
+try:
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestParquet(unittest.TestCase):
+    """Tests the pixel tables streamed from a cube, read back with pyarrow."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+        self.output = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output.cleanup)
+
+    def assertTable(self, table, stack, grid):
+        """Check the rows of a table (ordered by pixel then time) against the (band, time, y, x) cube."""
+        n_bands, n_times, height, width = stack.shape
+        self.assertEqual(table.num_rows, n_times * height * width)
+        self.assertEqual(table.column("tile").unique().dictionary.to_pylist(), ["028022"])
+        pixels = table.column("pixel").to_numpy()
+        np.testing.assert_array_equal(pixels, np.repeat(np.arange(height * width), n_times))
+        times = table.column("time").to_numpy().astype("datetime64[D]")
+        np.testing.assert_array_equal(times[:n_times], stack.time.values.astype("datetime64[D]"))
+        x = table.column("x").to_numpy().reshape(height, width, n_times)[0, :, 0]
+        y = table.column("y").to_numpy().reshape(height, width, n_times)[:, 0, 0]
+        np.testing.assert_allclose(x, grid.transform.c + (np.arange(width) + 0.5) * grid.resolution)
+        np.testing.assert_allclose(y, grid.transform.f - (np.arange(height) + 0.5) * grid.resolution)
+        for b, band in enumerate(stack.band.values):
+            values = table.column(band).to_numpy().reshape(height, width, n_times)
+            np.testing.assert_array_equal(values.transpose(2, 0, 1), stack.values[b])
+
+    def test_parquet(self):
+        """Each block of rows is a row group of the Parquet file of the tile."""
+        cube = make_cube(["B04", "B08"], formulas=["(B08-B04)"])
+        grid = cube.grids["028022"]
+        written = cube.to_parquet(self.output.name, chunk_rows=64)
+        self.assertEqual(written, [os.path.join(self.output.name, "028022.parquet")])
+        parquet = pyarrow.parquet.ParquetFile(written[0])
+        self.assertEqual(parquet.num_row_groups, math.ceil(grid.height / 64))
+        self.assertTable(parquet.read(), cube.search(), grid)
+
+    def test_arrow(self):
+        """The Arrow IPC file holds a record batch by block of rows."""
+        cube = make_cube(["B04"])
+        grid = cube.grids["028022"]
+        written = cube.to_parquet(self.output.name, format="arrow", compression="lz4", chunk_rows=100)
+        with pyarrow.ipc.open_file(written[0]) as reader:
+            self.assertEqual(reader.num_record_batches, math.ceil(grid.height / 100))
+            table = reader.read_all()
+        self.assertTable(table, cube.search(), grid)
+
+    def test_unknown_band(self):
+        """A band that is not a query band nor a formula raises KeyError."""
+        with self.assertRaises(KeyError):
+            make_cube(["B04"]).to_parquet(self.output.name, bands=["B11"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""API - EO Data Cube.
+
+Tests Python Client Library for Earth Observation Data Cube.
+Python Client Library for Earth Observation Data Cubes.
+This abstraction uses STAC.py library provided by BDC Project.
+
+=======================================
+begin                : 2021-05-01
+git sha              : $Format:%H$
+copyright            : (C) 2024 by none
+email                : baggio.silva@inpe.br
+=======================================
+
+This program is free software.
+You can redistribute it and/or modify it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from cube_fixture import make_cube, make_items, patch_stac
+from eocube.cluster import SOM, MiniBatchKMeans
+
+MEANS = np.array([[0, 0], [10, 0], [0, 10]], dtype=np.float32)
+
+
+def _blobs(n, seed):
+    """Return n pixels around each of the MEANS, shuffled, and their blob."""
+    rng = np.random.default_rng(seed)
+    blob = rng.permutation(np.repeat(np.arange(len(MEANS)), n))
+    return (MEANS[blob] + rng.normal(0, 0.5, (len(blob), 2))).astype(np.float32), blob
+
+
+class TestModels(unittest.TestCase):
+    """Tests the models trained batch by batch."""
+
+    def test_kmeans(self):
+        """Mini-batch k-means finds the centers of separated blobs and labels every blob with one cluster."""
+        data, blob = _blobs(300, 0)
+        model = MiniBatchKMeans(3, seed=1)
+        for start in range(0, len(data), 100):
+            model.partial_fit(data[start:start + 100])
+        self.assertEqual(model.n_batches, 9)
+        distances = np.linalg.norm(model.centers[:, None] - MEANS[None], axis=2)
+        self.assertTrue((distances.min(axis=0) < 0.2).all())
+        labels = model.predict(data)
+        for b in range(len(MEANS)):
+            self.assertEqual(len(np.unique(labels[blob == b])), 1)
+        self.assertLess(model.inertia(data), len(data))
+
+    def test_missing_values(self):
+        """A missing feature does not count in the distance to the centers."""
+        model = MiniBatchKMeans(3, seed=1).partial_fit(_blobs(100, 0)[0])
+        pixel = np.array([[10, np.nan]], dtype=np.float32)
+        self.assertEqual(model.predict(pixel)[0], model.predict(np.array([[10, 0]], dtype=np.float32))[0])
+
+    def test_som(self):
+        """Training lowers the quantization error and every blob gets its neurons."""
+        data, blob = _blobs(300, 2)
+        model = SOM(3, decay_steps=20, seed=0)
+        model.partial_fit(data[:100])
+        before = model.quantization_error(data)
+        for _ in range(5):
+            for start in range(0, len(data), 100):
+                model.partial_fit(data[start:start + 100])
+        self.assertEqual(model.neurons.shape, (9, 2))
+        self.assertLess(model.quantization_error(data), before)
+        labels = model.predict(data)
+        neurons = [set(labels[blob == b]) for b in range(len(MEANS))]
+        self.assertFalse(neurons[0] & neurons[1] or neurons[0] & neurons[2] or neurons[1] & neurons[2])
+
+
+class TestCubeTraining(unittest.TestCase):
+    """Tests the pixel batches of a cube and the models trained on them."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.items = make_items(cls.directory.name, dates=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        patch_stac(self, self.items)
+        self.cube = make_cube()
+        stack = self.cube.search().values.astype(np.float32)
+        # (pixel, band * time), features ordered by band then time
+        self.matrix = stack.reshape(stack.shape[0] * stack.shape[1], -1).T
+
+    def test_pixel_batches(self):
+        """Batches hold every pixel once, in order without a seed and shuffled with one."""
+        batches = list(self.cube.pixel_batches(batch_size=1000, chunk_rows=64, seed=None))
+        self.assertTrue(all(len(batch) <= 1000 for batch in batches))
+        np.testing.assert_array_equal(np.concatenate(batches), self.matrix)
+        shuffled = np.concatenate(list(self.cube.pixel_batches(batch_size=1000, chunk_rows=64, seed=3)))
+        self.assertFalse(np.array_equal(shuffled, self.matrix))
+        np.testing.assert_array_equal(np.unique(shuffled, axis=0), np.unique(self.matrix, axis=0))
+
+    def test_cluster_map(self):
+        """A model trained on the batches maps the tile as its predictions of the whole matrix."""
+        model = self.cube.train(MiniBatchKMeans(4), epochs=2, batch_size=2000, chunk_rows=64)
+        batches = len(list(self.cube.pixel_batches(batch_size=2000, chunk_rows=64)))
+        self.assertEqual(model.n_batches, 2 * batches)
+        clusters = self.cube.cluster_map(model, chunk_rows=64)
+        grid = self.cube.grids["028022"]
+        self.assertEqual(clusters.shape, (grid.height, grid.width))
+        np.testing.assert_array_equal(clusters.values.ravel(), model.predict(self.matrix))
+        self.assertEqual(len(np.unique(clusters.values)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()